@@ -11,9 +11,32 @@ admin.site.register(SystemDesignAIResponse)
 admin.site.register(JobSearchAIResponse) 
 
 
+@admin.register(AIResponse)
+class AIResponseAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'category', 'created_at', 'is_helpful')
+    list_filter = ('category', 'is_helpful')
+    search_fields = ('user__username', 'user__email', 'question')
+    ordering = ('-created_at',)
+
+
 @admin.register(Goal)
 class GoalAdmin(admin.ModelAdmin):
     list_display = ('user', 'category', 'daily_target', 'weekly_streak', 'last_completed_date')
     list_filter = ('category', 'last_completed_date')
     search_fields = ('user__username', 'user__email', 'category')
-    ordering = ('category',)
\ No newline at end of file
+    ordering = ('category',)
+
+
+@admin.register(AIJob)
+class AIJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'category', 'kind', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'category', 'kind')
+    search_fields = ('user__username', 'user__email')
+    ordering = ('-created_at',)
+
+@admin.register(AIUsageRecord)
+class AIUsageRecordAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'user', 'category', 'template', 'cache_hit', 'prompt_tokens', 'output_tokens', 'wall_time_ms', 'error_class')
+    list_filter = ('category', 'cache_hit', 'streamed', 'error_class')
+    search_fields = ('user__username', 'user__email')
+    ordering = ('-created_at',)
@@ -0,0 +1,111 @@
+"""
+Global admission control for upstream Gemini calls.
+
+At most AI_ADMISSION['MAX_IN_FLIGHT'] calls run at once across every process
+sharing the database. Slots are PostgreSQL session advisory locks, so a slot is
+freed automatically if its process dies. A caller that finds no free slot takes
+one of AI_ADMISSION['MAX_QUEUE'] waiting slots and polls for up to
+AI_ADMISSION['MAX_WAIT'] seconds; when the waiting slots are full, or the wait
+runs out, the call is shed with AdmissionRejected (503 + Retry-After).
+
+Answer cache hits never reach this gate, so cached answers are still served
+while the upstream capacity is exhausted.
+"""
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import connection
+from .resilience import AIUnavailableError
+from . import metrics
+
+# First key of the two-key advisory locks; the second key is the slot number
+RUNNING_LOCK_SPACE = 4242001
+WAITING_LOCK_SPACE = 4242002
+
+
+class AdmissionRejected(AIUnavailableError):
+    status_code = 503
+
+    def __init__(self, retry_after):
+        super().__init__("AI service is at capacity, please retry shortly.")
+        self.retry_after = retry_after
+
+
+def _try_lock_slot(cursor, space, slots):
+    """Take the first free slot in `space` (session advisory lock); None when all are held."""
+    cursor.execute(
+        "SELECT slot FROM generate_series(0, %s - 1) AS slot "
+        "WHERE pg_try_advisory_lock(%s, slot) LIMIT 1",
+        [slots, space],
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _unlock_slot(cursor, space, slot):
+    cursor.execute("SELECT pg_advisory_unlock(%s, %s)", [space, slot])
+
+
+def _shed(reason):
+    metrics.incr(f'admission_shed_{reason}')
+    raise AdmissionRejected(retry_after=settings.AI_ADMISSION['RETRY_AFTER'])
+
+
+@contextmanager
+def admit():
+    """Hold one global in-flight slot for the duration of the block, waiting briefly if needed."""
+    config = settings.AI_ADMISSION
+    if not config['ENABLED']:
+        yield
+        return
+
+    with connection.cursor() as cursor:
+        slot = _try_lock_slot(cursor, RUNNING_LOCK_SPACE, config['MAX_IN_FLIGHT'])
+        if slot is None:
+            waiting_slot = _try_lock_slot(cursor, WAITING_LOCK_SPACE, config['MAX_QUEUE'])
+            if waiting_slot is None:
+                _shed('queue_full')
+            metrics.incr('admission_queued')
+            try:
+                deadline = time.monotonic() + config['MAX_WAIT']
+                while slot is None:
+                    if time.monotonic() >= deadline:
+                        _shed('wait_timeout')
+                    time.sleep(config['POLL_INTERVAL'])
+                    slot = _try_lock_slot(cursor, RUNNING_LOCK_SPACE, config['MAX_IN_FLIGHT'])
+            finally:
+                _unlock_slot(cursor, WAITING_LOCK_SPACE, waiting_slot)
+
+    metrics.incr('admission_admitted')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            _unlock_slot(cursor, RUNNING_LOCK_SPACE, slot)
+
+
+def lock_counts():
+    """(in flight, waiting) across all processes, from pg_locks."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT classid, count(*) FROM pg_locks "
+            "WHERE locktype = 'advisory' AND granted AND classid IN (%s, %s) "
+            "GROUP BY classid",
+            [RUNNING_LOCK_SPACE, WAITING_LOCK_SPACE],
+        )
+        counts = dict(cursor.fetchall())
+    return counts.get(RUNNING_LOCK_SPACE, 0), counts.get(WAITING_LOCK_SPACE, 0)
+
+
+def _metrics_section():
+    counters = metrics.get_counters(
+        'admission_admitted', 'admission_queued',
+        'admission_shed_queue_full', 'admission_shed_wait_timeout',
+    )
+    counters['in_flight'], counters['queue_depth'] = lock_counts()
+    counters['max_in_flight'] = settings.AI_ADMISSION['MAX_IN_FLIGHT']
+    counters['max_queue'] = settings.AI_ADMISSION['MAX_QUEUE']
+    return counters
+
+
+metrics.register_section('admission', _metrics_section)
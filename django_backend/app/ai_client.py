@@ -0,0 +1,117 @@
+"""
+Shared Gemini client for the worker process.
+
+The SDK is configured once and GenerativeModel objects are cached and reused,
+so every request shares the same gRPC/HTTP channel instead of building a model
+per call. `warm()` opens that channel ahead of the first user request; it runs
+from gunicorn's post_worker_init hook (gunicorn.conf.py) and when the AI job
+worker starts.
+
+All Gemini calls go through `generate(prompt, **opts)`. With GEMINI_BACKEND = 'fake'
+the client is the local stand-in from app/fake_gemini.py instead.
+"""
+import logging
+import threading
+import time
+import google.generativeai as genai
+from django.conf import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiClient:
+
+    def __init__(self, api_key, model_name, transport=None):
+        genai.configure(api_key=api_key, transport=transport)
+        self.model_name = model_name
+        self.transport = transport
+        self.warmed = False
+        self.warm_ms = None
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def get_model(self, model_name=None, system_instruction=None):
+        """Return the cached GenerativeModel for this model name / system instruction."""
+        key = (model_name or self.model_name, system_instruction)
+        model = self._models.get(key)
+        if model is None:
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    model = genai.GenerativeModel(key[0], system_instruction=system_instruction)
+                    self._models[key] = model
+        return model
+
+    def generate(self, prompt, stream=False, model_name=None, system_instruction=None, **opts):
+        """
+        Run generate_content on the shared model. Extra options (generation_config,
+        request_options, ...) are passed through to the SDK.
+        """
+        model = self.get_model(model_name, system_instruction)
+        return model.generate_content(prompt, stream=stream, **opts)
+
+    def warm(self):
+        """Open the upstream channel with a cheap token-count call."""
+        start = time.perf_counter()
+        try:
+            self.get_model().count_tokens("ping")
+        except Exception:
+            logger.warning("Gemini warm-up failed", exc_info=True)
+            return False
+        self.warm_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.warmed = True
+        return True
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide client for settings.GEMINI_BACKEND, created on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if settings.GEMINI_BACKEND == 'fake':
+                    from . import fake_gemini
+                    _client = fake_gemini.from_settings()
+                else:
+                    _client = GeminiClient(
+                        api_key=getattr(settings, 'GEMINI_API_KEY', None),
+                        model_name=settings.GEMINI_MODEL_NAME,
+                        transport=settings.GEMINI_TRANSPORT,
+                    )
+    return _client
+
+
+def reset():
+    """Drop the current client so the next call builds one from the current settings."""
+    global _client
+    with _client_lock:
+        _client = None
+
+
+def generate(prompt, **opts):
+    return get_client().generate(prompt, **opts)
+
+
+def warm():
+    if settings.GEMINI_WARM_ON_START:
+        return get_client().warm()
+    return False
+
+
+def _metrics_section():
+    return {
+        'backend': settings.GEMINI_BACKEND,
+        'transport': _client.transport if _client else settings.GEMINI_TRANSPORT,
+        'initialized': _client is not None,
+        'warmed': bool(_client and _client.warmed),
+        'warm_ms': _client.warm_ms if _client else None,
+        'cached_models': len(_client._models) if _client else 0,
+    }
+
+
+metrics.register_section('gemini_client', _metrics_section)
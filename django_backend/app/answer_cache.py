@@ -0,0 +1,271 @@
+"""
+Exact-match answer cache in front of Gemini.
+
+Questions are normalized (case, punctuation, whitespace) and combined with the
+user, the category and the metadata fields that change the answer (difficulty,
+tech_stack, system_type, job category) into a cache key. A hit skips the Gemini
+call entirely. Entries are per user because the prompt includes the user's task
+list; an answer may reflect tasks as they were up to TIMEOUT ago.
+Each entry records the AI response rows that were answered with it. A hit is
+rejected (and the entry dropped) once any of those rows is marked
+`is_helpful=False`, whichever worker saved the feedback.
+
+The storage backend is pluggable through settings.AI_ANSWER_CACHE:
+
+    AI_ANSWER_CACHE = {
+        'BACKEND': 'app.answer_cache.LocalMemoryBackend',  # or FileBackend, DjangoCacheBackend
+        'TIMEOUT': 86400,      # seconds
+        'MAX_ENTRIES': 1000,   # LRU bound
+        'OPTIONS': {},         # e.g. {'path': '/var/cache/fluxai'} or {'alias': 'default'}
+    }
+
+LocalMemoryBackend is private to each worker process, so workers don't share
+hits; use FileBackend (one host) or DjangoCacheBackend with a shared cache
+(several hosts) to reuse answers across workers.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from . import metrics
+from .models import AIResponse
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_WHITESPACE = re.compile(r'\s+')
+
+# Rows one entry may be reused for; past that the answer is generated afresh
+MAX_SOURCE_IDS = 50
+
+
+def normalize_question(question):
+    """Canonical form used for matching: "Two-Sum?? " and "two sum" map to the same key."""
+    question = unicodedata.normalize('NFKC', question).casefold()
+    question = _PUNCTUATION.sub(' ', question)
+    return _WHITESPACE.sub(' ', question).strip()
+
+
+class LocalMemoryBackend:
+    """Per-process LRU dict with TTL."""
+
+    def __init__(self, timeout, max_entries, **options):
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                metrics.incr('answer_cache_evictions')
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def size(self):
+        return len(self._data)
+
+
+class FileBackend:
+    """
+    One JSON file per entry, shared by every worker on the host.
+    File mtime is refreshed on read, so eviction by oldest mtime is LRU.
+    """
+
+    def __init__(self, timeout, max_entries, path=None, **options):
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self.path = path or os.path.join(tempfile.gettempdir(), 'fluxai_answer_cache')
+        os.makedirs(self.path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, f"{key}.json")
+
+    def get(self, key):
+        filename = self._file(key)
+        try:
+            mtime = os.path.getmtime(filename)
+            if mtime + self.timeout < time.time():
+                os.remove(filename)
+                return None
+            with open(filename, encoding='utf-8') as f:
+                value = json.load(f)
+            os.utime(filename)
+            return value
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key, value):
+        tmp = f"{self._file(key)}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(value, f)
+        os.replace(tmp, self._file(key))
+        self._cull()
+
+    def delete(self, key):
+        try:
+            os.remove(self._file(key))
+        except OSError:
+            pass
+
+    def _entries(self):
+        with os.scandir(self.path) as it:
+            return [entry for entry in it if entry.name.endswith('.json')]
+
+    def _cull(self):
+        entries = self._entries()
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:excess]:
+            try:
+                os.remove(entry.path)
+                metrics.incr('answer_cache_evictions')
+            except OSError:
+                pass
+
+    def size(self):
+        return len(self._entries())
+
+
+class DjangoCacheBackend:
+    """
+    Any configured Django cache (e.g. Redis). TTL is passed through; LRU eviction
+    is left to the cache itself (Redis maxmemory-policy, LocMemCache culling).
+    """
+
+    def __init__(self, timeout, max_entries, alias='default', **options):
+        self.timeout = timeout
+        self.cache = caches[alias]
+
+    def _key(self, key):
+        return f"ai_answer_{key}"
+
+    def get(self, key):
+        return self.cache.get(self._key(key))
+
+    def set(self, key, value):
+        self.cache.set(self._key(key), value, self.timeout)
+
+    def delete(self, key):
+        self.cache.delete(self._key(key))
+
+    def size(self):
+        return None
+
+
+class AnswerCache:
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def make_key(self, ai_category, user_id, question, metadata):
+        parts = [user_id, ai_category.key, normalize_question(question)]
+        parts += [str(metadata.get(field, '')) for field in ai_category.cache_key_fields]
+        return hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()
+
+    def get(self, ai_category, user_id, question, metadata):
+        """Return the cached answer text, or None."""
+        key = self.make_key(ai_category, user_id, question, metadata)
+        value = self.backend.get(key)
+        if value is not None and self._marked_unhelpful(value):
+            self.backend.delete(key)
+            metrics.incr('answer_cache_invalidations')
+            value = None
+        if value is None:
+            metrics.incr('answer_cache_misses')
+            return None
+        metrics.incr('answer_cache_hits')
+        return value['response']
+
+    def set(self, ai_category, user_id, question, metadata, response, source_id):
+        """Cache `response`, stored as (or reused for) the AI response row `source_id`."""
+        key = self.make_key(ai_category, user_id, question, metadata)
+        value = self.backend.get(key)
+        source_ids = [source_id]
+        if value is not None and value['response'] == response:
+            source_ids = value.get('source_ids', []) + source_ids
+        if len(source_ids) > MAX_SOURCE_IDS:
+            self.backend.delete(key)
+            return
+        self.backend.set(key, {'response': response, 'source_ids': source_ids})
+        metrics.incr('answer_cache_stores')
+
+    def _marked_unhelpful(self, value):
+        # The feedback may have been saved by another worker, whose eviction never reached this backend
+        return AIResponse.objects.filter(pk__in=value.get('source_ids', []), is_helpful=False).exists()
+
+    def invalidate(self, ai_category, user_id, question, metadata, response=None):
+        """Drop the entry; with `response`, only if it still holds that answer."""
+        key = self.make_key(ai_category, user_id, question, metadata)
+        if response is not None:
+            value = self.backend.get(key)
+            if value is None or value['response'] != response:
+                return
+        self.backend.delete(key)
+        metrics.incr('answer_cache_invalidations')
+
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    """Process-wide AnswerCache built from settings.AI_ANSWER_CACHE (None when disabled)."""
+    global _answer_cache
+    config = settings.AI_ANSWER_CACHE
+    if not config.get('BACKEND'):
+        return None
+    if _answer_cache is None:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                backend_class = import_string(config['BACKEND'])
+                backend = backend_class(
+                    timeout=config.get('TIMEOUT', 86400),
+                    max_entries=config.get('MAX_ENTRIES', 1000),
+                    **config.get('OPTIONS', {}),
+                )
+                _answer_cache = AnswerCache(backend)
+    return _answer_cache
+
+
+def _metrics_section():
+    counters = metrics.get_counters(
+        'answer_cache_hits', 'answer_cache_misses', 'answer_cache_stores',
+        'answer_cache_evictions', 'answer_cache_invalidations',
+    )
+    answer_cache = get_answer_cache()
+    counters['hit_rate'] = metrics.ratio(
+        counters['answer_cache_hits'],
+        counters['answer_cache_hits'] + counters['answer_cache_misses'],
+    )
+    counters['entries'] = answer_cache.backend.size() if answer_cache else None
+    counters['enabled'] = answer_cache is not None
+    return counters
+
+
+metrics.register_section('answer_cache', _metrics_section)
@@ -0,0 +1,134 @@
+"""
+Per-user facet counts of the AI responses (AIResponseFacet).
+
+Every AI response contributes 1 to these (facet, value) counters of its
+category:
+
+    total         ''                        every response
+    topic_tags    each of its tags
+    <field>       its value of each AICategory.facet_fields field
+                  (difficulty, tech_stack, system_type, job search category)
+    is_helpful    'true', 'false' or 'unknown'
+
+The counters are changed in the same transaction as the response itself
+(AIResponse.save() and deletes are atomic): signals.py reads the facets a
+row had before a save (one primary key lookup) and applies the difference
+afterwards, and deletes subtract (update-only: deleting a user cascades to
+the counters before its responses, so they must not be re-inserted). Code that
+writes rows without signals (bulk_create) calls record_created().
+`manage.py rebuild_ai_response_facets` recounts everything from scratch.
+"""
+from collections import Counter
+from django.db import connection, transaction
+from .models import AIResponse, AIResponseFacet, split_tags
+from . import generation  # Module import: generation calls back into this module
+
+TOTAL = 'total'
+HELPFUL_VALUES = {True: 'true', False: 'false', None: 'unknown'}
+
+
+def facets_for(category, topic_tags, metadata, is_helpful):
+    """The (category, facet, value) counters a response with these values belongs to."""
+    ai_category = generation.AI_CATEGORIES[category]
+    keys = [(category, TOTAL, '')]
+    keys += [(category, 'topic_tags', tag) for tag in split_tags(topic_tags)]
+    keys += [
+        (category, field, str(metadata.get(field, ai_category.metadata_defaults[field])))
+        for field in ai_category.facet_fields
+    ]
+    keys.append((category, 'is_helpful', HELPFUL_VALUES[is_helpful]))
+    return keys
+
+
+def facets_of(instance):
+    return facets_for(instance.category, instance.topic_tags, instance.metadata, instance.is_helpful)
+
+
+def stored_facets(pk):
+    """Facets of the row as currently stored ([] if there is no such row)."""
+    row = AIResponse.objects.filter(pk=pk).values('category', 'topic_tags', 'metadata', 'is_helpful').first()
+    return facets_for(**row) if row else []
+
+
+def apply(user_id, added=(), removed=()):
+    """Add 1 to every counter in `added` and subtract 1 from every one in `removed`."""
+    deltas = Counter(added)
+    deltas.subtract(removed)
+    # Sorted, so concurrent writers lock the counter rows in the same order
+    params = [(user_id, *key, delta) for key, delta in sorted(deltas.items()) if delta]
+    if not params:
+        return
+    table = AIResponseFacet._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {table} (user_id, category, facet, value, count) VALUES (%s, %s, %s, %s, %s) "
+            f"ON CONFLICT (user_id, category, facet, value) DO UPDATE SET count = {table}.count + EXCLUDED.count",
+            params,
+        )
+
+
+def remove(user_id, removed):
+    """Subtract 1 from every existing counter in `removed`, without creating missing ones."""
+    params = [(delta, user_id, *key) for key, delta in sorted(Counter(removed).items())]
+    if not params:
+        return
+    table = AIResponseFacet._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {table} SET count = count - %s WHERE user_id = %s AND category = %s AND facet = %s AND value = %s",
+            params,
+        )
+
+
+def record_created(objs):
+    """Count rows inserted without post_save (bulk_create)."""
+    by_user = {}
+    for obj in objs:
+        by_user.setdefault(obj.user_id, []).extend(facets_of(obj))
+    for user_id, added in by_user.items():
+        apply(user_id, added=added)
+
+
+def counts(user_id, category):
+    """{facet: [{'value', 'count'}, ...]} for a user's responses in a category, most common first."""
+    facets = {}
+    rows = (
+        AIResponseFacet.objects
+        .filter(user_id=user_id, category=category, count__gt=0)
+        .order_by('facet', '-count', 'value')
+        .values_list('facet', 'value', 'count')
+    )
+    for facet, value, count in rows:
+        facets.setdefault(facet, []).append({'value': value, 'count': count})
+    return facets
+
+
+def rebuild(user_id=None):
+    """Recount every counter (of one user, or of everyone) from the stored responses."""
+    table = AIResponseFacet._meta.db_table
+    user_filter = 'AND user_id = %s' if user_id is not None else ''
+    user_params = [user_id] if user_id is not None else []
+    selects, params = [
+        f"SELECT user_id, category, '{TOTAL}', '', count(*) FROM app_airesponse WHERE true {user_filter} "
+        "GROUP BY user_id, category",
+        "SELECT user_id, category, 'topic_tags', tag, count(*) FROM app_airesponse, unnest(tags) AS tag "
+        f"WHERE true {user_filter} GROUP BY user_id, category, tag",
+        "SELECT user_id, category, 'is_helpful', CASE is_helpful WHEN true THEN 'true' WHEN false THEN 'false' "
+        f"ELSE 'unknown' END, count(*) FROM app_airesponse WHERE true {user_filter} GROUP BY 1, 2, 4",
+    ], user_params * 3
+    for key, ai_category in generation.AI_CATEGORIES.items():
+        for field in ai_category.facet_fields:
+            selects.append(
+                "SELECT user_id, category, %s, COALESCE(metadata ->> %s, %s), count(*) FROM app_airesponse "
+                f"WHERE category = %s {user_filter} GROUP BY 1, 2, 4"
+            )
+            params += [field, field, str(ai_category.metadata_defaults[field]), key, *user_params]
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Keep responses from changing while they are recounted
+        cursor.execute("LOCK TABLE app_airesponse IN SHARE MODE")
+        cursor.execute(f"DELETE FROM {table} WHERE true {user_filter}", user_params)
+        cursor.execute(
+            f"INSERT INTO {table} (user_id, category, facet, value, count) " + " UNION ALL ".join(selects),
+            params,
+        )
@@ -0,0 +1,201 @@
+"""
+Local stand-in for the Gemini backend, for benchmarks and offline development.
+
+Enable it with GEMINI_BACKEND = 'fake' (or `manage.py ai_loadtest`, which
+switches to it by default). FakeGeminiClient has the same interface as
+ai_client.GeminiClient and returns objects shaped like the SDK's responses
+(`text`, `parts`, `usage_metadata`), so every layer above it runs unchanged.
+
+Behaviour is set by settings.FAKE_GEMINI:
+
+    FAKE_GEMINI = {
+        'LATENCY': {'distribution': 'lognormal', 'median_ms': 1500, 'sigma': 0.5},
+                    # or {'distribution': 'fixed', 'ms': 800}
+                    # or {'distribution': 'uniform', 'min_ms': 500, 'max_ms': 3000}
+        'FIRST_CHUNK_MS': 300,      # streaming: time to first chunk
+        'CHUNK_INTERVAL_MS': 40,    # streaming: gap between chunks
+        'CHUNK_CHARS': 60,
+        'RESPONSE_CHARS': 2500,     # mean answer size, +/- 50%
+        'ERROR_RATE': 0.0,          # share of calls failing with a 5xx/429
+        'SEED': None,
+    }
+"""
+import math
+import random
+import threading
+import time
+from django.conf import settings
+from google.api_core import exceptions as google_exceptions
+
+DEFAULT_OPTIONS = {
+    'LATENCY': {'distribution': 'lognormal', 'median_ms': 1500, 'sigma': 0.5},
+    'FIRST_CHUNK_MS': 300,
+    'CHUNK_INTERVAL_MS': 40,
+    'CHUNK_CHARS': 60,
+    'RESPONSE_CHARS': 2500,
+    'ERROR_RATE': 0.0,
+    'SEED': None,
+}
+
+
+_ERRORS = (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.TooManyRequests,
+)
+
+_PARAGRAPH = (
+    "## Approach\n\n"
+    "The **key idea** is to keep the invariant while scanning the input once. "
+    "Each step updates the state in constant time, so the whole pass is linear.\n\n"
+    "- Time complexity: **O(n)**\n"
+    "- Space complexity: **O(1)**\n\n"
+    "```python\n"
+    "def solve(items):\n"
+    "    best = 0\n"
+    "    for item in items:\n"
+    "        best = max(best, item)\n"
+    "    return best\n"
+    "```\n\n"
+)
+
+
+class FakeUsageMetadata:
+
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class FakeResponse:
+
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.parts = [text] if text else []
+        self.usage_metadata = usage_metadata
+
+
+class FakeGeminiClient:
+
+    def __init__(self, options=None, model_name='fake-gemini'):
+        self.options = {**DEFAULT_OPTIONS, **(options or {})}
+        self.model_name = model_name
+        self.transport = 'fake'
+        self.warmed = False
+        self.warm_ms = None
+        self._models = {}
+        self._random = random.Random(self.options['SEED'])
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    # Load statistics, read by `manage.py ai_loadtest`
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls = 0
+            self.errors = 0
+            self.in_flight = 0
+            self.peak_in_flight = 0
+            self._busy_area = 0.0  # integral of in_flight over time
+            self._last_change = time.monotonic()
+            self._started = self._last_change
+
+    def _track(self, delta):
+        with self._lock:
+            now = time.monotonic()
+            self._busy_area += self.in_flight * (now - self._last_change)
+            self._last_change = now
+            self.in_flight += delta
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def stats(self):
+        self._track(0)
+        elapsed = self._last_change - self._started
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'peak_in_flight': self.peak_in_flight,
+            'mean_in_flight': round(self._busy_area / elapsed, 2) if elapsed else 0.0,
+        }
+
+    # GeminiClient interface
+
+    def get_model(self, model_name=None, system_instruction=None):
+        return None
+
+    def warm(self):
+        self.warmed = True
+        self.warm_ms = 0.0
+        return True
+
+    def generate(self, prompt, stream=False, model_name=None, system_instruction=None, request_options=None, **opts):
+        timeout = (request_options or {}).get('timeout')
+        with self._lock:
+            self.calls += 1
+            latency = self._sample_latency()
+            fails = self._random.random() < self.options['ERROR_RATE']
+            size = max(1, int(self.options['RESPONSE_CHARS'] * self._random.uniform(0.5, 1.5)))
+            error = self._random.choice(_ERRORS) if fails else None
+        prompt_tokens = math.ceil((len(prompt) + len(system_instruction or '')) / 4)
+        if stream:
+            return self._stream(prompt_tokens, size, error, timeout)
+        return self._respond(prompt_tokens, size, latency, error, timeout)
+
+    def _sample_latency(self):
+        latency = self.options['LATENCY']
+        distribution = latency.get('distribution', 'fixed')
+        if distribution == 'lognormal':
+            ms = self._random.lognormvariate(math.log(latency['median_ms']), latency.get('sigma', 0.5))
+        elif distribution == 'uniform':
+            ms = self._random.uniform(latency['min_ms'], latency['max_ms'])
+        else:
+            ms = latency.get('ms', 0)
+        return ms / 1000
+
+    def _answer(self, size):
+        return (_PARAGRAPH * (size // len(_PARAGRAPH) + 1))[:size]
+
+    def _wait(self, seconds, timeout, started):
+        if timeout is not None and time.monotonic() + seconds > started + timeout:
+            time.sleep(max(0.0, started + timeout - time.monotonic()))
+            raise google_exceptions.DeadlineExceeded("Fake Gemini call exceeded its timeout")
+        time.sleep(seconds)
+
+    def _respond(self, prompt_tokens, size, latency, error, timeout):
+        started = time.monotonic()
+        self._track(1)
+        try:
+            self._wait(latency, timeout, started)
+            if error is not None:
+                with self._lock:
+                    self.errors += 1
+                raise error("Fake Gemini error")
+            text = self._answer(size)
+            return FakeResponse(text, FakeUsageMetadata(prompt_tokens, math.ceil(size / 4)))
+        finally:
+            self._track(-1)
+
+    def _stream(self, prompt_tokens, size, error, timeout):
+        started = time.monotonic()
+        self._track(1)
+        try:
+            self._wait(self.options['FIRST_CHUNK_MS'] / 1000, timeout, started)
+            if error is not None:
+                with self._lock:
+                    self.errors += 1
+                raise error("Fake Gemini error")
+            text = self._answer(size)
+            step = self.options['CHUNK_CHARS']
+            for offset in range(0, len(text), step):
+                if offset:
+                    self._wait(self.options['CHUNK_INTERVAL_MS'] / 1000, timeout, started)
+                last = offset + step >= len(text)
+                usage_metadata = FakeUsageMetadata(prompt_tokens, math.ceil(size / 4)) if last else None
+                yield FakeResponse(text[offset:offset + step], usage_metadata)
+        finally:
+            self._track(-1)
+
+
+def from_settings():
+    return FakeGeminiClient(settings.FAKE_GEMINI)
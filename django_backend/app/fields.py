@@ -0,0 +1,88 @@
+"""
+CompressedTextField: a TextField stored compressed in a bytea column.
+
+Models, forms and serializers see a plain `str`, exactly like a TextField.
+In the database every value is one header byte naming the codec followed by
+the payload:
+
+    0x00  UTF-8 text, uncompressed (values under AI_RESPONSE_COMPRESSION['MIN_SIZE'])
+    0x01  zlib
+    0x02  zstd (Python 3.14 `compression.zstd` or the `zstandard` package)
+
+Values are written with AI_RESPONSE_COMPRESSION['CODEC'] and read back with
+whatever codec their header names, so the codec can be changed at any time.
+An empty column (no header byte at all) reads as None.
+
+Only equality lookups make sense against the compressed column.
+"""
+import zlib
+from django.conf import settings
+from django.db import models
+
+try:
+    from compression import zstd
+except ImportError:
+    try:
+        import zstandard
+    except ImportError:
+        zstd = None
+    else:
+        class zstd:  # Same two calls as compression.zstd
+            compress = staticmethod(lambda data, level: zstandard.ZstdCompressor(level=level).compress(data))
+            decompress = staticmethod(lambda data: zstandard.ZstdDecompressor().decompress(data))
+
+RAW, ZLIB, ZSTD = 0, 1, 2
+CODECS = {'raw': RAW, 'zlib': ZLIB, 'zstd': ZSTD}
+
+
+def encode_text(text, codec=None, level=None, min_size=None):
+    config = settings.AI_RESPONSE_COMPRESSION
+    codec = CODECS[codec or config['CODEC']]
+    level = config['LEVEL'] if level is None else level
+    min_size = config['MIN_SIZE'] if min_size is None else min_size
+    data = text.encode()
+    if codec == RAW or len(data) < min_size:
+        return bytes([RAW]) + data
+    if codec == ZSTD:
+        if zstd is None:
+            raise RuntimeError("AI_RESPONSE_COMPRESSION['CODEC'] is 'zstd' but no zstd module is installed")
+        compressed = zstd.compress(data, level)
+    else:
+        compressed = zlib.compress(data, level)
+    if len(compressed) >= len(data):
+        return bytes([RAW]) + data
+    return bytes([codec]) + compressed
+
+
+def decode_text(value):
+    """str for an encoded value; None for an empty (unset) column."""
+    value = bytes(value)
+    if not value:
+        return None
+    codec, payload = value[0], value[1:]
+    if codec == RAW:
+        return payload.decode()
+    if codec == ZLIB:
+        return zlib.decompress(payload).decode()
+    if codec == ZSTD:
+        if zstd is None:
+            raise RuntimeError("Found a zstd-compressed value but no zstd module is installed")
+        return zstd.decompress(payload).decode()
+    raise ValueError(f"Unknown compressed text codec {codec}")
+
+
+class CompressedTextField(models.TextField):
+
+    def db_type(self, connection):
+        return 'bytea'
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return decode_text(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if value is None:
+            return None
+        return connection.Database.Binary(encode_text(value))
@@ -0,0 +1,346 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from .models import split_tags, search_vector_for, preview_for, Category, DSAAIResponse, SoftwareDevAIResponse, SystemDesignAIResponse, JobSearchAIResponse
+from .answer_cache import get_answer_cache
+from .normalizer import MarkdownNormalizer, normalize_markdown
+from .prompts import get_template
+from .task_context import get_digest, format_tasks_section
+from . import admission, ai_client, resilience, singleflight, usage
+
+
+class AICategory:
+    """
+    Everything the generate/regenerate flow needs to know about one AI response category:
+    the model it writes to, the user tasks it pulls into the prompt, its prompt template
+    (see app/prompts.py), the metadata fields (with defaults) accepted on generation, and which of those
+    fields change the answer enough to be part of the answer cache key; `facet_fields` are the
+    metadata fields counted by the facets endpoint (see app/facets.py).
+    """
+
+    def __init__(self, key, model, label, question_label, metadata_defaults, cache_key_fields, facet_fields):
+        self.key = key  # Matches Task.category
+        self.model = model
+        self.label = label  # e.g. "DSA", "Development"
+        self.question_label = question_label  # e.g. "DSA", "development"
+        self.metadata_defaults = metadata_defaults
+        self.cache_key_fields = cache_key_fields
+        self.facet_fields = facet_fields
+
+    def metadata_from(self, data):
+        """
+        Pick the category's metadata fields out of (already validated, see
+        serializers.metadata_serializer_for) request data, applying defaults.
+        """
+        return {field: data.get(field, default) for field, default in self.metadata_defaults.items()}
+
+    def metadata_of(self, instance):
+        """Metadata fields of a stored AI response row."""
+        return {
+            field: instance.topic_tags if field == 'topic_tags' else instance.metadata.get(field, default)
+            for field, default in self.metadata_defaults.items()
+        }
+
+    @property
+    def prompt_template(self):
+        """The active prompt template version for this category."""
+        return get_template(self.key)
+
+
+AI_CATEGORIES = {
+    Category.DSA: AICategory(
+        key=Category.DSA,
+        model=DSAAIResponse,
+        label='DSA',
+        question_label='DSA',
+        metadata_defaults={
+            'topic_tags': '',
+            'difficulty': 'unknown',
+            'problem_source': '',
+            'problem_id': '',
+        },
+        cache_key_fields=('difficulty',),
+        facet_fields=('difficulty',),
+    ),
+    Category.DEVELOPMENT: AICategory(
+        key=Category.DEVELOPMENT,
+        model=SoftwareDevAIResponse,
+        label='Development',
+        question_label='development',
+        metadata_defaults={
+            'topic_tags': '',
+            'tech_stack': 'other',
+            'programming_language': '',
+            'framework': '',
+            'question_type': 'other',
+        },
+        cache_key_fields=('tech_stack',),
+        facet_fields=('tech_stack',),
+    ),
+    Category.SYSTEM_DESIGN: AICategory(
+        key=Category.SYSTEM_DESIGN,
+        model=SystemDesignAIResponse,
+        label='System Design',
+        question_label='system design',
+        metadata_defaults={
+            'topic_tags': '',
+            'system_scale': 'unknown',
+            'system_type': 'other',
+            'focus_area': 'architecture',
+            'is_interview_prep': False,
+            'company_context': '',
+        },
+        cache_key_fields=('system_type',),
+        facet_fields=('system_type',),
+    ),
+    Category.JOB_SEARCH: AICategory(
+        key=Category.JOB_SEARCH,
+        model=JobSearchAIResponse,
+        label='Job Search',
+        question_label='job search',
+        metadata_defaults={
+            'topic_tags': '',
+            'category': 'other',
+            'experience_level': '',
+            'target_role': '',
+            'interview_type': '',
+            'company_size': '',
+            'is_urgent': False,
+        },
+        cache_key_fields=('category',),
+        facet_fields=('category',),
+    ),
+}
+
+
+def build_tasks_section(user_id, ai_category, question, digest=None):
+    """
+    Summarize the user's tasks in this category for the prompt, most relevant to
+    the question first and within the task context token budget.
+    Reads the cached task digest unless one is passed in.
+    """
+    if digest is None:
+        digest = get_digest(user_id, ai_category.key)
+    return format_tasks_section(ai_category.label, digest, question)
+
+
+def build_prompt(ai_category, user_id, question, digest=None):
+    """Render the category's prompt template with the user's task context and the question."""
+    tasks_section = build_tasks_section(user_id, ai_category, question, digest)
+    prompt = ai_category.prompt_template.render(tasks_section, question)
+    prompt.user_id = user_id
+    return prompt
+
+
+def generate_text(prompt):
+    """
+    Call Gemini with a rendered Prompt and return the cleaned markdown answer.
+    Concurrent calls with an identical prompt (in this process or any other worker)
+    share one upstream request. The call runs within the category's latency budget
+    and through the circuit breaker, after taking a global admission slot.
+    Each upstream call is recorded in the usage ledger.
+    """
+    template = prompt.template
+
+    def request(timeout):
+        response = ai_client.generate(
+            prompt.text,
+            system_instruction=prompt.system_instruction,
+            request_options={'timeout': timeout},
+        )
+        return response.text, response.usage_metadata
+
+    def call_gemini():
+        start = time.perf_counter()
+        try:
+            with admission.admit():
+                text, usage_metadata = resilience.call(template.category, request)
+        except Exception as e:
+            usage.record(template.category, prompt.user_id, template.id, wall_time=time.perf_counter() - start, error=e)
+            raise
+        usage.record(template.category, prompt.user_id, template.id, usage_metadata=usage_metadata, wall_time=time.perf_counter() - start)
+        template.record_usage(usage_metadata)
+        return clean_ai_response(text)
+
+    return singleflight.do(singleflight.prompt_hash(prompt.cache_key()), call_gemini)
+
+
+def stream_text(prompt):
+    """Call Gemini in streaming mode and yield the raw text of each chunk as it arrives."""
+    template = prompt.template
+    start = time.perf_counter()
+    usage_metadata = None
+
+    def chunks(timeout):
+        nonlocal usage_metadata
+        for chunk in ai_client.generate(
+            prompt.text,
+            stream=True,
+            system_instruction=prompt.system_instruction,
+            request_options={'timeout': timeout},
+        ):
+            usage_metadata = chunk.usage_metadata or usage_metadata
+            if chunk.parts:
+                yield chunk.text
+
+    try:
+        with admission.admit():
+            yield from resilience.call_stream(template.category, chunks)
+    except Exception as e:
+        usage.record(template.category, prompt.user_id, template.id, streamed=True, wall_time=time.perf_counter() - start, error=e)
+        raise
+    usage.record(template.category, prompt.user_id, template.id, streamed=True, usage_metadata=usage_metadata, wall_time=time.perf_counter() - start)
+    template.record_usage(usage_metadata)
+
+
+def generate_ai_response(ai_category, user, question, metadata):
+    """
+    Answer a new question (from the answer cache when possible) and store it
+    as a new AI response row.
+    """
+    answer_cache = get_answer_cache()
+    ai_response = answer_cache.get(ai_category, user.pk, question, metadata) if answer_cache else None
+    if ai_response is None:
+        ai_response = generate_text(build_prompt(ai_category, user.pk, question))
+    else:
+        usage.record(ai_category.key, user.pk, cache_hit=True)
+    obj = create_ai_response(ai_category, user, question, ai_response, metadata)
+    if answer_cache:
+        answer_cache.set(ai_category, user.pk, question, metadata, ai_response, obj.pk)
+    return obj
+
+
+def stream_ai_response(ai_category, user, question, metadata):
+    """
+    Generator that yields the normalized answer text as Gemini chunks arrive,
+    then stores the full answer as a new AI response row and returns its id.
+    A cached answer is sent as a single chunk.
+    """
+    answer_cache = get_answer_cache()
+    ai_response = answer_cache.get(ai_category, user.pk, question, metadata) if answer_cache else None
+    if ai_response is not None:
+        usage.record(ai_category.key, user.pk, streamed=True, cache_hit=True)
+        yield ai_response
+    else:
+        normalizer = MarkdownNormalizer()
+        parts = []
+        for text in stream_text(build_prompt(ai_category, user.pk, question)):
+            text = normalizer.feed(text)
+            if text:
+                parts.append(text)
+                yield text
+        text = normalizer.finish()
+        if text:
+            parts.append(text)
+            yield text
+        ai_response = ''.join(parts)
+    obj = create_ai_response(ai_category, user, question, ai_response, metadata)
+    if answer_cache:
+        answer_cache.set(ai_category, user.pk, question, metadata, ai_response, obj.pk)
+    return obj.pk
+
+
+def create_ai_response(ai_category, user, question, ai_response, metadata):
+    """Store an already generated answer as a new AI response row."""
+    obj = build_ai_response(ai_category, user, question, ai_response, metadata)
+    obj.save(force_insert=True)
+    return obj
+
+
+def build_ai_response(ai_category, user, question, ai_response, metadata):
+    """Unsaved AI response row for an answer (see create_ai_response / bulk_create)."""
+    now = timezone.now()
+    metadata = dict(metadata)
+    topic_tags = metadata.pop('topic_tags', '')
+    if isinstance(topic_tags, list):
+        topic_tags = ','.join(topic_tags)
+    return ai_category.model(
+        user=user,
+        category=ai_category.key,
+        question=question,
+        response=ai_response,
+        topic_tags=topic_tags,
+        tags=split_tags(topic_tags),
+        search_vector=search_vector_for(question, ai_response),
+        preview=preview_for(ai_response),
+        metadata=metadata,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+def generate_ai_responses_batch(ai_category, user, items):
+    """
+    Answer several questions at once. `items` is a list of (question, metadata).
+
+    Cache misses are sent to Gemini in parallel on at most AI_BATCH_CONCURRENCY
+    threads; each answer is stored as soon as it arrives, so answers already
+    paid for are kept if the request dies before the batch finishes.
+    Returns one (obj, error) pair per item, in order.
+    """
+    answer_cache = get_answer_cache()
+    digest = get_digest(user.pk, ai_category.key)
+    results = [None] * len(items)
+
+    def store(index, ai_response):
+        question, metadata = items[index]
+        obj = create_ai_response(ai_category, user, question, ai_response, metadata)
+        if answer_cache:
+            answer_cache.set(ai_category, user.pk, question, metadata, ai_response, obj.pk)
+        results[index] = (obj, None)
+
+    def answer(index):
+        question, _ = items[index]
+        try:
+            return generate_text(build_prompt(ai_category, user.pk, question, digest))
+        finally:
+            # Pool threads open their own DB connection (single-flight leases)
+            connection.close()
+
+    misses = []
+    for index, (question, metadata) in enumerate(items):
+        ai_response = answer_cache.get(ai_category, user.pk, question, metadata) if answer_cache else None
+        if ai_response is None:
+            misses.append(index)
+        else:
+            usage.record(ai_category.key, user.pk, cache_hit=True)
+            store(index, ai_response)
+
+    if misses:
+        workers = min(settings.AI_BATCH_CONCURRENCY, len(misses))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ai-batch') as pool:
+            futures = {pool.submit(answer, index): index for index in misses}
+            # Rows are written on this thread, in the request's connection
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    store(index, future.result())
+                except Exception as e:
+                    results[index] = (None, e)
+    return results
+
+
+def regenerate_ai_response(ai_category, instance):
+    """
+    Generate a fresh answer for an existing AI response row and save it.
+    Always calls Gemini (at most sharing an identical call that is already in
+    flight); the new answer replaces any cached one.
+    """
+    ai_response = generate_text(build_prompt(ai_category, instance.user_id, instance.question))
+    instance.response = ai_response
+    instance.updated_at = timezone.now()
+    instance.save()
+
+    answer_cache = get_answer_cache()
+    if answer_cache:
+        answer_cache.set(ai_category, instance.user_id, instance.question, ai_category.metadata_of(instance), ai_response, instance.pk)
+    return instance
+
+
+def clean_ai_response(response_text):
+    """
+    Clean and format AI response text
+    """
+    return normalize_markdown(response_text)
@@ -0,0 +1,151 @@
+"""
+Durable, Postgres-backed work queue for AI generation.
+
+Views enqueue an AIJob and return immediately; `manage.py run_ai_worker` claims
+pending rows with SELECT ... FOR UPDATE SKIP LOCKED, runs them on a bounded
+thread pool and writes the resulting *AIResponse row.
+"""
+import logging
+import os
+import socket
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import AIJob
+from .generation import AI_CATEGORIES, generate_ai_response, regenerate_ai_response
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_generate(user, category, question, metadata):
+    """Queue generation of a new AI response for `question`."""
+    return AIJob.objects.create(
+        user=user,
+        category=category,
+        kind=AIJob.Kind.GENERATE,
+        payload={'question': question, 'metadata': metadata},
+    )
+
+
+def enqueue_generate_batch(user, category, items):
+    """Queue one generation job per (question, metadata) in `items`, in order."""
+    return AIJob.objects.bulk_create([
+        AIJob(user=user, category=category, kind=AIJob.Kind.GENERATE, payload={'question': question, 'metadata': metadata})
+        for question, metadata in items
+    ])
+
+
+def enqueue_regenerate(instance, category):
+    """Queue regeneration of an existing AI response row."""
+    return AIJob.objects.create(
+        user=instance.user,
+        category=category,
+        kind=AIJob.Kind.REGENERATE,
+        object_id=instance.pk,
+    )
+
+
+def claim_jobs(worker_id, limit):
+    """
+    Atomically claim up to `limit` runnable jobs for this worker.
+
+    Jobs left RUNNING by a worker that died are picked up again once their lease
+    (AI_JOB_LEASE_SECONDS) has expired.
+    """
+    if limit <= 0:
+        return []
+
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=settings.AI_JOB_LEASE_SECONDS)
+    runnable = (
+        Q(status=AIJob.Status.PENDING, run_after__lte=now) |
+        Q(status=AIJob.Status.RUNNING, locked_at__lt=stale_before)
+    )
+
+    with transaction.atomic():
+        job_ids = list(
+            AIJob.objects.select_for_update(skip_locked=True)
+            .filter(runnable)
+            .order_by('run_after', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not job_ids:
+            return []
+        AIJob.objects.filter(id__in=job_ids).update(
+            status=AIJob.Status.RUNNING,
+            locked_at=now,
+            locked_by=worker_id,
+            attempts=F('attempts') + 1,
+            updated_at=now,
+        )
+
+    return list(AIJob.objects.filter(id__in=job_ids).select_related('user').order_by('run_after', 'id'))
+
+
+def run_job(job, worker_id):
+    """Execute one job claimed by `worker_id` and record its outcome."""
+    ai_category = AI_CATEGORIES[job.category]
+    try:
+        if job.kind == AIJob.Kind.GENERATE:
+            obj = generate_ai_response(
+                ai_category,
+                job.user,
+                job.payload['question'],
+                job.payload.get('metadata', {}),
+            )
+        else:
+            instance = ai_category.model.objects.get(pk=job.object_id, user=job.user)
+            obj = regenerate_ai_response(ai_category, instance)
+    except ai_category.model.DoesNotExist:
+        # The response was deleted while the job was queued; retrying will not help
+        _finish(job, worker_id, AIJob.Status.FAILED, error='AI response no longer exists')
+        return
+    except Exception as e:
+        logger.exception("AI job %s failed", job.pk)
+        _retry_or_fail(job, worker_id, f'AI model error: {str(e)}')
+        return
+
+    _finish(job, worker_id, AIJob.Status.SUCCEEDED, object_id=obj.pk)
+
+
+def _save_outcome(job, worker_id, **fields):
+    """
+    Write the outcome only while `worker_id` still holds the job. Once its lease
+    expired and another worker re-claimed it, the new owner's state wins and
+    this outcome is dropped.
+    """
+    fields['updated_at'] = timezone.now()
+    updated = AIJob.objects.filter(pk=job.pk, locked_by=worker_id, status=AIJob.Status.RUNNING).update(**fields)
+    if not updated:
+        logger.warning("AI job %s was re-claimed by another worker; dropping the outcome of %s", job.pk, worker_id)
+        return False
+    for name, value in fields.items():
+        setattr(job, name, value)
+    return True
+
+
+def _finish(job, worker_id, job_status, object_id=None, error=''):
+    fields = {'status': job_status, 'error': error, 'finished_at': timezone.now(), 'locked_at': None}
+    if object_id is not None:
+        fields['object_id'] = object_id
+    return _save_outcome(job, worker_id, **fields)
+
+
+def _retry_or_fail(job, worker_id, error):
+    if job.attempts >= settings.AI_JOB_MAX_ATTEMPTS:
+        return _finish(job, worker_id, AIJob.Status.FAILED, error=error)
+
+    # Exponential backoff: 2s, 4s, 8s, ...
+    return _save_outcome(
+        job, worker_id,
+        status=AIJob.Status.PENDING,
+        error=error,
+        locked_at=None,
+        run_after=timezone.now() + timedelta(seconds=2 ** job.attempts),
+    )
@@ -0,0 +1,198 @@
+import math
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from app import ai_client
+from app.generation import AI_CATEGORIES
+from app.models import CustomUser
+from app.throttles import AIGenerationThrottle, AIRegenerationThrottle
+
+ROUTE_BASENAMES = {
+    'dsa': 'dsa-ai-response',
+    'development': 'software-dev-ai-response',
+    'system_design': 'system-design-ai-response',
+    'job_search': 'job-search-ai-response',
+}
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive generate_response/regenerate with N concurrent virtual users in-process "
+        "and report throughput, latency percentiles and saturation. Uses the local fake "
+        "Gemini backend unless --backend google is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help="Concurrent virtual users")
+        parser.add_argument('--requests', type=int, default=5, help="Requests per virtual user")
+        parser.add_argument('--category', choices=sorted(ROUTE_BASENAMES), default='dsa')
+        parser.add_argument(
+            '--regenerate-ratio', type=float, default=0.0,
+            help="Share of requests (after each user's first) that regenerate an earlier answer",
+        )
+        parser.add_argument(
+            '--repeat-ratio', type=float, default=0.0,
+            help="Share of questions drawn from a small shared pool (exercises caching/coalescing)",
+        )
+        parser.add_argument('--think-time', type=float, default=0.0, help="Seconds between a user's requests")
+        parser.add_argument('--backend', choices=['fake', 'google'], default='fake')
+        parser.add_argument('--latency-ms', type=float, help="Fake backend median latency")
+        parser.add_argument('--error-rate', type=float, help="Fake backend error rate")
+        parser.add_argument('--throttle', action='store_true', help="Keep the per-user AI throttles on")
+        parser.add_argument('--keep-data', action='store_true', help="Keep the AI responses created by the run")
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['requests'] < 1:
+            raise CommandError("--users and --requests must be at least 1")
+
+        self.configure_backend(options)
+        # Requests go through the test client in this process
+        settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+        if not options['throttle']:
+            for throttle_class in (AIGenerationThrottle, AIRegenerationThrottle):
+                throttle_class.THROTTLE_RATES = {**throttle_class.THROTTLE_RATES, throttle_class.scope: None}
+
+        ai_category = AI_CATEGORIES[options['category']]
+        basename = ROUTE_BASENAMES[options['category']]
+        users = [
+            CustomUser.objects.get_or_create(
+                email=f'loadtest-{i}@loadtest.invalid',
+                defaults={'username': f'loadtest-{i}'},
+            )[0]
+            for i in range(options['users'])
+        ]
+        last_pk_before = ai_category.model.objects.filter(user__in=users).values_list('pk', flat=True).order_by('-pk').first() or 0
+
+        self.results = []
+        self.results_lock = threading.Lock()
+        self.active = 0
+        self.samples = []
+        self.stopping = False
+
+        client = ai_client.get_client()
+        if hasattr(client, 'reset_stats'):
+            client.reset_stats()
+
+        self.stdout.write(
+            f"Running {options['users']} users x {options['requests']} requests "
+            f"against {options['category']} ({options['backend']} backend)"
+        )
+        sampler = threading.Thread(target=self.sample, daemon=True)
+        threads = [
+            threading.Thread(target=self.virtual_user, args=(user, index, basename, options))
+            for index, user in enumerate(users)
+        ]
+        start = time.monotonic()
+        sampler.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - start
+        self.stopping = True
+        sampler.join()
+
+        self.report(elapsed, options, client)
+
+        if not options['keep_data']:
+            ai_category.model.objects.filter(user__in=users, pk__gt=last_pk_before).delete()
+
+    def configure_backend(self, options):
+        settings.GEMINI_BACKEND = options['backend']
+        if options['backend'] == 'fake':
+            overrides = dict(settings.FAKE_GEMINI)
+            if options['latency_ms'] is not None:
+                overrides['LATENCY'] = {'distribution': 'lognormal', 'median_ms': options['latency_ms'], 'sigma': 0.5}
+            if options['error_rate'] is not None:
+                overrides['ERROR_RATE'] = options['error_rate']
+            settings.FAKE_GEMINI = overrides
+        ai_client.reset()
+
+    def virtual_user(self, user, index, basename, options):
+        client = Client()
+        client.force_login(user)
+        shared_questions = [f"Explain the standard approach to load test problem number {n}" for n in range(5)]
+        created_ids = []
+        try:
+            for n in range(options['requests']):
+                if created_ids and random.random() < options['regenerate_ratio']:
+                    op = 'regenerate'
+                    url = reverse(f'{basename}-regenerate', args=[random.choice(created_ids)])
+                    payload = {}
+                else:
+                    op = 'generate'
+                    url = reverse(f'{basename}-generate-response')
+                    if random.random() < options['repeat_ratio']:
+                        question = random.choice(shared_questions)
+                    else:
+                        question = f"Load test question {index}-{n}-{random.random():.8f}: how would you approach it?"
+                    payload = {'question': question}
+
+                with self.results_lock:
+                    self.active += 1
+                began = time.monotonic()
+                response = client.post(url, payload, content_type='application/json')
+                latency = time.monotonic() - began
+                with self.results_lock:
+                    self.active -= 1
+
+                if op == 'generate' and response.status_code == 201:
+                    created_ids.append(response.json()['data']['id'])
+                with self.results_lock:
+                    self.results.append((op, response.status_code, latency))
+                if options['think_time']:
+                    time.sleep(options['think_time'])
+        finally:
+            connection.close()
+
+    def sample(self):
+        while not self.stopping:
+            self.samples.append(self.active)
+            time.sleep(0.05)
+
+    def report(self, elapsed, options, client):
+        write = self.stdout.write
+        total = len(self.results)
+        statuses = Counter(status_code for _, status_code, _ in self.results)
+        ok = sum(count for status_code, count in statuses.items() if status_code < 400)
+
+        write("")
+        write(f"Requests:      {total} in {elapsed:.2f}s")
+        write(f"Throughput:    {total / elapsed:.2f} req/s ({ok / elapsed:.2f} successful req/s)")
+        write(f"Status codes:  {', '.join(f'{code}: {count}' for code, count in sorted(statuses.items()))}")
+
+        by_op = defaultdict(list)
+        for op, _, latency in self.results:
+            by_op[op].append(latency * 1000)
+        for op, latencies in sorted(by_op.items()):
+            latencies.sort()
+            write(
+                f"{op + ':':<15}n={len(latencies)} p50={percentile(latencies, 0.50):.0f}ms "
+                f"p90={percentile(latencies, 0.90):.0f}ms p99={percentile(latencies, 0.99):.0f}ms "
+                f"max={latencies[-1]:.0f}ms"
+            )
+
+        mean_active = sum(self.samples) / len(self.samples) if self.samples else 0
+        write(
+            f"Saturation:    {mean_active:.1f} of {options['users']} users waiting on a response on average "
+            f"({mean_active / options['users']:.0%}), peak {max(self.samples, default=0)}"
+        )
+        if hasattr(client, 'stats'):
+            stats = client.stats()
+            limit = settings.AI_ADMISSION['MAX_IN_FLIGHT'] if settings.AI_ADMISSION['ENABLED'] else math.inf
+            write(
+                f"Upstream:      {stats['calls']} calls, {stats['errors']} errors, "
+                f"mean {stats['mean_in_flight']} / peak {stats['peak_in_flight']} in flight (limit {limit})"
+            )
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from app.models import AIResponse, preview_for
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute the list preview of existing AI responses that have none "
+        "(new and edited responses get theirs when they are saved)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--all', action='store_true', help="Recompute every row (e.g. after changing PREVIEW_CHARS)")
+
+    def handle(self, *args, **options):
+        rows = AIResponse.objects.order_by('pk')
+        if not options['all']:
+            rows = rows.filter(preview='')
+
+        last_pk, updated = 0, 0
+        while True:
+            batch = list(rows.filter(pk__gt=last_pk).only('pk', 'response')[:options['batch_size']])
+            if not batch:
+                break
+            for row in batch:
+                row.preview = preview_for(row.response)
+            with transaction.atomic():
+                # bulk_update leaves updated_at alone: the answer itself is unchanged
+                AIResponse.objects.bulk_update(batch, ['preview'])
+            updated += len(batch)
+            last_pk = batch[-1].pk
+        self.stdout.write(f"Computed the preview of {updated} response(s)")
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from app.models import AIResponse, search_vector_for
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute the full-text search vector of existing AI responses that have none "
+        "(new and edited responses get theirs when they are saved)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--all', action='store_true', help="Recompute every row (e.g. after changing AI_SEARCH_CONFIG)")
+
+    def handle(self, *args, **options):
+        rows = AIResponse.objects.order_by('pk')
+        if not options['all']:
+            rows = rows.filter(search_vector__isnull=True)
+
+        last_pk, updated = 0, 0
+        while True:
+            batch = list(rows.filter(pk__gt=last_pk).only('pk', 'question', 'response')[:options['batch_size']])
+            if not batch:
+                break
+            # The texts are decompressed here and sent back for PostgreSQL to index
+            for row in batch:
+                row.search_vector = search_vector_for(row.question, row.response)
+            with transaction.atomic():
+                # bulk_update leaves updated_at alone: only the index column changes
+                AIResponse.objects.bulk_update(batch, ['search_vector'])
+            updated += len(batch)
+            last_pk = batch[-1].pk
+        self.stdout.write(f"Indexed {updated} response(s) for search")
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from app.models import AIResponse, split_tags
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the indexed `tags` array of existing AI responses from their comma-separated "
+        "`topic_tags` (rows saved since the array was added already have it)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--all', action='store_true', help="Recompute every row, not just ones with no tags yet")
+
+    def handle(self, *args, **options):
+        rows = AIResponse.objects.exclude(topic_tags='').order_by('pk')
+        if not options['all']:
+            rows = rows.filter(tags=[])
+
+        last_pk, updated = 0, 0
+        while True:
+            batch = list(rows.filter(pk__gt=last_pk).only('pk', 'topic_tags', 'tags')[:options['batch_size']])
+            if not batch:
+                break
+            changed = []
+            for row in batch:
+                tags = split_tags(row.topic_tags)
+                if tags != row.tags:
+                    row.tags = tags
+                    changed.append(row)
+            with transaction.atomic():
+                # bulk_update leaves updated_at alone: only the index column changes
+                AIResponse.objects.bulk_update(changed, ['tags'])
+            updated += len(changed)
+            last_pk = batch[-1].pk
+        self.stdout.write(f"Updated the tags of {updated} response(s)")
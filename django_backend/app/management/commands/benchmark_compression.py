@@ -0,0 +1,125 @@
+import gzip
+import json
+import random
+import time
+import brotli
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from app.generation import AI_CATEGORIES
+from app.middleware import compress_bytes, compress_stream
+from app.serializers import AI_RESPONSE_SERIALIZERS
+
+_WORDS = (
+    "array hash map index pointer window stack queue heap graph node edge tree "
+    "cache shard replica leader partition latency throughput request response "
+    "service database query transaction lock consistency availability scale "
+    "interview resume offer recruiter project impact metric team design review "
+    "the a an of to in for with on by and or is are be this that each every "
+    "time space complexity linear constant logarithmic worst average case"
+).split()
+
+
+def synthetic_answer(rng, size):
+    """Markdown shaped like a Gemini answer: headings, prose, bullets and a code block."""
+    parts = []
+    while sum(len(part) for part in parts) < size:
+        words = lambda n: ' '.join(rng.choice(_WORDS) for _ in range(n))
+        parts.append(f"## {words(3).title()}\n\n")
+        parts.append(f"{words(40).capitalize()}. The **{words(2)}** keeps {words(12)}.\n\n")
+        parts.extend(f"- {words(8)}\n" for _ in range(rng.randint(2, 5)))
+        parts.append(
+            f"\n```python\ndef {rng.choice(_WORDS)}_{rng.randint(1, 99)}(items):\n"
+            f"    seen = {{}}\n    for i, item in enumerate(items):\n"
+            f"        if item in seen:\n            return seen[item], i\n"
+            f"        seen[item] = i\n    return None\n```\n\n"
+        )
+    return ''.join(parts)[:size]
+
+
+def synthetic_page(rng, count, answer_chars):
+    """An AI response list body (the shape of GET /api/dsa-ai-responses/)."""
+    now = timezone.now().isoformat()
+    return JSONRenderer().render([
+        {
+            'id': index + 1,
+            'user': 'user@example.com',
+            'question': f"How do I solve problem {rng.randint(1, 3000)} with {rng.choice(_WORDS)}?",
+            'response': synthetic_answer(rng, int(answer_chars * rng.uniform(0.5, 1.5))),
+            'topic_tags': rng.sample(_WORDS, 3),
+            'difficulty': rng.choice(['easy', 'medium', 'hard']),
+            'problem_source': 'LeetCode',
+            'problem_id': str(rng.randint(1, 3000)),
+            'created_at': now,
+            'updated_at': now,
+            'is_helpful': None,
+        }
+        for index in range(count)
+    ])
+
+
+def stored_page(category, count):
+    """The newest `count` stored rows of a category, serialized like the list endpoint."""
+    ai_category = AI_CATEGORIES[category]
+    rows = ai_category.model.objects.select_related('user').order_by('-created_at')[:count]
+    return JSONRenderer().render(AI_RESPONSE_SERIALIZERS[category](rows, many=True).data)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure compression ratio and CPU time of the response compression middleware "
+        "(brotli and gzip at several levels) on AI response list payloads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', default='1,10,50', help="Comma-separated answers per list page")
+        parser.add_argument('--answer-chars', type=int, default=2500, help="Mean synthetic answer size")
+        parser.add_argument('--from-db', choices=sorted(AI_CATEGORIES), help="Use stored rows of this category instead")
+        parser.add_argument('--rounds', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        candidates = [
+            ('br q1', lambda data: brotli.compress(data, mode=brotli.MODE_TEXT, quality=1)),
+            ('br q4', lambda data: brotli.compress(data, mode=brotli.MODE_TEXT, quality=4)),
+            ('br q6', lambda data: brotli.compress(data, mode=brotli.MODE_TEXT, quality=6)),
+            ('br q11', lambda data: brotli.compress(data, mode=brotli.MODE_TEXT, quality=11)),
+            ('gzip 1', lambda data: gzip.compress(data, compresslevel=1, mtime=0)),
+            ('gzip 6', lambda data: gzip.compress(data, compresslevel=6, mtime=0)),
+            ('gzip 9', lambda data: gzip.compress(data, compresslevel=9, mtime=0)),
+            ('middleware br', lambda data: compress_bytes('br', data)),
+            ('middleware gzip', lambda data: compress_bytes('gzip', data)),
+        ]
+
+        for count in (int(count) for count in options['pages'].split(',')):
+            if options['from_db']:
+                body = stored_page(options['from_db'], count)
+                if body == b'[]':
+                    raise CommandError(f"No stored {options['from_db']} responses to benchmark")
+            else:
+                body = synthetic_page(rng, count, options['answer_chars'])
+            self.stdout.write(f"\n{len(json.loads(body))} answers, {len(body) / 1024:.1f} KiB of JSON")
+            self.stdout.write(f"  {'codec':<16}{'ratio':>8}{'size KiB':>10}{'ms':>9}{'MB/s':>9}")
+            for name, compress in candidates:
+                self.report(name, body, compress, options['rounds'])
+            self.report_stream(body, options['rounds'])
+
+    def report(self, name, body, compress, rounds):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            compressed = compress(body)
+        seconds = (time.perf_counter() - start) / rounds
+        self.stdout.write(
+            f"  {name:<16}{len(body) / len(compressed):>7.1f}x{len(compressed) / 1024:>10.1f}"
+            f"{seconds * 1000:>9.2f}{len(body) / seconds / 1e6:>9.1f}"
+        )
+
+    def report_stream(self, body, rounds):
+        """SSE-style streaming: the same body in ~60 byte events, flushed after each one."""
+        chunks = [body[offset:offset + 60] for offset in range(0, len(body), 60)]
+        for encoding in ('br', 'gzip'):
+            self.report(
+                f"stream {encoding}", body,
+                lambda data: b''.join(compress_stream(encoding, chunks)), rounds,
+            )
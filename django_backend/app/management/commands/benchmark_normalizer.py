@@ -0,0 +1,75 @@
+import re
+import time
+from django.core.management.base import BaseCommand
+from app.fake_gemini import _PARAGRAPH
+from app.normalizer import MarkdownNormalizer, normalize_markdown
+
+
+def legacy_clean_ai_response(response_text):
+    """The regex-based clean_ai_response that app/normalizer.py replaced, kept for comparison (also by app/tests.py)."""
+    response_text = re.sub(r'\*{3,}', '**', response_text)
+    response_text = re.sub(r'\*{2,}', '**', response_text)
+
+    code_blocks = re.findall(r'```.*?```', response_text, re.DOTALL)
+    for i, block in enumerate(code_blocks):
+        response_text = response_text.replace(block, f'__CODE_BLOCK_{i}__')
+
+    response_text = re.sub(r'\*([^*\n]+)\*', r'**\1**', response_text)
+
+    for i, block in enumerate(code_blocks):
+        response_text = response_text.replace(f'__CODE_BLOCK_{i}__', block)
+
+    response_text = re.sub(r'\n{3,}', '\n\n', response_text)
+    response_text = re.sub(r' +', ' ', response_text)
+
+    response_text = re.sub(r'^\*\*([^*]+)\*\*$', r'## \1', response_text, flags=re.MULTILINE)
+
+    response_text = re.sub(r'^\*\*   \*\*', '- ', response_text, flags=re.MULTILINE)
+    response_text = re.sub(r'^\*\*   ', '- ', response_text, flags=re.MULTILINE)
+
+    response_text = re.sub(r'```(\w+)?\n', r'```\1\n', response_text)
+
+    return response_text.strip()
+
+
+def _streamed(text, chunk_chars):
+    normalizer = MarkdownNormalizer()
+    out = [normalizer.feed(text[pos:pos + chunk_chars]) for pos in range(0, len(text), chunk_chars)]
+    out.append(normalizer.finish())
+    return ''.join(out)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of the incremental markdown normalizer with the legacy regex "
+        "clean_ai_response. Their output is checked by the normalizer tests in app/tests.py."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000', help="Comma-separated answer sizes in characters")
+        parser.add_argument('--chunk-chars', type=int, default=60, help="Chunk size for the streamed measurement")
+
+    def handle(self, *args, **options):
+        for size in (int(size) for size in options['sizes'].split(',')):
+            self.measure(size, options['chunk_chars'])
+
+    def measure(self, size, chunk_chars):
+        text = (_PARAGRAPH * (size // len(_PARAGRAPH) + 1))[:size]
+        rounds = max(1, 1_000_000 // size)
+        timings = {}
+        for name, fn in (
+            ('legacy', legacy_clean_ai_response),
+            ('whole', normalize_markdown),
+            ('streamed', lambda value: _streamed(value, chunk_chars)),
+        ):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                fn(text)
+            timings[name] = (time.perf_counter() - start) / rounds
+        megabytes = size / 1_000_000
+        self.stdout.write(
+            f"{size:>9} chars: " + '  '.join(
+                f"{name} {seconds * 1000:.2f}ms ({megabytes / seconds:.1f} MB/s)"
+                for name, seconds in timings.items()
+            )
+        )
@@ -0,0 +1,132 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from app.fields import decode_text
+from app import facets
+from app.generation import AI_CATEGORIES
+from app.models import AIResponse, AIJob, preview_for, search_vector_for, split_tags
+
+# Per-category tables the AI responses lived in before migration 0020
+LEGACY_TABLES = {
+    'dsa': 'app_dsaairesponse',
+    'development': 'app_softwaredevairesponse',
+    'system_design': 'app_systemdesignairesponse',
+    'job_search': 'app_jobsearchairesponse',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy AI responses from the old per-category tables into the unified AIResponse "
+        "table in id batches. Rows already copied are skipped, so it can be stopped and "
+        "re-run at any time; AI jobs that point at copied rows are updated to the new ids."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--category', choices=sorted(AI_CATEGORIES), help="Only this category")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--sleep', type=float, default=0.0, help="Seconds to pause between batches")
+        parser.add_argument(
+            '--drop-legacy-tables', action='store_true',
+            help="Drop each old table once every one of its rows has been copied",
+        )
+
+    def handle(self, *args, **options):
+        keys = [options['category']] if options['category'] else sorted(AI_CATEGORIES)
+        existing = set(connection.introspection.table_names())
+        # Jobs last written before the switch to the unified table refer to old ids
+        switched_at = MigrationRecorder.Migration.objects.get(app='app', name='0020_unified_ai_response').applied
+
+        for key in keys:
+            table = LEGACY_TABLES[key]
+            if table not in existing:
+                self.stdout.write(f"{key}: {table} does not exist, nothing to copy")
+                continue
+            copied = self.copy(key, table, switched_at, options['batch_size'], options['sleep'])
+            self.stdout.write(f"{key}: copied {copied} row(s)")
+            if options['drop_legacy_tables']:
+                self.drop(key, table)
+
+    def copy(self, key, table, switched_at, batch_size, pause):
+        keys = [attr.key for attr in AI_CATEGORIES[key].model.metadata_attributes()]
+        columns = [
+            'id', 'user_id', 'question', 'response', 'response_data', 'response_html',
+            'response_html_digest', 'topic_tags', 'is_helpful', *keys,
+        ]
+        jobs = self.jobs_to_remap(key, table, switched_at)
+        copied, last_id = 0, 0
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT {', '.join(columns)} FROM {table} t WHERE t.id > %s AND NOT EXISTS ("
+                    "SELECT 1 FROM app_airesponse r WHERE r.category = %s AND r.legacy_id = t.id"
+                    f") ORDER BY t.id LIMIT %s",
+                    [last_id, key, batch_size],
+                )
+                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            if not rows:
+                return copied
+
+            with transaction.atomic():
+                objs = AIResponse.objects.bulk_create([self.build(key, keys, row) for row in rows])
+                with connection.cursor() as cursor:
+                    # bulk_create stamps both timestamps with now(); keep the original ones
+                    cursor.execute(
+                        f"UPDATE app_airesponse r SET created_at = t.created_at, updated_at = t.updated_at "
+                        f"FROM {table} t WHERE r.category = %s AND r.legacy_id = t.id AND t.id = ANY(%s)",
+                        [key, [row['id'] for row in rows]],
+                    )
+                facets.record_created(objs)
+                new_ids = {obj.legacy_id: obj.pk for obj in objs}
+                for job_id, object_id in list(jobs.items()):
+                    if object_id in new_ids:
+                        AIJob.objects.filter(pk=job_id).update(object_id=new_ids[object_id])
+                        del jobs[job_id]
+
+            copied += len(rows)
+            last_id = rows[-1]['id']
+            if pause:
+                time.sleep(pause)
+
+    def build(self, key, keys, row):
+        # Rows never converted by migration 0019 still have their text in `response`
+        text = decode_text(row['response_data'])
+        response = text if text is not None else row['response'] or ''
+        return AIResponse(
+            user_id=row['user_id'],
+            category=key,
+            question=row['question'],
+            response=response,
+            response_html=row['response_html'],
+            response_html_digest=row['response_html_digest'],
+            topic_tags=row['topic_tags'],
+            tags=split_tags(row['topic_tags']),
+            search_vector=search_vector_for(row['question'], response),
+            preview=preview_for(response),
+            metadata={k: row[k] for k in keys},
+            is_helpful=row['is_helpful'],
+            legacy_id=row['id'],
+        )
+
+    def jobs_to_remap(self, key, table, switched_at):
+        """{job id: old object id} of this category's jobs pointing at rows not copied yet."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT j.id, j.object_id FROM app_aijob j JOIN {table} t ON t.id = j.object_id "
+                "WHERE j.category = %s AND j.updated_at < %s AND NOT EXISTS ("
+                "SELECT 1 FROM app_airesponse r WHERE r.category = %s AND r.legacy_id = j.object_id)",
+                [key, switched_at, key],
+            )
+            return dict(cursor.fetchall())
+
+    def drop(self, key, table):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {table}")
+            legacy = cursor.fetchone()[0]
+        copied = AIResponse.objects.filter(category=key, legacy_id__isnull=False).count()
+        if copied < legacy:
+            raise CommandError(f"{key}: only {copied} of {legacy} row(s) copied, not dropping {table}")
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE {table}")
+        self.stdout.write(f"{key}: dropped {table}")
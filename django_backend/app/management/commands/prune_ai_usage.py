@@ -0,0 +1,29 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from app.models import AIUsageRecord
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete usage ledger rows older than AI_USAGE_RETENTION_DAYS, in batches "
+        "so no long-running delete holds locks (schedule it daily, e.g. from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help="Override AI_USAGE_RETENTION_DAYS")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.AI_USAGE_RETENTION_DAYS
+        cutoff = timezone.now() - timedelta(days=days)
+        expired = AIUsageRecord.objects.filter(created_at__lt=cutoff)
+
+        deleted = 0
+        while True:
+            batch = list(expired.order_by('created_at').values_list('pk', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            deleted += AIUsageRecord.objects.filter(pk__in=batch).delete()[0]
+        self.stdout.write(f"Deleted {deleted} usage record(s) older than {days} day(s)")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from app import facets
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the AI response facet counters from the stored responses (after a "
+        "bulk import, or to repair drift). Run backfill_ai_response_tags first; tag "
+        "counts are read from the `tags` array. Writes to AI responses wait until it finishes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help="Only this user id")
+
+    def handle(self, *args, **options):
+        facets.rebuild(options['user'])
+        self.stdout.write("Rebuilt AI response facet counts")
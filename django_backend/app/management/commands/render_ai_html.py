@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from app.generation import AI_CATEGORIES
+from app.rendering import render_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the stored HTML of existing AI responses that have none yet "
+        "(new and regenerated answers are rendered in the background automatically)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--category', choices=sorted(AI_CATEGORIES), help="Only this category")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--all', action='store_true', help="Check every row, not just unrendered ones")
+
+    def handle(self, *args, **options):
+        keys = [options['category']] if options['category'] else sorted(AI_CATEGORIES)
+        for key in keys:
+            model = AI_CATEGORIES[key].model
+            rows = model.objects.order_by('pk')
+            if not options['all']:
+                rows = rows.filter(response_html_digest='')
+
+            last_pk, done = 0, 0
+            while True:
+                pks = list(rows.filter(pk__gt=last_pk).values_list('pk', flat=True)[:options['batch_size']])
+                if not pks:
+                    break
+                render_rows(model, pks)
+                last_pk = pks[-1]
+                done += len(pks)
+            self.stdout.write(f"{key}: checked {done} row(s)")
@@ -0,0 +1,74 @@
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from app import ai_client, metrics
+from app.jobs import claim_jobs, run_job, default_worker_id
+
+
+class Command(BaseCommand):
+    help = "Process queued AI generation jobs with a bounded pool of worker threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.AI_WORKER_CONCURRENCY,
+            help="Maximum number of jobs processed at the same time",
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.AI_WORKER_POLL_INTERVAL,
+            help="Seconds to sleep when the queue is empty",
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Drain the currently runnable jobs and exit",
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        poll_interval = options['poll_interval']
+        worker_id = default_worker_id()
+        self.stopping = False
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        ai_client.warm()
+        self.stdout.write(f"AI worker {worker_id} started with concurrency={concurrency}")
+
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='ai-job') as pool:
+            while not self.stopping:
+                close_old_connections()
+                metrics.flush_if_due()
+                jobs = claim_jobs(worker_id, concurrency - len(in_flight))
+                for job in jobs:
+                    in_flight.add(pool.submit(self._run, job, worker_id))
+
+                if not in_flight:
+                    if options['once']:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                # Wait for a free slot (or a short timeout to pick up new work)
+                done, in_flight = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+
+            if in_flight:
+                self.stdout.write(f"Waiting for {len(in_flight)} in-flight job(s) to finish")
+                wait(in_flight)
+        metrics.flush()
+
+        self.stdout.write(f"AI worker {worker_id} stopped")
+
+    def _run(self, job, worker_id):
+        try:
+            run_job(job, worker_id)
+            self.stdout.write(f"Job #{job.pk} ({job.category} {job.kind}): {job.status}")
+        finally:
+            # Each pool thread has its own DB connection
+            connection.close()
+
+    def _stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,92 @@
+"""
+Counters for the AI performance features, exposed to admins at /api/ai-metrics/.
+
+Increments are summed in memory and added to the AIMetricCounter table at most
+every AI_METRICS_FLUSH_INTERVAL seconds (at the end of a request, or from the
+loop of `run_ai_worker`), so every worker process reports into the same totals
+without a write per increment. Reading the counters flushes the calling
+process first. Features register a section provider that turns their counters
+into the JSON shown by the endpoint.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DatabaseError, connection
+from .models import AIMetricCounter
+
+logger = logging.getLogger(__name__)
+
+_sections = {}
+_pending = Counter()
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+_snapshot = threading.local()
+
+
+def incr(name, amount=1):
+    with _pending_lock:
+        _pending[name] += amount
+
+
+def flush():
+    """Add this process's pending increments to the shared counters."""
+    global _last_flush
+    with _pending_lock:
+        batch = {name: amount for name, amount in _pending.items() if amount}
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not batch:
+        return
+    table = connection.ops.quote_name(AIMetricCounter._meta.db_table)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (name, value) VALUES {', '.join(['(%s, %s)'] * len(batch))} "
+                f"ON CONFLICT (name) DO UPDATE SET value = {table}.value + EXCLUDED.value",
+                [param for item in sorted(batch.items()) for param in item],
+            )
+    except DatabaseError:
+        logger.exception("Could not write %d AI metric counters", len(batch))
+        with _pending_lock:
+            _pending.update(batch)
+
+
+def flush_if_due(**kwargs):
+    if time.monotonic() - _last_flush >= settings.AI_METRICS_FLUSH_INTERVAL:
+        flush()
+
+
+request_finished.connect(flush_if_due, dispatch_uid='ai_metrics_flush')
+atexit.register(flush)
+
+
+def get_counters(*names):
+    """Return {name: value} for the given counters (missing counters are 0)."""
+    found = getattr(_snapshot, 'values', None)
+    if found is None:
+        flush()
+        found = dict(AIMetricCounter.objects.filter(name__in=names).values_list('name', 'value'))
+    return {name: found.get(name, 0) for name in names}
+
+
+def ratio(part, total):
+    return round(part / total, 4) if total else None
+
+
+def register_section(name, provider):
+    """Register `provider()` to build the `name` section of the metrics snapshot."""
+    _sections[name] = provider
+
+
+def snapshot():
+    # One read of every counter serves all the sections
+    flush()
+    _snapshot.values = dict(AIMetricCounter.objects.values_list('name', 'value'))
+    try:
+        return {name: provider() for name, provider in _sections.items()}
+    finally:
+        del _snapshot.values
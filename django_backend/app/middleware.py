@@ -0,0 +1,196 @@
+"""
+Content-negotiated brotli/gzip compression for API responses.
+
+Like django.middleware.gzip.GZipMiddleware, but:
+
+- the encoding is negotiated from Accept-Encoding (q-values honoured), with
+  brotli preferred over gzip when both are equally acceptable;
+- only the content types in COMPRESSION['CONTENT_TYPES'] (DRF JSON and
+  Server-Sent Events by default) are compressed, and only bodies of at least
+  COMPRESSION['MIN_SIZE'] bytes;
+- streaming responses are compressed chunk by chunk and flushed after every
+  chunk, so each SSE event still reaches the client as soon as it is sent;
+- a view can opt out with the @skip_compression decorator (used for tiny
+  payloads and for responses carrying secrets such as the CSRF token, which
+  must not be compressed next to attacker-influenced text - BREACH).
+"""
+import re
+import zlib
+from functools import wraps
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from . import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+_CODING = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*')
+
+
+def skip_compression(view):
+    """Never compress the responses of this view (function view, APIView method or @action)."""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        response = view(*args, **kwargs)
+        response.skip_compression = True
+        return response
+    return wrapped
+
+
+def accepted_encodings(header):
+    """{coding: q} from an Accept-Encoding header."""
+    accepted = {}
+    for part in header.split(','):
+        match = _CODING.fullmatch(part)
+        if not match:
+            continue
+        try:
+            q = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+        accepted[match.group(1).lower()] = q
+    return accepted
+
+
+def choose_encoding(header):
+    """'br', 'gzip' or None for this Accept-Encoding header."""
+    accepted = accepted_encodings(header)
+    wildcard = accepted.get('*', 0.0)
+    best, best_q = None, 0.0
+    for coding in ('br', 'gzip'):
+        if coding == 'br' and brotli is None:
+            continue
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class _GzipStream:
+
+    def __init__(self, level):
+        # wbits=31: gzip container
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def compressor_for(encoding):
+    config = settings.COMPRESSION
+    if encoding == 'br':
+        return _BrotliStream(config['BROTLI_QUALITY'])
+    return _GzipStream(config['GZIP_LEVEL'])
+
+
+def compress_bytes(encoding, data):
+    compressor = compressor_for(encoding)
+    return compressor.compress(data) + compressor.finish()
+
+
+def compress_stream(encoding, chunks):
+    """Compress an iterable of byte chunks, flushing after each one."""
+    compressor = compressor_for(encoding)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def acompress_stream(encoding, chunks):
+    compressor = compressor_for(encoding)
+    async for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """Settings: COMPRESSION = {'MIN_SIZE', 'CONTENT_TYPES', 'BROTLI_QUALITY', 'GZIP_LEVEL', 'STREAMING'}."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.process_response(request, self.get_response(request))
+
+    def process_response(self, request, response):
+        config = settings.COMPRESSION
+        if getattr(response, 'skip_compression', False) or response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in config['CONTENT_TYPES']:
+            return response
+        if response.streaming:
+            if not config['STREAMING']:
+                return response
+        elif len(response.content) < config['MIN_SIZE']:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_stream(encoding, response.streaming_content)
+            else:
+                response.streaming_content = compress_stream(encoding, response.streaming_content)
+            # The compressed size isn't known until the stream ends
+            del response.headers['Content-Length']
+            metrics.incr(f'compression_{encoding}_streams')
+        else:
+            compressed = compress_bytes(encoding, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            metrics.incr(f'compression_{encoding}_responses')
+            metrics.incr('compression_bytes_in', len(response.content))
+            metrics.incr('compression_bytes_out', len(compressed))
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # The representation changed, so a strong ETag becomes weak (RFC 9110 8.8.1)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+
+def _metrics_section():
+    counters = metrics.get_counters(
+        'compression_br_responses', 'compression_gzip_responses',
+        'compression_br_streams', 'compression_gzip_streams',
+        'compression_bytes_in', 'compression_bytes_out',
+    )
+    counters['ratio'] = metrics.ratio(counters['compression_bytes_out'], counters['compression_bytes_in'])
+    return counters
+
+
+metrics.register_section('compression', _metrics_section)
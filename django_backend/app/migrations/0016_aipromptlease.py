@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-17 07:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_aijob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIPromptLease',
+            fields=[
+                ('prompt_hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('owner', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('result', models.TextField(blank=True)),
+                ('error', models.TextField(blank=True)),
+                ('expires_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'AI Prompt Lease',
+                'verbose_name_plural': 'AI Prompt Leases',
+                'indexes': [models.Index(fields=['expires_at'], name='app_aipromp_expires_cf3e7d_idx')],
+            },
+        ),
+    ]
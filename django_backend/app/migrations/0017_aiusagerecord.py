@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-17 07:08
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0016_aipromptlease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIUsageRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('dsa', 'Data Structures & Algorithms'), ('development', 'Development'), ('system_design', 'System Design'), ('job_search', 'Job Search')], max_length=20)),
+                ('template', models.CharField(blank=True, max_length=50)),
+                ('streamed', models.BooleanField(default=False)),
+                ('cache_hit', models.BooleanField(default=False)),
+                ('prompt_tokens', models.PositiveIntegerField(default=0)),
+                ('output_tokens', models.PositiveIntegerField(default=0)),
+                ('wall_time_ms', models.PositiveIntegerField(default=0)),
+                ('error_class', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ai_usage', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'AI Usage Record',
+                'verbose_name_plural': 'AI Usage Records',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='app_aiusage_created_0f197b_idx'), models.Index(fields=['category', 'created_at'], name='app_aiusage_categor_ca12d1_idx'), models.Index(fields=['user', 'created_at'], name='app_aiusage_user_id_71ac75_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.7 on 2026-10-17 07:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0017_aiusagerecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dsaairesponse',
+            name='response_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='dsaairesponse',
+            name='response_html_digest',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='jobsearchairesponse',
+            name='response_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='jobsearchairesponse',
+            name='response_html_digest',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='softwaredevairesponse',
+            name='response_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='softwaredevairesponse',
+            name='response_html_digest',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='systemdesignairesponse',
+            name='response_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='systemdesignairesponse',
+            name='response_html_digest',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+    ]
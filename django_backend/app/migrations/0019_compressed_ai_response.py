@@ -0,0 +1,80 @@
+"""
+Move the AI answers to a compressed bytea column without rewriting the tables.
+
+The new `response_data` column starts out empty (a constant default, so adding
+it is instant) and the old `response` text column becomes `response_legacy`.
+Existing rows are not converted here: `manage.py migrate_ai_responses` (after
+migration 0020) reads each row from either column and writes it to the unified
+AIResponse table in compressed form.
+"""
+from django.db import migrations, models
+import app.fields
+
+# (model name, table, help text of `response`)
+AI_RESPONSE_MODELS = [
+    ('dsaairesponse', 'app_dsaairesponse', 'AI generated response for the DSA question'),
+    ('softwaredevairesponse', 'app_softwaredevairesponse', 'AI generated response for the software development question'),
+    ('systemdesignairesponse', 'app_systemdesignairesponse', 'AI generated response for the system design question'),
+    ('jobsearchairesponse', 'app_jobsearchairesponse', 'AI generated response for the job search question'),
+]
+
+
+def restore_legacy_text(apps, schema_editor):
+    """Reverse: copy converted answers back into the text column before response_data is dropped."""
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        for _, table, _ in AI_RESPONSE_MODELS:
+            cursor.execute(f'SELECT id, response_data FROM {table} WHERE response IS NULL')
+            for pk, data in cursor.fetchall():
+                with connection.cursor() as update:
+                    update.execute(
+                        f'UPDATE {table} SET response = %s WHERE id = %s',
+                        [app.fields.decode_text(data) or '', pk],
+                    )
+
+
+def operations():
+    database_operations = [
+        migrations.RunSQL(
+            sql=(
+                f"ALTER TABLE {table} ADD COLUMN response_data bytea NOT NULL DEFAULT ''::bytea;"
+                f"ALTER TABLE {table} ALTER COLUMN response DROP NOT NULL;"
+            ),
+            reverse_sql=(
+                f"ALTER TABLE {table} ALTER COLUMN response SET NOT NULL;"
+                f"ALTER TABLE {table} DROP COLUMN response_data;"
+            ),
+        )
+        for _, table, _ in AI_RESPONSE_MODELS
+    ]
+    database_operations.append(migrations.RunPython(migrations.RunPython.noop, restore_legacy_text))
+
+    state_operations = []
+    for model_name, _, help_text in AI_RESPONSE_MODELS:
+        state_operations += [
+            migrations.AlterField(
+                model_name=model_name,
+                name='response',
+                field=app.fields.CompressedTextField(db_column='response_data', help_text=help_text),
+            ),
+            migrations.AddField(
+                model_name=model_name,
+                name='response_legacy',
+                field=models.TextField(blank=True, db_column='response', editable=False, null=True),
+            ),
+        ]
+    return [
+        migrations.SeparateDatabaseAndState(
+            database_operations=database_operations,
+            state_operations=state_operations,
+        ),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0018_ai_response_html'),
+    ]
+
+    operations = operations()
@@ -0,0 +1,132 @@
+"""
+One table for the AI responses of every category.
+
+AIResponse holds the common columns plus the category-specific fields in a
+JSONB `metadata` column; the four per-category models become proxies of it.
+Existing rows are copied over in batches by `manage.py migrate_ai_responses`.
+"""
+
+import app.fields
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0019_compressed_ai_response'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIResponse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('dsa', 'Data Structures & Algorithms'), ('development', 'Development'), ('system_design', 'System Design'), ('job_search', 'Job Search')], max_length=20)),
+                ('question', models.TextField(help_text='The question asked by the user')),
+                ('response', app.fields.CompressedTextField(help_text='AI generated response for the question')),
+                ('response_html', models.TextField(blank=True, editable=False)),
+                ('response_html_digest', models.CharField(blank=True, editable=False, max_length=32)),
+                ('topic_tags', models.CharField(blank=True, help_text="Comma-separated tags like 'arrays,sorting,binary-search'", max_length=255)),
+                ('metadata', models.JSONField(blank=True, default=dict, help_text='Category-specific fields')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_helpful', models.BooleanField(blank=True, help_text='User feedback on response helpfulness', null=True)),
+                ('legacy_id', models.PositiveBigIntegerField(blank=True, editable=False, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ai_responses', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'AI Response',
+                'verbose_name_plural': 'AI Responses',
+                'ordering': ['-created_at'],
+            },
+        ),
+        # The per-category tables stay in the database until `manage.py migrate_ai_responses`
+        # has copied their rows (and drops them with --drop-legacy-tables).
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.DeleteModel(
+                    name='DSAAIResponse',
+                ),
+                migrations.DeleteModel(
+                    name='JobSearchAIResponse',
+                ),
+                migrations.DeleteModel(
+                    name='SoftwareDevAIResponse',
+                ),
+                migrations.DeleteModel(
+                    name='SystemDesignAIResponse',
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='airesponse',
+            index=models.Index(fields=['user', '-created_at'], name='app_airespo_user_id_b1cdce_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='airesponse',
+            index=models.Index(fields=['user', 'category', '-created_at'], name='app_airespo_user_id_bfeb9a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='airesponse',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['metadata'], name='app_airesponse_metadata_gin', opclasses=['jsonb_path_ops']),
+        ),
+        migrations.AddConstraint(
+            model_name='airesponse',
+            constraint=models.UniqueConstraint(condition=models.Q(('legacy_id__isnull', False)), fields=('category', 'legacy_id'), name='unique_ai_response_legacy_id'),
+        ),
+        migrations.CreateModel(
+            name='DSAAIResponse',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'DSA AI Response',
+                'verbose_name_plural': 'DSA AI Responses',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('app.airesponse',),
+        ),
+        migrations.CreateModel(
+            name='JobSearchAIResponse',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'Job Search AI Response',
+                'verbose_name_plural': 'Job Search AI Responses',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('app.airesponse',),
+        ),
+        migrations.CreateModel(
+            name='SoftwareDevAIResponse',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'Software Development AI Response',
+                'verbose_name_plural': 'Software Development AI Responses',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('app.airesponse',),
+        ),
+        migrations.CreateModel(
+            name='SystemDesignAIResponse',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'System Design AI Response',
+                'verbose_name_plural': 'System Design AI Responses',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('app.airesponse',),
+        ),
+    ]
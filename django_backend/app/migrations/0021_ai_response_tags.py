@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-17 07:37
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0020_unified_ai_response'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='airesponse',
+            name='tags',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.AddIndex(
+            model_name='airesponse',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tags'], name='app_airesponse_tags_gin'),
+        ),
+    ]
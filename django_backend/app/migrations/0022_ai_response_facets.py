@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-17 07:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0021_ai_response_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIResponseFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('dsa', 'Data Structures & Algorithms'), ('development', 'Development'), ('system_design', 'System Design'), ('job_search', 'Job Search')], max_length=20)),
+                ('facet', models.CharField(max_length=30)),
+                ('value', models.CharField(blank=True, max_length=255)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ai_response_facets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'AI Response Facet',
+                'verbose_name_plural': 'AI Response Facets',
+                'constraints': [models.UniqueConstraint(fields=('user', 'category', 'facet', 'value'), name='unique_ai_response_facet')],
+            },
+        ),
+    ]
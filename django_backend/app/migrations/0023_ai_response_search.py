@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-17 07:41
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0022_ai_response_facets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='airesponse',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='airesponse',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='app_airesponse_search_gin'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-17 08:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0023_ai_response_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='airesponse',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='app_airespo_user_id_58e6c7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='airesponse',
+            index=models.Index(fields=['user', 'category', '-created_at', '-id'], name='app_airespo_user_id_ede570_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='app_task_user_id_ebc39e_idx'),
+        ),
+        # Drop the old indexes only once their replacements exist
+        migrations.RemoveIndex(
+            model_name='airesponse',
+            name='app_airespo_user_id_b1cdce_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='airesponse',
+            name='app_airespo_user_id_bfeb9a_idx',
+        ),
+    ]
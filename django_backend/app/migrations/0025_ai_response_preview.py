@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-17 07:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0024_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='airesponse',
+            name='preview',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-17 07:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0025_ai_response_preview'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='aijob',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='app_aijob_user_id_ef139b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'category', 'completed', 'due_date', '-created_at'], name='app_task_user_id_31f2be_idx'),
+        ),
+        # After the replacement exists, so job lists always have an index
+        migrations.RemoveIndex(
+            model_name='aijob',
+            name='app_aijob_user_id_8768c3_idx',
+        ),
+    ]
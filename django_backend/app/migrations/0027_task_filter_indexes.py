@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-17 07:57
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0026_query_plan_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'priority', 'id'], name='app_task_user_id_7419bd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('completed', False)), fields=['user', 'due_date', 'id'], name='app_task_open_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tags'], name='app_task_tags_gin', opclasses=['jsonb_path_ops']),
+        ),
+        # Single-column indexes the user-scoped composites above replace
+        migrations.RemoveIndex(
+            model_name='task',
+            name='app_task_categor_b5e931_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='app_task_complet_e03d5c_idx',
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-17 08:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0027_task_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIMetricCounter',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'AI Metric Counter',
+                'verbose_name_plural': 'AI Metric Counters',
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.7 on 2026-10-17 08:44
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0028_ai_metric_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIStream',
+            fields=[
+                ('stream_id', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('category', models.CharField(choices=[('dsa', 'Data Structures & Algorithms'), ('development', 'Development'), ('system_design', 'System Design'), ('job_search', 'Job Search')], max_length=20)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='running', max_length=10)),
+                ('chunks', django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), blank=True, default=list, size=None)),
+                ('object_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('expires_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ai_streams', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'AI Stream',
+                'verbose_name_plural': 'AI Streams',
+                'indexes': [models.Index(fields=['expires_at'], name='app_aistrea_expires_056278_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-17 08:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0029_ai_stream'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aipromptlease',
+            name='retry_after',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='aipromptlease',
+            name='status_code',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
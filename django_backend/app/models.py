@@ -1,8 +1,14 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from datetime import timedelta
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.conf import settings
+from django.db.models import Value
+from .fields import CompressedTextField
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, username, password=None, **extra_fields):
@@ -61,9 +67,17 @@ class Task(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        # Every query is scoped to one user, so every index leads with it
         indexes = [
-            models.Index(fields=['category']),
-            models.Index(fields=['completed']),
+            # Keyset pages of a user's tasks (app/pagination.py)
+            models.Index(fields=['user', '-created_at', '-id']),
+            # ?category=&completed= filters, and the task context order (app/task_context.py)
+            models.Index(fields=['user', 'category', 'completed', 'due_date', '-created_at']),
+            # ?priority_min=&priority_max= ranges and ?ordering=priority
+            models.Index(fields=['user', 'priority', 'id']),
+            # Due-date windows and ?ordering=due_date over open tasks, the usual case
+            models.Index(fields=['user', 'due_date', 'id'], condition=models.Q(completed=False), name='app_task_open_due_idx'),
+            GinIndex(fields=['tags'], opclasses=['jsonb_path_ops'], name='app_task_tags_gin'),
         ]
 
     def __str__(self):
@@ -215,18 +229,188 @@ class Goal(models.Model):
             self.save()
 
 
-class DSAAIResponse(models.Model):
-    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='dsa_ai_responses')
-    question = models.TextField(help_text="The DSA question asked by the user")
-    response = models.TextField(help_text="AI generated response for the DSA question")
-    
-    # Optional: Add tags/topics for better categorization
+def split_tags(value):
+    """Tags of a comma-separated topic_tags string, in order and without duplicates."""
+    return list(dict.fromkeys(tag.strip() for tag in value.split(',') if tag.strip()))
+
+
+# Only the start of very long answers is indexed for search (tsvectors are limited to 1 MB)
+SEARCH_MAX_CHARS = 100_000
+
+
+def search_vector_for(question, response):
+    """
+    AIResponse.search_vector of a row with these texts, computed by PostgreSQL from
+    the values sent with the write (it can't read the compressed `response` column).
+    Question words weigh more than answer words (see app/search.py).
+    """
+    config = settings.AI_SEARCH_CONFIG
+    return (
+        SearchVector(Value(question or ''), weight='A', config=config)
+        + SearchVector(Value((response or '')[:SEARCH_MAX_CHARS]), weight='B', config=config)
+    )
+
+
+# Length of AIResponse.preview, the summary list views show instead of the whole answer
+PREVIEW_CHARS = 200
+
+
+def preview_for(response):
+    """
+    AIResponse.preview of an answer: its heading when it opens with one, else its
+    first PREVIEW_CHARS characters with whitespace collapsed.
+    """
+    text = (response or '').strip()
+    first_line = text.split('\n', 1)[0]
+    if first_line.startswith('#'):
+        return first_line.lstrip('#').strip()[:PREVIEW_CHARS]
+    text = ' '.join(text.split())
+    if len(text) <= PREVIEW_CHARS:
+        return text
+    return text[:PREVIEW_CHARS - 1].rstrip() + '\u2026'
+
+
+class MetadataAttribute(property):
+    """
+    A category-specific AI response field, stored under `key` (the attribute
+    name by default) in AIResponse.metadata. Reads fall back to `default`;
+    saving the row writes every attribute of its category into metadata, so
+    containment filters (metadata__contains={...}) use the GIN index.
+    """
+
+    def __init__(self, default='', choices=None, max_length=None, help_text='', key=None):
+        self.default = default
+        self.choices = choices
+        self.max_length = max_length
+        self.help_text = help_text
+        self.key = key
+        super().__init__(self._get, self._set)
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.key = self.key or name
+
+    def _get(self, instance):
+        return instance.metadata.get(self.key, self.default)
+
+    def _set(self, instance, value):
+        instance.metadata[self.key] = value
+
+
+class AIResponseCategoryManager(models.Manager):
+    """Manager of the per-category AIResponse proxies: only that category's rows."""
+
+    def __init__(self, category):
+        super().__init__()
+        self.category = category
+
+    def get_queryset(self):
+        return super().get_queryset().filter(category=self.category)
+
+
+class AIResponse(models.Model):
+    """
+    Every AI answer, for all categories, in one table. Category-specific fields
+    live in the `metadata` JSONB column (GIN indexed); the per-category proxy
+    models below expose them as attributes. Rows copied from the original
+    per-category tables keep their old id in `legacy_id`.
+    """
+    CATEGORY = None  # Set by the per-category proxies
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='ai_responses')
+    category = models.CharField(max_length=20, choices=Category.choices)
+    question = models.TextField(help_text="The question asked by the user")
+    response = CompressedTextField(help_text="AI generated response for the question")
+    # Start of `response`, set on save, so lists never read the answer itself (`manage.py backfill_ai_response_previews`)
+    preview = models.CharField(max_length=PREVIEW_CHARS, blank=True, editable=False)
+
+    # Sanitized HTML of `response`, rendered in the background (app/rendering.py)
+    response_html = models.TextField(blank=True, editable=False)
+    response_html_digest = models.CharField(max_length=32, blank=True, editable=False)
+
     topic_tags = models.CharField(
-        max_length=255, 
-        blank=True, 
+        max_length=255,
+        blank=True,
         help_text="Comma-separated tags like 'arrays,sorting,binary-search'"
     )
-    
+    # topic_tags split into an indexed array, kept in sync on save (`manage.py backfill_ai_response_tags`)
+    tags = ArrayField(models.CharField(max_length=255), default=list, blank=True, editable=False)
+    metadata = models.JSONField(default=dict, blank=True, help_text="Category-specific fields")
+    # Full-text search document, set on every write of question/response (app/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # User interaction tracking
+    is_helpful = models.BooleanField(
+        null=True,
+        blank=True,
+        help_text="User feedback on response helpfulness"
+    )
+
+    # Id in the per-category table the row was copied from (`manage.py migrate_ai_responses`)
+    legacy_id = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'AI Response'
+        verbose_name_plural = 'AI Responses'
+        indexes = [
+            # Keyset pages (app/pagination.py) of a user's history, all categories or one
+            models.Index(fields=['user', '-created_at', '-id']),
+            models.Index(fields=['user', 'category', '-created_at', '-id']),
+            GinIndex(fields=['metadata'], opclasses=['jsonb_path_ops'], name='app_airesponse_metadata_gin'),
+            GinIndex(fields=['tags'], name='app_airesponse_tags_gin'),
+            GinIndex(fields=['search_vector'], name='app_airesponse_search_gin'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['category', 'legacy_id'],
+                condition=models.Q(legacy_id__isnull=False),
+                name='unique_ai_response_legacy_id',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_category_display()} Q&A: {self.question[:50]}... - {self.user.username}"
+
+    @classmethod
+    def metadata_attributes(cls):
+        return [attr for attr in vars(cls).values() if isinstance(attr, MetadataAttribute)]
+
+    def save(self, *args, **kwargs):
+        if not self.category and self.CATEGORY:
+            self.category = self.CATEGORY
+        for attr in self.metadata_attributes():
+            self.metadata.setdefault(attr.key, attr.default)
+        self.tags = split_tags(self.topic_tags)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'question', 'response'} & set(update_fields):
+            self.search_vector = search_vector_for(self.question, self.response)
+        if update_fields is None or 'response' in update_fields:
+            self.preview = preview_for(self.response)
+        if update_fields is not None:
+            derived = {'topic_tags': ['tags'], 'question': ['search_vector'], 'response': ['search_vector', 'preview']}
+            kwargs['update_fields'] = {*update_fields, *(d for f in update_fields for d in derived.get(f, []))}
+        # The facet counters (app/facets.py) change in the same transaction as the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def get_topic_tags_list(self):
+        """Return topic tags as a list"""
+        return split_tags(self.topic_tags)
+
+    def set_topic_tags_from_list(self, tags_list):
+        """Set topic tags from a list"""
+        self.topic_tags = ','.join(tags_list)
+
+
+class DSAAIResponse(AIResponse):
+    """DSA AI Responses: the `dsa` rows of AIResponse."""
+    CATEGORY = Category.DSA
+
     # Difficulty level if applicable
     DIFFICULTY_CHOICES = [
         ('easy', 'Easy'),
@@ -234,74 +418,40 @@ class DSAAIResponse(models.Model):
         ('hard', 'Hard'),
         ('unknown', 'Unknown'),
     ]
-    difficulty = models.CharField(
-        max_length=10, 
-        choices=DIFFICULTY_CHOICES, 
+    difficulty = MetadataAttribute(
+        max_length=10,
+        choices=DIFFICULTY_CHOICES,
         default='unknown',
         help_text="Difficulty level of the DSA problem discussed"
     )
-    
+
     # Problem source (LeetCode, HackerRank, etc.)
-    problem_source = models.CharField(
-        max_length=100, 
-        blank=True,
+    problem_source = MetadataAttribute(
+        max_length=100,
         help_text="Source platform like LeetCode, HackerRank, etc."
     )
-    
+
     # Problem number/identifier
-    problem_id = models.CharField(
-        max_length=50, 
-        blank=True,
+    problem_id = MetadataAttribute(
+        max_length=50,
         help_text="Problem number or identifier from the source"
     )
-    
-    # Timestamps
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
-    
-    # User interaction tracking
-    is_helpful = models.BooleanField(
-        null=True, 
-        blank=True,
-        help_text="User feedback on response helpfulness"
-    )
-    
+
+    objects = AIResponseCategoryManager(Category.DSA)
+
     class Meta:
-        ordering = ['-created_at']
+        proxy = True
         verbose_name = 'DSA AI Response'
         verbose_name_plural = 'DSA AI Responses'
-        indexes = [
-            models.Index(fields=['user', '-created_at']),
-            models.Index(fields=['difficulty']),
-            models.Index(fields=['problem_source']),
-        ]
 
     def __str__(self):
         return f"DSA Q&A: {self.question[:50]}... - {self.user.username}"
-    
-    def get_topic_tags_list(self):
-        """Return topic tags as a list"""
-        if self.topic_tags:
-            return [tag.strip() for tag in self.topic_tags.split(',') if tag.strip()]
-        return []
-    
-    def set_topic_tags_from_list(self, tags_list):
-        """Set topic tags from a list"""
-        self.topic_tags = ','.join(tags_list)
 
 
-class SoftwareDevAIResponse(models.Model):
-    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='software_dev_ai_responses')
-    question = models.TextField(help_text="The software development question asked by the user")
-    response = models.TextField(help_text="AI generated response for the software development question")
-    
-    # Optional: Add tags/topics for better categorization
-    topic_tags = models.CharField(
-        max_length=255, 
-        blank=True, 
-        help_text="Comma-separated tags like 'react,python,api,database,debugging'"
-    )
-    
+class SoftwareDevAIResponse(AIResponse):
+    """Software Development AI Responses: the `development` rows of AIResponse."""
+    CATEGORY = Category.DEVELOPMENT
+
     # Technology stack
     TECH_STACK_CHOICES = [
         ('frontend', 'Frontend'),
@@ -312,27 +462,25 @@ class SoftwareDevAIResponse(models.Model):
         ('database', 'Database'),
         ('other', 'Other'),
     ]
-    tech_stack = models.CharField(
-        max_length=20, 
-        choices=TECH_STACK_CHOICES, 
+    tech_stack = MetadataAttribute(
+        max_length=20,
+        choices=TECH_STACK_CHOICES,
         default='other',
         help_text="Technology stack category"
     )
-    
+
     # Programming language
-    programming_language = models.CharField(
-        max_length=50, 
-        blank=True,
+    programming_language = MetadataAttribute(
+        max_length=50,
         help_text="Primary programming language discussed (e.g., Python, JavaScript, Java)"
     )
-    
+
     # Framework/Library
-    framework = models.CharField(
-        max_length=100, 
-        blank=True,
+    framework = MetadataAttribute(
+        max_length=100,
         help_text="Framework or library discussed (e.g., React, Django, Express)"
     )
-    
+
     # Question type
     QUESTION_TYPE_CHOICES = [
         ('bug_fix', 'Bug Fix'),
@@ -343,61 +491,28 @@ class SoftwareDevAIResponse(models.Model):
         ('learning', 'Learning/Tutorial'),
         ('other', 'Other'),
     ]
-    question_type = models.CharField(
+    question_type = MetadataAttribute(
         max_length=20,
         choices=QUESTION_TYPE_CHOICES,
         default='other',
         help_text="Type of development question"
     )
-    
-    # Timestamps
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
-    
-    # User interaction tracking
-    is_helpful = models.BooleanField(
-        null=True, 
-        blank=True,
-        help_text="User feedback on response helpfulness"
-    )
-    
+
+    objects = AIResponseCategoryManager(Category.DEVELOPMENT)
+
     class Meta:
-        ordering = ['-created_at']
+        proxy = True
         verbose_name = 'Software Development AI Response'
         verbose_name_plural = 'Software Development AI Responses'
-        indexes = [
-            models.Index(fields=['user', '-created_at']),
-            models.Index(fields=['tech_stack']),
-            models.Index(fields=['programming_language']),
-            models.Index(fields=['question_type']),
-        ]
 
     def __str__(self):
         return f"Dev Q&A: {self.question[:50]}... - {self.user.username}"
-    
-    def get_topic_tags_list(self):
-        """Return topic tags as a list"""
-        if self.topic_tags:
-            return [tag.strip() for tag in self.topic_tags.split(',') if tag.strip()]
-        return []
-    
-    def set_topic_tags_from_list(self, tags_list):
-        """Set topic tags from a list"""
-        self.topic_tags = ','.join(tags_list)
 
 
-class SystemDesignAIResponse(models.Model):
-    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='system_design_ai_responses')
-    question = models.TextField(help_text="The system design question asked by the user")
-    response = models.TextField(help_text="AI generated response for the system design question")
-    
-    # Optional: Add tags/topics for better categorization
-    topic_tags = models.CharField(
-        max_length=255, 
-        blank=True, 
-        help_text="Comma-separated tags like 'scalability,database,microservices,caching'"
-    )
-    
+class SystemDesignAIResponse(AIResponse):
+    """System Design AI Responses: the `system_design` rows of AIResponse."""
+    CATEGORY = Category.SYSTEM_DESIGN
+
     # System scale/complexity
     SCALE_CHOICES = [
         ('small', 'Small Scale (< 1K users)'),
@@ -406,13 +521,13 @@ class SystemDesignAIResponse(models.Model):
         ('massive', 'Massive Scale (> 1M users)'),
         ('unknown', 'Unknown Scale'),
     ]
-    system_scale = models.CharField(
-        max_length=10, 
-        choices=SCALE_CHOICES, 
+    system_scale = MetadataAttribute(
+        max_length=10,
+        choices=SCALE_CHOICES,
         default='unknown',
         help_text="Expected scale of the system being designed"
     )
-    
+
     # System type/domain
     SYSTEM_TYPE_CHOICES = [
         ('web_app', 'Web Application'),
@@ -427,13 +542,13 @@ class SystemDesignAIResponse(models.Model):
         ('iot', 'IoT System'),
         ('other', 'Other'),
     ]
-    system_type = models.CharField(
-        max_length=20, 
-        choices=SYSTEM_TYPE_CHOICES, 
+    system_type = MetadataAttribute(
+        max_length=20,
+        choices=SYSTEM_TYPE_CHOICES,
         default='other',
         help_text="Type of system being designed"
     )
-    
+
     # Design focus area
     FOCUS_AREA_CHOICES = [
         ('architecture', 'High-Level Architecture'),
@@ -447,75 +562,40 @@ class SystemDesignAIResponse(models.Model):
         ('deployment', 'Deployment Strategy'),
         ('other', 'Other'),
     ]
-    focus_area = models.CharField(
+    focus_area = MetadataAttribute(
         max_length=20,
         choices=FOCUS_AREA_CHOICES,
         default='architecture',
         help_text="Primary focus area of the system design question"
     )
-    
+
     # Interview/Practice context
-    is_interview_prep = models.BooleanField(
+    is_interview_prep = MetadataAttribute(
         default=False,
         help_text="Whether this question is for interview preparation"
     )
-    
+
     # Company context (optional)
-    company_context = models.CharField(
-        max_length=100, 
-        blank=True,
+    company_context = MetadataAttribute(
+        max_length=100,
         help_text="Company or context for the system design (e.g., 'Design Twitter', 'Design Netflix')"
     )
-    
-    # Timestamps
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
-    
-    # User interaction tracking
-    is_helpful = models.BooleanField(
-        null=True, 
-        blank=True,
-        help_text="User feedback on response helpfulness"
-    )
-    
+
+    objects = AIResponseCategoryManager(Category.SYSTEM_DESIGN)
+
     class Meta:
-        ordering = ['-created_at']
+        proxy = True
         verbose_name = 'System Design AI Response'
         verbose_name_plural = 'System Design AI Responses'
-        indexes = [
-            models.Index(fields=['user', '-created_at']),
-            models.Index(fields=['system_scale']),
-            models.Index(fields=['system_type']),
-            models.Index(fields=['focus_area']),
-            models.Index(fields=['is_interview_prep']),
-        ]
 
     def __str__(self):
         return f"System Design Q&A: {self.question[:50]}... - {self.user.username}"
-    
-    def get_topic_tags_list(self):
-        """Return topic tags as a list"""
-        if self.topic_tags:
-            return [tag.strip() for tag in self.topic_tags.split(',') if tag.strip()]
-        return []
-    
-    def set_topic_tags_from_list(self, tags_list):
-        """Set topic tags from a list"""
-        self.topic_tags = ','.join(tags_list)
 
 
-class JobSearchAIResponse(models.Model):
-    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='job_search_ai_responses')
-    question = models.TextField(help_text="The job search question asked by the user")
-    response = models.TextField(help_text="AI generated response for the job search question")
-    
-    # Optional: Add tags/topics for better categorization
-    topic_tags = models.CharField(
-        max_length=255, 
-        blank=True, 
-        help_text="Comma-separated tags like 'resume,interview,salary,networking,cover-letter'"
-    )
-    
+class JobSearchAIResponse(AIResponse):
+    """Job Search AI Responses: the `job_search` rows of AIResponse."""
+    CATEGORY = Category.JOB_SEARCH
+
     # Job search category
     CATEGORY_CHOICES = [
         ('resume', 'Resume/CV'),
@@ -530,13 +610,14 @@ class JobSearchAIResponse(models.Model):
         ('application', 'Job Application'),
         ('other', 'Other'),
     ]
-    category = models.CharField(
-        max_length=20, 
-        choices=CATEGORY_CHOICES, 
+    job_category = MetadataAttribute(
+        key='category',  # `category` is the AI category column
+        max_length=20,
+        choices=CATEGORY_CHOICES,
         default='other',
         help_text="Category of job search question"
     )
-    
+
     # Experience level context
     EXPERIENCE_LEVEL_CHOICES = [
         ('entry', 'Entry Level (0-2 years)'),
@@ -547,20 +628,18 @@ class JobSearchAIResponse(models.Model):
         ('career_change', 'Career Change'),
         ('student', 'Student/Graduate'),
     ]
-    experience_level = models.CharField(
-        max_length=15, 
-        choices=EXPERIENCE_LEVEL_CHOICES, 
-        blank=True,
+    experience_level = MetadataAttribute(
+        max_length=15,
+        choices=EXPERIENCE_LEVEL_CHOICES,
         help_text="Experience level context for the question"
     )
-    
+
     # Target role/field
-    target_role = models.CharField(
-        max_length=100, 
-        blank=True,
+    target_role = MetadataAttribute(
+        max_length=100,
         help_text="Target job role or field (e.g., Software Engineer, Product Manager, Data Scientist)"
     )
-    
+
     # Interview type (if applicable)
     INTERVIEW_TYPE_CHOICES = [
         ('behavioral', 'Behavioral Interview'),
@@ -572,13 +651,12 @@ class JobSearchAIResponse(models.Model):
         ('final_round', 'Final Round'),
         ('other', 'Other'),
     ]
-    interview_type = models.CharField(
+    interview_type = MetadataAttribute(
         max_length=15,
         choices=INTERVIEW_TYPE_CHOICES,
-        blank=True,
         help_text="Type of interview (if question is interview-related)"
     )
-    
+
     # Company size context
     COMPANY_SIZE_CHOICES = [
         ('startup', 'Startup (< 50 employees)'),
@@ -588,51 +666,214 @@ class JobSearchAIResponse(models.Model):
         ('big_tech', 'Big Tech (FAANG/MAANG)'),
         ('any', 'Any Size'),
     ]
-    company_size = models.CharField(
+    company_size = MetadataAttribute(
         max_length=10,
         choices=COMPANY_SIZE_CHOICES,
-        blank=True,
         help_text="Target company size context"
     )
-    
+
     # Priority/Urgency
-    is_urgent = models.BooleanField(
+    is_urgent = MetadataAttribute(
         default=False,
         help_text="Whether this is an urgent job search question (e.g., interview tomorrow)"
     )
-    
-    # Timestamps
+
+    objects = AIResponseCategoryManager(Category.JOB_SEARCH)
+
+    class Meta:
+        proxy = True
+        verbose_name = 'Job Search AI Response'
+        verbose_name_plural = 'Job Search AI Responses'
+
+    def __str__(self):
+        return f"Job Search Q&A: {self.question[:50]}... - {self.user.username}"
+
+
+class AIResponseFacet(models.Model):
+    """
+    How many of a user's AI responses in a category have a given facet value
+    (a topic tag, difficulty, is_helpful, ...). Kept up to date on every write
+    by app/facets.py, so the facets endpoint never scans the responses.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='ai_response_facets')
+    category = models.CharField(max_length=20, choices=Category.choices)
+    facet = models.CharField(max_length=30)  # e.g. "topic_tags", "difficulty", "total"
+    value = models.CharField(max_length=255, blank=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'AI Response Facet'
+        verbose_name_plural = 'AI Response Facets'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'category', 'facet', 'value'], name='unique_ai_response_facet'),
+        ]
+
+    def __str__(self):
+        return f"{self.category} {self.facet}={self.value}: {self.count}"
+
+
+class AIJob(models.Model):
+    """
+    A queued Gemini generation, processed by `manage.py run_ai_worker`.
+    Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED so any number of
+    workers can share the queue without double-processing a job.
+    """
+    class Kind(models.TextChoices):
+        GENERATE = 'generate', _('Generate')
+        REGENERATE = 'regenerate', _('Regenerate')
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', _('Pending')
+        RUNNING = 'running', _('Running')
+        SUCCEEDED = 'succeeded', _('Succeeded')
+        FAILED = 'failed', _('Failed')
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='ai_jobs')
+    category = models.CharField(max_length=20, choices=Category.choices)
+    kind = models.CharField(max_length=20, choices=Kind.choices, default=Kind.GENERATE)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+
+    # Question and metadata for GENERATE jobs
+    payload = models.JSONField(default=dict, blank=True)
+
+    # AI response row produced (GENERATE) or refreshed (REGENERATE)
+    object_id = models.PositiveBigIntegerField(null=True, blank=True)
+
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    # Queue bookkeeping
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    
-    # User interaction tracking
-    is_helpful = models.BooleanField(
-        null=True, 
-        blank=True,
-        help_text="User feedback on response helpfulness"
-    )
-    
+    finished_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         ordering = ['-created_at']
-        verbose_name = 'Job Search AI Response'
-        verbose_name_plural = 'Job Search AI Responses'
+        verbose_name = 'AI Job'
+        verbose_name_plural = 'AI Jobs'
         indexes = [
-            models.Index(fields=['user', '-created_at']),
-            models.Index(fields=['category']),
-            models.Index(fields=['experience_level']),
-            models.Index(fields=['interview_type']),
-            models.Index(fields=['is_urgent']),
+            # Keyset pages of a user's jobs (app/pagination.py)
+            models.Index(fields=['user', '-created_at', '-id']),
+            models.Index(fields=['status', 'run_after']),
         ]
 
     def __str__(self):
-        return f"Job Search Q&A: {self.question[:50]}... - {self.user.username}"
-    
-    def get_topic_tags_list(self):
-        """Return topic tags as a list"""
-        if self.topic_tags:
-            return [tag.strip() for tag in self.topic_tags.split(',') if tag.strip()]
-        return []
-    
-    def set_topic_tags_from_list(self, tags_list):
-        """Set topic tags from a list"""
-        self.topic_tags = ','.join(tags_list)
+        return f"{self.get_kind_display()} {self.category} job #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.SUCCEEDED, self.Status.FAILED)
+
+
+class AIPromptLease(models.Model):
+    """
+    Cross-process single-flight lease for one prompt (see app/singleflight.py).
+    The worker holding the lease calls Gemini; workers that see the row wait
+    for `result` instead of sending the same prompt upstream again.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', _('Pending')
+        DONE = 'done', _('Done')
+        FAILED = 'failed', _('Failed')
+
+    prompt_hash = models.CharField(max_length=64, primary_key=True)
+    owner = models.CharField(max_length=100)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    result = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    # HTTP status and Retry-After of a failed call, answered the same way by every waiting worker
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    retry_after = models.PositiveIntegerField(null=True, blank=True)
+    expires_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'AI Prompt Lease'
+        verbose_name_plural = 'AI Prompt Leases'
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"Lease {self.prompt_hash[:12]} ({self.status})"
+
+
+class AIStream(models.Model):
+    """
+    A streamed AI answer being relayed over Server-Sent Events (see app/streams.py).
+    Chunks are appended as Gemini sends them, so a client can resume the stream
+    on any worker until `expires_at`.
+    """
+    class Status(models.TextChoices):
+        RUNNING = 'running', _('Running')
+        DONE = 'done', _('Done')
+        FAILED = 'failed', _('Failed')
+
+    stream_id = models.CharField(max_length=32, primary_key=True)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='ai_streams')
+    category = models.CharField(max_length=20, choices=Category.choices)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.RUNNING)
+    chunks = ArrayField(models.TextField(), default=list, blank=True)
+    object_id = models.PositiveBigIntegerField(null=True, blank=True)  # The stored AI response, once done
+    error = models.TextField(blank=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'AI Stream'
+        verbose_name_plural = 'AI Streams'
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"Stream {self.stream_id} ({self.status})"
+
+
+class AIUsageRecord(models.Model):
+    """
+    One AI answer request: an upstream Gemini call or an answer cache hit.
+    Written in batches off the request path by app/usage.py.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='ai_usage')
+    category = models.CharField(max_length=20, choices=Category.choices)
+    template = models.CharField(max_length=50, blank=True)  # Prompt template id, e.g. "dsa_v2"
+    streamed = models.BooleanField(default=False)
+    cache_hit = models.BooleanField(default=False)
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    output_tokens = models.PositiveIntegerField(default=0)
+    wall_time_ms = models.PositiveIntegerField(default=0)
+    error_class = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'AI Usage Record'
+        verbose_name_plural = 'AI Usage Records'
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['category', 'created_at']),
+            models.Index(fields=['user', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.category} {'cache hit' if self.cache_hit else 'call'} at {self.created_at}"
+
+
+class AIMetricCounter(models.Model):
+    """
+    Running total of one /api/ai-metrics/ counter, summed over every process.
+    Processes add their increments in batches (see app/metrics.py).
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'AI Metric Counter'
+        verbose_name_plural = 'AI Metric Counters'
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
@@ -0,0 +1,220 @@
+"""
+Incremental markdown normalizer for Gemini answers.
+
+Produces the same output as the original regex-based clean_ai_response, in a
+single pass that can be fed chunk by chunk (streamed answers are normalized as
+they arrive):
+
+- runs of 2+ asterisks become `**`;
+- outside ``` code blocks, `*text*` on one line becomes `**text**`;
+- 3+ newlines become two and runs of spaces become one;
+- a line that is just `**text**` becomes a `## text` heading;
+- leading and trailing whitespace is stripped.
+
+Code blocks are tracked as state instead of being swapped for
+`__CODE_BLOCK_n__` placeholders, so answers that contain that text are no
+longer corrupted. Nor are answers where the text of one code block also
+appears elsewhere (e.g. "```**```" spanning the closing fence of a later
+block and the fence after it): the original's str.replace swapped every
+occurrence, not just the block itself.
+
+Input is split into runs of asterisks, backticks, newlines, spaces and other
+text by one precompiled regex; the last run of each chunk is held back until
+the next chunk shows whether it continues.
+"""
+import re
+
+_TOKEN = re.compile(r'(\*+)|(`+)|(\n+)|( +)|[^*`\n ]+(?: [^*`\n ]+)*')
+_STAR, _TICK, _NEWLINE, _SPACE = 1, 2, 3, 4
+_TEXT = 0
+
+
+class MarkdownNormalizer:
+    """
+    normalizer = MarkdownNormalizer()
+    for chunk in chunks:
+        send(normalizer.feed(chunk))
+    send(normalizer.finish())
+    """
+
+    def __init__(self):
+        self._tail = ''          # Last token of the previous chunk, may continue
+
+        # Italic-to-bold conversion: an opening `*` and the text after it on the line
+        self._opener = False
+        self._opened = []
+
+        # ``` code block: collected until it closes (an unclosed fence is not a block)
+        self._in_code = False
+        self._code = []          # [(kind, text)] since the opening fence
+
+        # `**heading**` lines: text held from the start of an undecided line
+        self._line_start = True
+        self._held_line = ''
+
+        # strip(): nothing emitted yet / whitespace that may turn out to be trailing
+        self._started = False
+        self._held_space = ''
+
+    def feed(self, chunk):
+        """Normalize the next chunk; returns the output that is final so far."""
+        text = self._tail + chunk
+        if not text:
+            return ''
+        out = []
+        matches = _TOKEN.finditer(text)
+        previous = next(matches)
+        for match in matches:
+            if previous.lastindex is None and not self._opener and not self._in_code:
+                out.append(previous.group())  # Plain text outside code and italics
+            else:
+                self._token(previous, out)
+            previous = match
+        self._tail = previous.group()
+        return self._emit(''.join(out), final=False)
+
+    def finish(self):
+        """Flush everything held back; the normalizer cannot be fed afterwards."""
+        out = []
+        if self._tail:
+            for match in _TOKEN.finditer(self._tail):
+                self._token(match, out)
+            self._tail = ''
+        if self._in_code:
+            # No closing fence: the "block" is ordinary text after all
+            self._in_code = False
+            code, self._code = self._code, []
+            for kind, value in code:
+                self._outside(_TEXT if kind == _TICK else kind, value, out)
+        if self._opener:
+            out.append('*')
+            out.extend(self._opened)
+            self._opener = False
+            self._opened = []
+        return self._emit(''.join(out), final=True)
+
+    # Token level: asterisk, newline and space runs, code blocks, italics
+
+    def _token(self, match, out):
+        kind = match.lastindex or _TEXT
+        value = match.group()
+        if kind == _STAR:
+            value = '*' if len(value) == 1 else '**'
+        elif kind == _NEWLINE:
+            value = '\n' if len(value) == 1 else '\n\n'
+        elif kind == _SPACE:
+            value = ' '
+        elif kind == _TICK:
+            self._ticks(len(value), out)
+            return
+
+        if self._in_code:
+            self._code.append((kind, value))
+        else:
+            self._outside(kind, value, out)
+
+    def _ticks(self, count, out):
+        while count:
+            if count < 3:
+                token = (_TICK, '`' * count)
+                if self._in_code:
+                    self._code.append(token)
+                else:
+                    self._outside(_TEXT, token[1], out)
+                return
+            count -= 3
+            if self._in_code:
+                self._code.append((_TICK, '```'))
+                code = ''.join(value for _, value in self._code)
+                self._in_code = False
+                self._code = []
+                self._outside(_TEXT, code, out)
+            else:
+                self._in_code = True
+                self._code = [(_TICK, '```')]
+
+    def _outside(self, kind, value, out):
+        if kind == _STAR:
+            for _ in value:
+                self._star(out)
+        elif kind == _NEWLINE:
+            if self._opener:
+                out.append('*')
+                out.extend(self._opened)
+                self._opener = False
+                self._opened = []
+            out.append(value)
+        elif self._opener:
+            self._opened.append(value)
+        else:
+            out.append(value)
+
+    def _star(self, out):
+        if not self._opener:
+            self._opener = True
+        elif self._opened:
+            out.append('**')
+            out.extend(self._opened)
+            out.append('**')
+            self._opener = False
+            self._opened = []
+        else:
+            # `**`: the first star can't open (nothing between), the second might
+            out.append('*')
+
+    # Line level: `**heading**` lines, then strip()
+
+    def _emit(self, text, final):
+        return self._strip(self._headings(text, final), final)
+
+    def _headings(self, text, final):
+        data = self._held_line + text
+        size = len(data)
+        out = []
+        pos = 0
+        while pos < size:
+            if self._line_start:
+                if size - pos < 3 and not final:
+                    break
+                if data.startswith('**', pos) and pos + 2 < size and data[pos + 2] != '*':
+                    end = data.find('*', pos + 2)
+                    if end == -1 or end + 2 > size or (end + 2 == size and not final):
+                        if not final:
+                            break
+                    elif data[end + 1] == '*' and (end + 2 == size or data[end + 2] == '\n'):
+                        out.append('## ')
+                        out.append(data[pos + 2:end])
+                        pos = end + 2
+                        self._line_start = False
+                        continue
+            newline = data.find('\n', pos)
+            if newline == -1:
+                out.append(data[pos:])
+                pos = size
+                self._line_start = False
+            else:
+                out.append(data[pos:newline + 1])
+                pos = newline + 1
+                self._line_start = True
+        self._held_line = data[pos:]
+        return ''.join(out)
+
+    def _strip(self, text, final):
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ''
+            self._started = True
+        text = self._held_space + text
+        if final:
+            self._held_space = ''
+            return text.rstrip()
+        body = text.rstrip()
+        self._held_space = text[len(body):]
+        return body
+
+
+def normalize_markdown(text):
+    """Normalize a complete answer."""
+    normalizer = MarkdownNormalizer()
+    return normalizer.feed(text) + normalizer.finish()
@@ -0,0 +1,139 @@
+"""
+Keyset (cursor) pagination for the list endpoints and by_* actions.
+
+A page is the `limit` rows that follow the last row of the previous page in a
+unique ordering, (-created_at, -id) by default, so it is always an index range
+scan however far into the history it is. The response is
+
+    {"next": <url or null>, "count": <only if asked for>, "results": [...]}
+
+`?count=exact` adds a COUNT(*) of the whole result set, `?count=estimated`
+the planner's row estimate for it (from pg_class / pg_statistic, constant
+time); without the parameter no count is computed at all.
+"""
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(values):
+    """Opaque cursor token for a keyset position, e.g. the (rank, id) of the last row of a page."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(token):
+    """The values encoded by encode_cursor; ValueError for a malformed token."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def estimated_count(queryset):
+    """The planner's estimate of the number of rows in `queryset`."""
+    plan = queryset.order_by().explain(format='json')
+    return json.loads(plan)[0]['Plan']['Plan Rows']
+
+
+class KeysetPagination(BasePagination):
+    """
+    Views can set `keyset_ordering` to another (field, unique tie-breaker) pair,
+    each optionally prefixed with '-' for descending.
+    """
+    ordering = ('-created_at', '-id')
+    default_limit = 50
+    max_limit = 200
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = getattr(view, 'keyset_ordering', self.ordering)
+        limit = self.get_limit(request)
+
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            self.count = queryset.count()
+        elif mode == 'estimated':
+            self.count = estimated_count(queryset)
+        else:
+            self.count = None
+
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            queryset = self.after(queryset, token)
+        rows = list(queryset.order_by(*self.ordering)[:limit + 1])
+        self.next_position = self.position_of(rows[limit - 1]) if len(rows) > limit else None
+        return rows[:limit]
+
+    def get_limit(self, request):
+        try:
+            return _positive_int(request.query_params[self.limit_query_param], strict=True, cutoff=self.max_limit)
+        except (KeyError, ValueError):
+            return self.default_limit
+
+    def position_of(self, row):
+        values = [getattr(row, name.lstrip('-')) for name in self.ordering]
+        return [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+
+    def after(self, queryset, token):
+        """
+        Rows after the position in `token`: `a <= x AND NOT (a = x AND b >= y)` for
+        descending (a, b), which PostgreSQL runs as a range scan on an (a, b) index.
+        A nullable `a` sorts its NULLs as PostgreSQL does: last ascending, first descending.
+        """
+        first, second = self.ordering
+        try:
+            values = decode_cursor(token)
+            fields = [queryset.model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+            first_value, second_value = (field.to_python(value) for field, value in zip(fields, values))
+        except (ValueError, TypeError, ValidationError) as exc:
+            raise NotFound(self.invalid_cursor_message) from exc
+        descending, second_descending = first.startswith('-'), second.startswith('-')
+        first, second = first.lstrip('-'), second.lstrip('-')
+        if first_value is None:
+            nulls = queryset.filter(**{f'{first}__isnull': True, f'{second}__{"lt" if second_descending else "gt"}': second_value})
+            return (nulls | queryset.filter(**{f'{first}__isnull': False})) if descending else nulls
+        rows = queryset.filter(**{f'{first}__{"lte" if descending else "gte"}': first_value}).exclude(
+            Q(**{first: first_value, f'{second}__{"gte" if second_descending else "lte"}': second_value})
+        )
+        if fields[0].null and not descending:
+            rows |= queryset.filter(**{f'{first}__isnull': True})
+        return rows
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(self.next_position))
+
+    def get_paginated_data(self, data, **extra):
+        """The paginated body as a dict; `extra` keys go before `results`."""
+        body = {'next': self.get_next_link()}
+        if self.count is not None:
+            body['count'] = self.count
+        return {**body, **extra, 'results': data}
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,192 @@
+"""
+Versioned prompt templates, one set per AI response category.
+
+A template turns the user's task summary and question into the request sent to
+Gemini. The static expert persona and formatting rules are sent as the model's
+system instruction (v2), so the shared GenerativeModel holds them and only the
+per-user context and the question change between calls. v1 is the original
+single-string prompt with the persona inlined, kept for comparison and rollback.
+
+The active version per category is settings.AI_PROMPT_TEMPLATE_VERSIONS (latest
+by default). Prompt token counts reported by Gemini are tracked per template
+version in /api/ai-metrics/.
+"""
+from django.conf import settings
+from .models import Category
+from . import metrics
+
+DSA_PERSONA = (
+    "You are a DSA Expert with 10+ years of experience in competitive programming and technical interviews. "
+    "Your expertise includes advanced algorithms and data structures, time/space complexity analysis, "
+    "problem-solving patterns and techniques, optimization strategies, and code implementation in multiple languages.\n\n"
+    "When responding, you must:\n"
+    "- Always analyze time and space complexity\n"
+    "- Explain the intuition behind the approach\n"
+    "- Provide multiple solutions when possible (brute force → optimized)\n"
+    "- Include visual representations or step-by-step walkthroughs\n"
+    "- Mention relevant patterns (sliding window, two pointers, etc.)\n"
+    "- Connect problems to real-world applications\n\n"
+    "FORMATTING REQUIREMENTS - Format your response using clean markdown with:\n"
+    "- Use ## for main headings\n"
+    "- Use **bold** for important concepts (NOT asterisks)\n"
+    "- Use ```python for code blocks with syntax highlighting\n"
+    "- Use - for bullet points\n"
+    "- Add proper paragraph spacing\n"
+    "- Do NOT use asterisks (*) anywhere in your response\n"
+    "- Structure your response with clear sections\n"
+    "- Keep formatting simple and clean\n\n"
+)
+
+DEVELOPMENT_PERSONA = (
+    "You are a Senior Software Development Specialist with 10+ years of experience in enterprise-level applications. "
+    "Your expertise includes full-stack development (frontend, backend, databases), software architecture and design patterns, "
+    "code quality, testing, and best practices, DevOps and deployment strategies, performance optimization, and security considerations.\n\n"
+    "When responding, you must:\n"
+    "- Follow SOLID principles and clean code practices\n"
+    "- Consider scalability, maintainability, and performance\n"
+    "- Suggest appropriate design patterns\n"
+    "- Include error handling and edge cases\n"
+    "- Recommend testing strategies\n"
+    "- Consider security implications\n"
+    "- Provide production-ready solutions\n\n"
+    "FORMATTING REQUIREMENTS - Format your response using clean markdown with:\n"
+    "- Use ## for main headings\n"
+    "- Use **bold** for important concepts (NOT asterisks)\n"
+    "- Use ```javascript or ```python for code blocks with syntax highlighting\n"
+    "- Use - for bullet points\n"
+    "- Add proper paragraph spacing\n"
+    "- Do NOT use asterisks (*) anywhere in your response\n"
+    "- Include best practices and explanations where appropriate\n\n"
+)
+
+SYSTEM_DESIGN_PERSONA = (
+    "You are a System Design Expert specializing in large-scale distributed systems with 15+ years of experience "
+    "in designing systems for companies like Google, Amazon, and Netflix. Your expertise includes scalable architecture design, "
+    "database design and selection (SQL/NoSQL), microservices vs monolith decisions, load balancing and caching strategies, "
+    "message queues and event-driven architecture, performance optimization and bottleneck identification, "
+    "fault tolerance and disaster recovery.\n\n"
+    "When responding, you must:\n"
+    "- Start with requirements gathering and constraints\n"
+    "- Consider scalability from day one\n"
+    "- Discuss trade-offs between different approaches\n"
+    "- Include capacity estimation and bottleneck analysis\n"
+    "- Address availability, consistency, and partition tolerance (CAP theorem)\n"
+    "- Provide diagrams or architectural overviews when helpful\n"
+    "- Consider both technical and business constraints\n\n"
+    "FORMATTING REQUIREMENTS - Format your response using clean markdown with:\n"
+    "- Use ## for main headings\n"
+    "- Use **bold** for important concepts (NOT asterisks)\n"
+    "- Use ``` for code examples and configuration\n"
+    "- Use - for bullet points\n"
+    "- Add proper paragraph spacing\n"
+    "- Do NOT use asterisks (*) anywhere in your response\n"
+    "- Include diagrams or visual aids where appropriate\n\n"
+)
+
+JOB_SEARCH_PERSONA = (
+    "You are an experienced Job Search Guide and Career Coach with 12+ years of experience helping professionals "
+    "at all levels land their dream jobs at top companies like FAANG, startups, and Fortune 500 companies. "
+    "Your expertise includes resume optimization and ATS systems, interview preparation (technical and behavioral), "
+    "salary negotiation strategies, career transition planning, industry trends and market analysis, "
+    "networking and personal branding, and job search strategies across different experience levels.\n\n"
+    "When responding, you must:\n"
+    "- Provide actionable, specific advice\n"
+    "- Consider current job market trends (2024-2025)\n"
+    "- Tailor advice to experience level and target role\n"
+    "- Include examples and templates when helpful\n"
+    "- Address both technical and soft skill development\n"
+    "- Consider industry-specific requirements\n"
+    "- Provide step-by-step action plans\n\n"
+    "FORMATTING REQUIREMENTS - Format your response using clean markdown with:\n"
+    "- Use ## for main headings\n"
+    "- Use **bold** for important concepts (NOT asterisks)\n"
+    "- Use - for bullet points\n"
+    "- Add proper paragraph spacing\n"
+    "- Do NOT use asterisks (*) anywhere in your response\n"
+    "- Include tips, resources, and best practices where appropriate\n\n"
+)
+
+
+class Prompt:
+    """A rendered prompt: optional system instruction plus the per-request contents."""
+
+    def __init__(self, template, system_instruction, text):
+        self.template = template
+        self.system_instruction = system_instruction
+        self.text = text
+        self.user_id = None  # Set by build_prompt, for the usage ledger
+
+    def cache_key(self):
+        """Everything that changes the upstream request, for single-flight hashing."""
+        return f"{self.template.id}\n{self.system_instruction or ''}\n{self.text}"
+
+
+class PromptTemplate:
+
+    def __init__(self, category, version, persona, persona_as_system_instruction=True):
+        self.category = category
+        self.version = version
+        self.persona = persona
+        self.persona_as_system_instruction = persona_as_system_instruction
+
+    @property
+    def id(self):
+        return f"{self.category}_v{self.version}"
+
+    def render(self, tasks_section, question):
+        if self.persona_as_system_instruction:
+            return Prompt(self, self.persona.strip(), f"{tasks_section}Question: {question}")
+        return Prompt(self, None, f"{tasks_section}{self.persona}Question: {question}")
+
+    def record_usage(self, usage_metadata):
+        """Count a call and its prompt tokens (from Gemini's usage_metadata) for this version."""
+        metrics.incr(f'prompt_calls_{self.id}')
+        prompt_tokens = getattr(usage_metadata, 'prompt_token_count', 0) if usage_metadata else 0
+        if prompt_tokens:
+            metrics.incr(f'prompt_tokens_{self.id}', prompt_tokens)
+
+
+PROMPT_TEMPLATES = {}
+
+
+def register(template):
+    PROMPT_TEMPLATES.setdefault(template.category, {})[template.version] = template
+    return template
+
+
+for category, persona in [
+    (Category.DSA, DSA_PERSONA),
+    (Category.DEVELOPMENT, DEVELOPMENT_PERSONA),
+    (Category.SYSTEM_DESIGN, SYSTEM_DESIGN_PERSONA),
+    (Category.JOB_SEARCH, JOB_SEARCH_PERSONA),
+]:
+    register(PromptTemplate(category, 1, persona, persona_as_system_instruction=False))
+    register(PromptTemplate(category, 2, persona))
+
+
+def get_template(category, version=None):
+    """The requested version of a category's template, or the active one."""
+    versions = PROMPT_TEMPLATES[category]
+    if version is None:
+        version = settings.AI_PROMPT_TEMPLATE_VERSIONS.get(category, max(versions))
+    return versions[version]
+
+
+def _metrics_section():
+    section = {}
+    for category, versions in PROMPT_TEMPLATES.items():
+        active = get_template(category)
+        for template in versions.values():
+            counters = metrics.get_counters(f'prompt_calls_{template.id}', f'prompt_tokens_{template.id}')
+            calls = counters[f'prompt_calls_{template.id}']
+            tokens = counters[f'prompt_tokens_{template.id}']
+            section[template.id] = {
+                'active': template is active,
+                'calls': calls,
+                'prompt_tokens': tokens,
+                'avg_prompt_tokens': round(tokens / calls, 1) if calls else None,
+            }
+    return section
+
+
+metrics.register_section('prompt_templates', _metrics_section)
@@ -0,0 +1,236 @@
+"""
+Render-once HTML for stored AI answers.
+
+Each AIResponse row keeps `response_html`, a sanitized HTML rendering of its
+markdown `response`, plus `response_html_digest`, a hash of the markdown it
+was rendered from. Rendering happens on a small background thread pool after
+the row is committed (post_save, and explicitly after bulk_create), so neither
+generation nor reads wait on it. Clients ask for it with `?format=html`; a row
+whose HTML is missing or stale is rendered inline for that one request.
+
+The renderer escapes all input before adding markup, so the only tags in the
+output are the ones it emits itself (headings, paragraphs, lists, quotes,
+emphasis, links restricted to http(s)/mailto/relative URLs, and code). Fenced
+code blocks carry a `language-<name>` class; when Pygments is installed their
+tokens are also wrapped in Pygments' CSS class spans.
+"""
+import hashlib
+import html
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection, transaction
+from . import metrics
+
+try:
+    from pygments import highlight
+    from pygments.formatters import HtmlFormatter
+    from pygments.lexers import get_lexer_by_name
+    from pygments.util import ClassNotFound
+except ImportError:
+    highlight = None
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=settings.AI_HTML_RENDER_THREADS, thread_name_prefix='ai-html')
+
+_FENCE = re.compile(r'^\s*```\s*([\w+#.-]*)')
+_HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+_BULLET = re.compile(r'^\s*[-*+]\s+(.*)$')
+_ORDERED = re.compile(r'^\s*\d+[.)]\s+(.*)$')
+_QUOTE = re.compile(r'^\s*>\s?(.*)$')
+_RULE = re.compile(r'^\s*(?:-{3,}|\*{3,}|_{3,})\s*$')
+
+_CODE_SPAN = re.compile(r'(`+)(.+?)\1', re.DOTALL)
+_LINK = re.compile(r'\[([^\]\n]+)\]\(([^)\s]+)\)')
+# Emphasis may only wrap text and complete tags emitted earlier, so the output stays well nested
+_LINK_HTML = r'<a [^>]*>[^<]*</a>'
+_BOLD_ITALIC = re.compile(r'\*\*\*(?=\S)([^*<]+?)(?<=\S)\*\*\*')
+_BOLD = re.compile(r'\*\*(?=\S)((?:[^*<]|%s)+?)(?<=\S)\*\*' % _LINK_HTML)
+_ITALIC = re.compile(r'(?<![*\w])\*(?=\S)((?:[^*<\n]|%s|<strong>[^<]*</strong>)+?)(?<=\S)\*(?![*\w])' % _LINK_HTML)
+# '/' only for paths on this site: browsers read '//host' and '/\host' as another host
+_SAFE_URL = re.compile(r'^(?:https?://|mailto:|/(?![/\\])|#)', re.IGNORECASE)
+
+
+# Bump when the output for the same markdown changes, so stored renderings are redone
+RENDERER_VERSION = 2
+
+
+def source_digest(markdown):
+    """Identifies the markdown (and renderer version) a stored rendering was made from."""
+    return hashlib.blake2b(f'{RENDERER_VERSION}:{markdown}'.encode(), digest_size=16).hexdigest()
+
+
+# Markdown -> HTML
+
+def _link(match):
+    label, url = match.group(1), html.unescape(match.group(2))
+    if not _SAFE_URL.match(url):
+        return match.group(0)
+    return f'<a href="{html.escape(url)}" rel="nofollow noopener noreferrer">{label}</a>'
+
+
+def render_inline(text):
+    out = []
+    pos = 0
+    for match in _CODE_SPAN.finditer(text):
+        out.append(_render_emphasis(text[pos:match.start()]))
+        out.append(f'<code>{html.escape(match.group(2).strip())}</code>')
+        pos = match.end()
+    out.append(_render_emphasis(text[pos:]))
+    return ''.join(out)
+
+
+def _render_emphasis(text):
+    # Escaping leaves * [ ] ( ) alone, so markup is matched on the escaped text
+    text = html.escape(text)
+    text = _LINK.sub(_link, text)
+    text = _BOLD_ITALIC.sub(r'<strong><em>\1</em></strong>', text)
+    text = _BOLD.sub(r'<strong>\1</strong>', text)
+    return _ITALIC.sub(r'<em>\1</em>', text)
+
+
+def render_code_block(code, language):
+    language_class = f' class="language-{html.escape(language)}"' if language else ''
+    if highlight is not None and language:
+        try:
+            lexer = get_lexer_by_name(language)
+        except ClassNotFound:
+            lexer = None
+        if lexer is not None:
+            body = highlight(code, lexer, HtmlFormatter(nowrap=True))
+            return f'<pre class="highlight"><code{language_class}>{body}</code></pre>'
+    return f'<pre><code{language_class}>{html.escape(code)}</code></pre>'
+
+
+def render_markdown(markdown):
+    """Sanitized HTML for one normalized AI answer."""
+    out = []
+    paragraph = []
+    list_tag = None
+    list_items = []
+    quote = []
+
+    def close_blocks():
+        nonlocal list_tag
+        if paragraph:
+            out.append(f'<p>{render_inline(chr(10).join(paragraph))}</p>')
+            paragraph.clear()
+        if list_tag:
+            items = ''.join(f'<li>{render_inline(item)}</li>' for item in list_items)
+            out.append(f'<{list_tag}>{items}</{list_tag}>')
+            list_items.clear()
+            list_tag = None
+        if quote:
+            out.append(f'<blockquote><p>{render_inline(chr(10).join(quote))}</p></blockquote>')
+            quote.clear()
+
+    lines = markdown.split('\n')
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        index += 1
+
+        fence = _FENCE.match(line)
+        if fence:
+            close_blocks()
+            code = []
+            while index < len(lines) and not lines[index].lstrip().startswith('```'):
+                code.append(lines[index])
+                index += 1
+            index += 1  # Closing fence (or end of text)
+            out.append(render_code_block('\n'.join(code), fence.group(1)))
+            continue
+
+        if not line.strip():
+            close_blocks()
+            continue
+
+        if _RULE.match(line):
+            close_blocks()
+            out.append('<hr>')
+            continue
+
+        heading = _HEADING.match(line)
+        if heading:
+            close_blocks()
+            level = len(heading.group(1))
+            out.append(f'<h{level}>{render_inline(heading.group(2))}</h{level}>')
+            continue
+
+        for pattern, tag in ((_BULLET, 'ul'), (_ORDERED, 'ol')):
+            item = pattern.match(line)
+            if item:
+                if list_tag != tag:
+                    close_blocks()
+                    list_tag = tag
+                list_items.append(item.group(1))
+                break
+        else:
+            quoted = _QUOTE.match(line)
+            if quoted:
+                if not quote:
+                    close_blocks()
+                quote.append(quoted.group(1))
+            elif list_tag and line[:1].isspace():
+                list_items[-1] += '\n' + line.strip()  # Continuation of the last item
+            else:
+                if list_tag or quote:
+                    close_blocks()
+                paragraph.append(line.strip())
+
+    close_blocks()
+    return '\n'.join(out)
+
+
+# Stored renderings
+
+def is_stale(instance):
+    return instance.response_html_digest != source_digest(instance.response)
+
+
+def html_for(instance):
+    """The stored rendering of `instance.response`, rendering it inline when missing or stale."""
+    if not is_stale(instance):
+        return instance.response_html
+    metrics.incr('html_inline')
+    schedule(type(instance), [instance.pk])
+    return render_markdown(instance.response)
+
+
+def schedule(model, pks):
+    """Render (or re-render) these rows in the background once the current transaction commits."""
+    pks = list(pks)
+    if pks:
+        transaction.on_commit(lambda: _executor.submit(render_rows, model, pks))
+
+
+def render_rows(model, pks):
+    """Render and store the HTML of these rows; rows that are already current are skipped."""
+    try:
+        rows = model.objects.filter(pk__in=pks).only(
+            'pk', 'response', 'response_html_digest', 'updated_at',
+        )
+        for row in rows:
+            digest = source_digest(row.response)
+            if row.response_html_digest == digest:
+                continue
+            # Only store it if the row hasn't been saved again since it was read
+            model.objects.filter(pk=row.pk, updated_at=row.updated_at).update(
+                response_html=render_markdown(row.response),
+                response_html_digest=digest,
+            )
+            metrics.incr('html_rendered')
+    except Exception:
+        logger.exception("Could not render HTML for %s rows %s", model.__name__, pks)
+        metrics.incr('html_render_errors')
+    finally:
+        connection.close()
+
+
+def _metrics_section():
+    return metrics.get_counters('html_rendered', 'html_render_errors', 'html_inline')
+
+
+metrics.register_section('html_rendering', _metrics_section)
@@ -0,0 +1,256 @@
+"""
+Deadlines, circuit breaking and hedging for Gemini calls.
+
+- Every call gets the latency budget of its category (settings.AI_LATENCY_BUDGETS).
+  The budget is passed to the SDK as the request timeout and the caller stops
+  waiting once it is spent (DeadlineExceededError).
+- A per-process circuit breaker watches the upstream failure rate over a rolling
+  window. When it trips, calls fail immediately with CircuitOpenError until a
+  single probe call succeeds again.
+- With AI_HEDGE_ENABLED, a second identical request is sent when the first has
+  not answered within the category's observed p95 latency; the first answer wins.
+"""
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.conf import settings
+from google.api_core import exceptions as google_exceptions
+from . import metrics
+
+
+class AIUnavailableError(Exception):
+    """Gemini could not produce an answer; `status_code` is what the API returns."""
+    status_code = 502
+    retry_after = None
+
+
+class CircuitOpenError(AIUnavailableError):
+    status_code = 503
+
+    def __init__(self, retry_after):
+        super().__init__("AI service is temporarily unavailable, please retry shortly.")
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(AIUnavailableError):
+    status_code = 504
+
+    def __init__(self, budget):
+        super().__init__(f"AI model did not respond within {budget:g}s.")
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, window_seconds, min_calls, failure_rate, open_seconds):
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self.opened_at = None
+        self._outcomes = deque()  # (monotonic time, ok)
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Raise CircuitOpenError unless a call may go upstream now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            remaining = self.opened_at + self.open_seconds - time.monotonic()
+            if self.state == self.OPEN and remaining <= 0:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+        metrics.incr('breaker_rejected')
+        raise CircuitOpenError(retry_after=max(1, math.ceil(remaining)))
+
+    def record(self, ok):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                if ok:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open(now)
+                return
+
+            self._outcomes.append((now, ok))
+            while self._outcomes and self._outcomes[0][0] < now - self.window_seconds:
+                self._outcomes.popleft()
+            if self.state == self.CLOSED and len(self._outcomes) >= self.min_calls:
+                if self.current_failure_rate() >= self.failure_rate:
+                    self._open(now)
+
+    def release(self):
+        """End a call that has no outcome (an abandoned stream), freeing the half-open probe slot."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def current_failure_rate(self):
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for _, ok in self._outcomes if not ok) / len(self._outcomes)
+
+    def _open(self, now):
+        self.state = self.OPEN
+        self.opened_at = now
+        metrics.incr('breaker_opened')
+
+
+class LatencyTracker:
+    """Recent successful call latencies per category, for the hedge delay."""
+
+    def __init__(self, size=200):
+        self.size = size
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, category, seconds):
+        with self._lock:
+            self._samples.setdefault(category, deque(maxlen=self.size)).append(seconds)
+
+    def percentile(self, category, q, min_samples=1):
+        with self._lock:
+            samples = sorted(self._samples.get(category, ()))
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def categories(self):
+        return list(self._samples)
+
+
+breaker = CircuitBreaker(
+    window_seconds=settings.AI_CIRCUIT_BREAKER['WINDOW_SECONDS'],
+    min_calls=settings.AI_CIRCUIT_BREAKER['MIN_CALLS'],
+    failure_rate=settings.AI_CIRCUIT_BREAKER['FAILURE_RATE'],
+    open_seconds=settings.AI_CIRCUIT_BREAKER['OPEN_SECONDS'],
+)
+latencies = LatencyTracker()
+_executor = ThreadPoolExecutor(max_workers=settings.AI_CALL_THREADS, thread_name_prefix='gemini-call')
+
+
+def latency_budget(category):
+    return settings.AI_LATENCY_BUDGETS.get(category, settings.AI_LATENCY_BUDGET_DEFAULT)
+
+
+def is_upstream_failure(exc):
+    """Errors that say something about Gemini's health (not about our request)."""
+    if isinstance(exc, google_exceptions.TooManyRequests):
+        return True
+    return not isinstance(exc, (google_exceptions.ClientError, ValueError))
+
+
+def call(category, fn):
+    """
+    Run `fn(timeout)` against Gemini within the category's latency budget,
+    through the circuit breaker and (optionally) with a hedged second request.
+    """
+    breaker.allow()
+    budget = latency_budget(category)
+    start = time.monotonic()
+    deadline = start + budget
+
+    futures = [_executor.submit(fn, budget)]
+    hedge = None
+    hedge_delay = _hedge_delay(category)
+    error = None
+    while futures:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        timeout = remaining
+        if hedge is None and hedge_delay is not None:
+            timeout = min(remaining, max(0.0, start + hedge_delay - time.monotonic()))
+        done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+
+        if not done:
+            if hedge is None and hedge_delay is not None:
+                metrics.incr('hedge_sent')
+                hedge = _executor.submit(fn, max(0.0, deadline - time.monotonic()))
+                futures.append(hedge)
+                hedge_delay = None
+            continue
+
+        for future in done:
+            futures.remove(future)
+            if future.exception() is None:
+                if future is hedge:
+                    metrics.incr('hedge_won')
+                latencies.add(category, time.monotonic() - start)
+                breaker.record(ok=True)
+                return future.result()
+            error = future.exception()
+        # A failed hedge or primary: keep waiting on the other one, if any
+
+    if error is not None and not futures:
+        breaker.record(ok=not is_upstream_failure(error))
+        raise error
+
+    metrics.incr('deadline_exceeded')
+    breaker.record(ok=False)
+    raise DeadlineExceededError(budget)
+
+
+def call_stream(category, fn):
+    """
+    Streaming variant of call(): yields from `fn(timeout)` under the circuit
+    breaker and latency budget. Streams are not hedged.
+    """
+    breaker.allow()
+    budget = latency_budget(category)
+    deadline = time.monotonic() + budget
+    try:
+        for item in fn(budget):
+            if time.monotonic() > deadline:
+                metrics.incr('deadline_exceeded')
+                raise DeadlineExceededError(budget)
+            yield item
+    except GeneratorExit:
+        # The consumer stopped reading (client went away): says nothing about Gemini
+        breaker.release()
+        raise
+    except DeadlineExceededError:
+        breaker.record(ok=False)
+        raise
+    except Exception as e:
+        breaker.record(ok=not is_upstream_failure(e))
+        raise
+    breaker.record(ok=True)
+
+
+def _hedge_delay(category):
+    if not settings.AI_HEDGE_ENABLED:
+        return None
+    p95 = latencies.percentile(category, 0.95, min_samples=settings.AI_HEDGE_MIN_SAMPLES)
+    if p95 is None:
+        return None
+    return max(p95, settings.AI_HEDGE_MIN_DELAY)
+
+
+def _metrics_section():
+    counters = metrics.get_counters(
+        'breaker_opened', 'breaker_rejected', 'deadline_exceeded', 'hedge_sent', 'hedge_won',
+    )
+    counters['hedge_win_rate'] = metrics.ratio(counters['hedge_won'], counters['hedge_sent'])
+    counters['breaker_state'] = breaker.state
+    counters['breaker_failure_rate'] = round(breaker.current_failure_rate(), 4)
+    counters['hedge_enabled'] = settings.AI_HEDGE_ENABLED
+    counters['p95_seconds'] = {
+        category: round(latencies.percentile(category, 0.95), 3)
+        for category in latencies.categories()
+    }
+    return counters
+
+
+metrics.register_section('gemini_resilience', _metrics_section)
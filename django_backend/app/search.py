@@ -0,0 +1,72 @@
+"""
+Full-text search over the user's AI questions and answers.
+
+`response` is stored compressed (app/fields.py), so PostgreSQL can't build the
+tsvector from the columns itself. Instead AIResponse.save(), build_ai_response()
+and the copy/backfill commands send both texts along with the write (see
+search_vector_for in app/models.py) and AIResponse.search_vector becomes
+
+    setweight(to_tsvector(question), 'A') || setweight(to_tsvector(response), 'B')
+
+so matches in the question rank above matches in the answer. The column has a
+GIN index; the AI_SEARCH_MAX_CANDIDATES most recent matches are ordered by
+ts_rank and paged with a (rank, id) keyset cursor, so a query costs about the
+same however large the user's history and however deep the page. Highlighted snippets are
+made with ts_headline for the rows of the returned page only.
+"""
+import html
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, Q, Subquery
+from django.db.models.functions import Cast
+from .models import AIResponse, SEARCH_MAX_CHARS
+
+HEADLINE_OPTIONS = 'StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2'
+
+
+def search_query(text):
+    """websearch_to_tsquery: quoted phrases, `or` and `-word` work like a search engine."""
+    return SearchQuery(text, search_type='websearch', config=settings.AI_SEARCH_CONFIG)
+
+
+def search(user, text, category=None, after=None, limit=20):
+    """
+    One page of the user's responses matching `text`, best match first, each
+    annotated with its `rank`. `after` is the (rank, id) of the last row of the
+    previous page.
+    """
+    query = search_query(text)
+    matches = AIResponse.objects.filter(user=user, search_vector=query)
+    if category:
+        matches = matches.filter(category=category)
+    # Ranking reads every candidate's whole tsvector, so rank only the most recent matches
+    candidates = matches.order_by('-created_at').values('pk')[:settings.AI_SEARCH_MAX_CANDIDATES]
+    rows = (
+        AIResponse.objects
+        .filter(pk__in=Subquery(candidates))
+        # As double precision, so the rank survives the round trip through the cursor exactly
+        .annotate(rank=Cast(SearchRank(F('search_vector'), query), FloatField()))
+    )
+    if after is not None:
+        rank, pk = after
+        rows = rows.filter(Q(rank__lt=rank) | Q(rank=rank, pk__lt=pk))
+    rows = rows.only('id', 'category', 'question', 'response', 'topic_tags', 'created_at')
+    return list(rows.order_by('-rank', '-pk')[:limit])
+
+
+def highlights(texts, text):
+    """
+    ts_headline snippets of `texts` for the query `text`, in one query. The texts
+    are HTML-escaped first, so the only markup in a snippet is <mark>.
+    """
+    if not texts:
+        return []
+    config = settings.AI_SEARCH_CONFIG
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT ts_headline(%s::regconfig, doc, websearch_to_tsquery(%s::regconfig, %s), %s) "
+            "FROM unnest(%s::text[]) WITH ORDINALITY AS t(doc, n) ORDER BY n",
+            [config, config, text, HEADLINE_OPTIONS, [html.escape(t[:SEARCH_MAX_CHARS], quote=False) for t in texts]],
+        )
+        return [row[0] for row in cursor.fetchall()]
@@ -1,8 +1,40 @@
+import functools
+from django.db import models
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
 from .models import *
+from .rendering import html_for
 
-class UserSerializer(serializers.ModelSerializer):
+
+class SparseFieldsetMixin:
+    """
+    `?fields=id,question,created_at` on a GET limits the output to those fields;
+    fields left out are not computed at all. Unknown names are a 400. Serializers
+    embedded in another one's output (context['embedded']) always give every field.
+    """
+    fields_query_param = 'fields'
+
+    def requested_fields(self):
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD') or self.context.get('embedded'):
+            return None
+        value = request.query_params.get(self.fields_query_param)
+        if not value:
+            return None
+        return [name.strip() for name in value.split(',') if name.strip()]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = self.requested_fields()
+        if requested is None:
+            return fields
+        unknown = [name for name in requested if name not in fields]
+        if unknown:
+            raise serializers.ValidationError({self.fields_query_param: f"Unknown field(s): {', '.join(unknown)}"})
+        return {name: field for name, field in fields.items() if name in requested}
+
+
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     confirm_password = serializers.CharField(write_only=True)
     
     class Meta:
@@ -29,7 +61,7 @@ class LoginSerializer(serializers.Serializer):
     password = serializers.CharField(required=True, write_only=True)
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Task
         fields = '__all__'
@@ -38,9 +70,66 @@ class TaskSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
-    
-    
-class GoalSerializer(serializers.ModelSerializer):
+
+
+class TaskQuerySerializer(serializers.Serializer):
+    """
+    Query parameters of the task list (GET /api/tasks/):
+    ?category=dsa&completed=false&priority_min=2&priority_max=5
+    &due_after=2025-01-01&due_before=2025-01-31&tags=exam,revision&ordering=due_date
+    Date bounds are inclusive; `tags` matches tasks that have all of them.
+    """
+    # Keyset ordering (app/pagination.py) for each ?ordering= value
+    ORDERINGS = {
+        '-created_at': ('-created_at', '-id'),
+        'created_at': ('created_at', 'id'),
+        'due_date': ('due_date', 'id'),
+        '-due_date': ('-due_date', '-id'),
+        'priority': ('priority', 'id'),
+        '-priority': ('-priority', '-id'),
+    }
+
+    category = serializers.ChoiceField(choices=Category.choices, required=False)
+    completed = serializers.BooleanField(required=False, allow_null=True, default=None)
+    priority_min = serializers.IntegerField(min_value=1, max_value=5, required=False)
+    priority_max = serializers.IntegerField(min_value=1, max_value=5, required=False)
+    due_after = serializers.DateField(required=False)
+    due_before = serializers.DateField(required=False)
+    tags = serializers.CharField(required=False)
+    ordering = serializers.ChoiceField(choices=list(ORDERINGS), default='-created_at')
+
+    def validate_tags(self, value):
+        return split_tags(value)
+
+    def validate(self, data):
+        if data.get('priority_min', 1) > data.get('priority_max', 5):
+            raise serializers.ValidationError("priority_min can't be greater than priority_max.")
+        if 'due_after' in data and 'due_before' in data and data['due_after'] > data['due_before']:
+            raise serializers.ValidationError("due_after can't be later than due_before.")
+        return data
+
+    def filter(self, queryset):
+        """`queryset` narrowed by the validated parameters, served by the Task indexes."""
+        data = self.validated_data
+        lookups = {
+            'category': 'category',
+            'completed': 'completed',
+            'priority_min': 'priority__gte',
+            'priority_max': 'priority__lte',
+            'due_after': 'due_date__gte',
+            'due_before': 'due_date__lte',
+            'tags': 'tags__contains',  # jsonb @>, GIN indexed
+        }
+        return queryset.filter(**{
+            lookup: data[param] for param, lookup in lookups.items() if data.get(param) not in (None, [])
+        })
+
+    @property
+    def keyset_ordering(self):
+        return self.ORDERINGS[self.validated_data['ordering']]
+
+
+class GoalSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     days_completed_this_week = serializers.SerializerMethodField()
     is_week_completed = serializers.SerializerMethodField()
 
@@ -103,16 +192,101 @@ class GoalSerializer(serializers.ModelSerializer):
         return super().to_representation(instance)
     
 
-class DSAAIResponseSerializer(serializers.ModelSerializer):
-    topic_tags = serializers.ListField(
-        child=serializers.CharField(),
-        source='get_topic_tags_list',
-        write_only=False,
-        required=False
-    )
-    user = serializers.StringRelatedField(read_only=True)  # or use PrimaryKeyRelatedField for user id
+class AIResponseHTMLMixin:
+    """
+    With `?format=html` the answer is sent as `response_html`, its stored
+    sanitized HTML rendering (see app/rendering.py), instead of the markdown `response`.
+    """
+
+    def wants_html(self):
+        request = self.context.get('request')
+        return request is not None and request.query_params.get('format') == 'html'
+
+    def to_representation(self, instance):
+        ret = super().to_representation(instance)
+        if 'response' in ret and self.wants_html():
+            del ret['response']
+            ret['response_html'] = html_for(instance)
+        return ret
+
+
+class TopicTagsField(serializers.ListField):
+    """
+    `topic_tags` as a list of tags; input may also be a comma-separated string.
+    Stored comma-separated in AIResponse.topic_tags.
+    """
+    child = serializers.CharField()
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = split_tags(data)
+        value = ','.join(split_tags(','.join(super().to_internal_value(data))))
+        if len(value) > AIResponse._meta.get_field('topic_tags').max_length:
+            raise serializers.ValidationError("Too many topic tags.")
+        return value
+
+    def to_representation(self, value):
+        return split_tags(value)
+
+
+class AIResponseSerializer(SparseFieldsetMixin, AIResponseHTMLMixin, serializers.ModelSerializer):
+    """
+    Any AI response, whatever its category (GET /api/ai-responses/). The
+    per-category serializers below subclass it and list their metadata
+    fields, which are built from the proxy model's MetadataAttributes.
+    """
+    topic_tags = TopicTagsField(required=False)
+    user = serializers.StringRelatedField(read_only=True)  # Shows username or __str__ of user
 
     class Meta:
+        model = AIResponse
+        fields = [
+            'id',
+            'user',
+            'category',
+            'question',
+            'response',
+            'topic_tags',
+            'metadata',
+            'created_at',
+            'updated_at',
+            'is_helpful',
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at', 'user']
+
+    def requested_fields(self):
+        """`response_html` in ?fields= is `response`, sent as HTML (see wants_html)."""
+        requested = super().requested_fields()
+        if requested is None:
+            return None
+        return ['response' if name == 'response_html' else name for name in requested]
+
+    def wants_html(self):
+        requested = super().requested_fields()
+        return super().wants_html() or (requested is not None and 'response_html' in requested)
+
+    def build_field(self, field_name, info, model_class, nested_depth):
+        attributes = {attr.key: attr for attr in model_class.metadata_attributes()}
+        if field_name in attributes:
+            return self.build_metadata_field(attributes[field_name])
+        return super().build_field(field_name, info, model_class, nested_depth)
+
+    @staticmethod
+    def build_metadata_field(attr):
+        kwargs = {'required': False, 'help_text': attr.help_text}
+        if attr.name != attr.key:
+            kwargs['source'] = attr.name
+        if isinstance(attr.default, bool):
+            return serializers.BooleanField, kwargs
+        kwargs['allow_blank'] = attr.default == ''
+        if attr.choices:
+            return serializers.ChoiceField, {**kwargs, 'choices': attr.choices}
+        return serializers.CharField, {**kwargs, 'max_length': attr.max_length}
+
+
+class DSAAIResponseSerializer(AIResponseSerializer):
+
+    class Meta(AIResponseSerializer.Meta):
         model = DSAAIResponse
         fields = [
             'id',
@@ -127,33 +301,11 @@ class DSAAIResponseSerializer(serializers.ModelSerializer):
             'updated_at',
             'is_helpful',
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'user']
-
-    def to_representation(self, instance):
-        """Convert topic_tags to a list for output."""
-        ret = super().to_representation(instance)
-        ret['topic_tags'] = instance.get_topic_tags_list()
-        return ret
 
-    def to_internal_value(self, data):
-        """Convert topic_tags from list to comma-separated string for input."""
-        tags = data.get('topic_tags')
-        if tags is not None and isinstance(tags, list):
-            data = data.copy()
-            data['topic_tags'] = ','.join(tags)
-        return super().to_internal_value(data)
-    
 
-class SoftwareDevAIResponseSerializer(serializers.ModelSerializer):
-    topic_tags = serializers.ListField(
-        child=serializers.CharField(),
-        source='get_topic_tags_list',
-        write_only=False,
-        required=False
-    )
-    user = serializers.StringRelatedField(read_only=True)  # or use PrimaryKeyRelatedField for user id
+class SoftwareDevAIResponseSerializer(AIResponseSerializer):
 
-    class Meta:
+    class Meta(AIResponseSerializer.Meta):
         model = SoftwareDevAIResponse
         fields = [
             'id',
@@ -169,33 +321,11 @@ class SoftwareDevAIResponseSerializer(serializers.ModelSerializer):
             'updated_at',
             'is_helpful',
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'user']
 
-    def to_representation(self, instance):
-        """Convert topic_tags to a list for output."""
-        ret = super().to_representation(instance)
-        ret['topic_tags'] = instance.get_topic_tags_list()
-        return ret
 
-    def to_internal_value(self, data):
-        """Convert topic_tags from list to comma-separated string for input."""
-        tags = data.get('topic_tags')
-        if tags is not None and isinstance(tags, list):
-            data = data.copy()
-            data['topic_tags'] = ','.join(tags)
-        return super().to_internal_value(data)
-    
-
-class SystemDesignAIResponseSerializer(serializers.ModelSerializer):
-    topic_tags = serializers.ListField(
-        child=serializers.CharField(),
-        source='get_topic_tags_list',
-        write_only=False,
-        required=False
-    )
-    user = serializers.StringRelatedField(read_only=True)  # Shows username or __str__ of user
+class SystemDesignAIResponseSerializer(AIResponseSerializer):
 
-    class Meta:
+    class Meta(AIResponseSerializer.Meta):
         model = SystemDesignAIResponse
         fields = [
             'id',
@@ -212,33 +342,11 @@ class SystemDesignAIResponseSerializer(serializers.ModelSerializer):
             'updated_at',
             'is_helpful',
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'user']
 
-    def to_representation(self, instance):
-        """Convert topic_tags to a list for output."""
-        ret = super().to_representation(instance)
-        ret['topic_tags'] = instance.get_topic_tags_list()
-        return ret
 
-    def to_internal_value(self, data):
-        """Convert topic_tags from list to comma-separated string for input."""
-        tags = data.get('topic_tags')
-        if tags is not None and isinstance(tags, list):
-            data = data.copy()
-            data['topic_tags'] = ','.join(tags)
-        return super().to_internal_value(data)
-    
+class JobSearchAIResponseSerializer(AIResponseSerializer):
 
-class JobSearchAIResponseSerializer(serializers.ModelSerializer):
-    topic_tags = serializers.ListField(
-        child=serializers.CharField(),
-        source='get_topic_tags_list',
-        write_only=False,
-        required=False
-    )
-    user = serializers.StringRelatedField(read_only=True)  # Shows username or __str__ of user
-
-    class Meta:
+    class Meta(AIResponseSerializer.Meta):
         model = JobSearchAIResponse
         fields = [
             'id',
@@ -256,19 +364,108 @@ class JobSearchAIResponseSerializer(serializers.ModelSerializer):
             'updated_at',
             'is_helpful',
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'user']
 
-    def to_representation(self, instance):
-        """Convert topic_tags to a list for output."""
-        ret = super().to_representation(instance)
-        ret['topic_tags'] = instance.get_topic_tags_list()
-        return ret
 
-    def to_internal_value(self, data):
-        """Convert topic_tags from list to comma-separated string for input."""
-        tags = data.get('topic_tags')
-        if tags is not None and isinstance(tags, list):
-            data = data.copy()
-            data['topic_tags'] = ','.join(tags)
-        return super().to_internal_value(data)
-    
\ No newline at end of file
+class AIResponseListMixin:
+    """
+    List rows carry the stored `preview`. The whole answer, which list queries
+    defer, is only sent when asked for: `?fields=...,response` (or
+    `response_html`) or `?format=html`.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.requested_fields() is None and not self.wants_html():
+            del fields['response']
+        return fields
+
+
+@functools.cache
+def list_serializer_for(serializer_class):
+    """List-mode variant of an AI response serializer (see AIResponseListMixin)."""
+    class Meta(serializer_class.Meta):
+        fields = [
+            alias for name in serializer_class.Meta.fields
+            for alias in (['preview', 'response'] if name == 'response' else [name])
+        ]
+
+    name = serializer_class.__name__.replace('Serializer', 'ListSerializer')
+    return type(name, (AIResponseListMixin, serializer_class), {'Meta': Meta, '__module__': __name__})
+
+
+@functools.cache
+def metadata_serializer_for(model_class):
+    """
+    Validates the metadata of a question to be answered as a `model_class` row
+    (topic tags and the category's MetadataAttributes, keyed as in
+    AIResponse.metadata), so bad values are a 400 before Gemini is called.
+    """
+    fields = {'topic_tags': TopicTagsField(required=False)}
+    for attr in model_class.metadata_attributes():
+        field_class, kwargs = AIResponseSerializer.build_metadata_field(attr)
+        kwargs.pop('source', None)
+        fields[attr.key] = field_class(**kwargs)
+    name = model_class.__name__.replace('AIResponse', 'MetadataSerializer')
+    return type(name, (serializers.Serializer,), {**fields, '__module__': __name__})
+
+
+# Serializer used for each AI response category (keyed like Task.category)
+AI_RESPONSE_SERIALIZERS = {
+    Category.DSA: DSAAIResponseSerializer,
+    Category.DEVELOPMENT: SoftwareDevAIResponseSerializer,
+    Category.SYSTEM_DESIGN: SystemDesignAIResponseSerializer,
+    Category.JOB_SEARCH: JobSearchAIResponseSerializer,
+}
+
+
+class AIJobListSerializer(serializers.ListSerializer):
+    """Loads the AI responses of a page of jobs with one query per category, not one per job."""
+
+    def to_representation(self, data):
+        jobs = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        wanted = {}
+        for job in jobs:
+            if job.status == AIJob.Status.SUCCEEDED and job.object_id is not None:
+                wanted.setdefault(job.category, set()).add(job.object_id)
+        self.child.results = {}
+        for category, ids in wanted.items():
+            model = AI_RESPONSE_SERIALIZERS[category].Meta.model
+            for instance in model.objects.filter(pk__in=ids).select_related('user'):
+                self.child.results[category, instance.pk] = instance
+        return super().to_representation(jobs)
+
+
+class AIJobSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    result = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AIJob
+        fields = [
+            'id',
+            'category',
+            'kind',
+            'status',
+            'object_id',
+            'error',
+            'attempts',
+            'created_at',
+            'updated_at',
+            'finished_at',
+            'result',
+        ]
+        read_only_fields = fields
+        list_serializer_class = AIJobListSerializer
+
+    def get_result(self, obj):
+        """Embed the generated AI response once the job has succeeded."""
+        if obj.status != AIJob.Status.SUCCEEDED or obj.object_id is None:
+            return None
+        serializer_class = AI_RESPONSE_SERIALIZERS[obj.category]
+        results = getattr(self, 'results', None)
+        if results is not None:
+            instance = results.get((obj.category, obj.object_id))
+        else:
+            instance = serializer_class.Meta.model.objects.filter(pk=obj.object_id).select_related('user').first()
+        if instance is None or instance.user_id != obj.user_id:
+            return None
+        return serializer_class(instance, context={**self.context, 'embedded': True}).data
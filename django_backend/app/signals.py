@@ -1,7 +1,11 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.conf import settings
-from .models import Goal, Category  
+from .models import Task, Goal, Category, AIResponse, DSAAIResponse, SoftwareDevAIResponse, SystemDesignAIResponse, JobSearchAIResponse
+from .generation import AI_CATEGORIES
+from .answer_cache import get_answer_cache
+from .task_context import invalidate_digests
+from . import facets, rendering
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_default_goals(sender, instance, created, **kwargs):
@@ -29,4 +33,67 @@ def create_default_goals(sender, instance, created, **kwargs):
             Goal.objects.create(
                 user=instance,
                 **goal_data
-            )
\ No newline at end of file
+            )
+
+
+@receiver(post_save, sender=AIResponse)
+@receiver(post_save, sender=DSAAIResponse)
+@receiver(post_save, sender=SoftwareDevAIResponse)
+@receiver(post_save, sender=SystemDesignAIResponse)
+@receiver(post_save, sender=JobSearchAIResponse)
+def evict_unhelpful_answer(sender, instance, created, **kwargs):
+    """Stop reusing a cached answer once a user marks it as not helpful."""
+    answer_cache = get_answer_cache()
+    if instance.is_helpful is False and answer_cache:
+        ai_category = AI_CATEGORIES[instance.category]
+        answer_cache.invalidate(ai_category, instance.user_id, instance.question, ai_category.metadata_of(instance), instance.response)
+
+
+@receiver(post_save, sender=AIResponse)
+@receiver(post_save, sender=DSAAIResponse)
+@receiver(post_save, sender=SoftwareDevAIResponse)
+@receiver(post_save, sender=SystemDesignAIResponse)
+@receiver(post_save, sender=JobSearchAIResponse)
+def render_answer_html(sender, instance, **kwargs):
+    """Re-render the stored HTML in the background whenever the answer text changes."""
+    if rendering.is_stale(instance):
+        rendering.schedule(sender, [instance.pk])
+
+
+@receiver(pre_save, sender=AIResponse)
+@receiver(pre_save, sender=DSAAIResponse)
+@receiver(pre_save, sender=SoftwareDevAIResponse)
+@receiver(pre_save, sender=SystemDesignAIResponse)
+@receiver(pre_save, sender=JobSearchAIResponse)
+def remember_stored_facets(sender, instance, raw=False, **kwargs):
+    """Note the facets the row has in the database, for update_facet_counts to diff against."""
+    if not raw:
+        instance._stored_facets = facets.stored_facets(instance.pk) if instance.pk else []
+
+
+@receiver(post_save, sender=AIResponse)
+@receiver(post_save, sender=DSAAIResponse)
+@receiver(post_save, sender=SoftwareDevAIResponse)
+@receiver(post_save, sender=SystemDesignAIResponse)
+@receiver(post_save, sender=JobSearchAIResponse)
+def update_facet_counts(sender, instance, raw=False, **kwargs):
+    """Move the user's facet counters from the row's old values to its new ones."""
+    if not raw:
+        facets.apply(instance.user_id, added=facets.facets_of(instance), removed=instance._stored_facets)
+        instance._stored_facets = None
+
+
+@receiver(post_delete, sender=AIResponse)
+@receiver(post_delete, sender=DSAAIResponse)
+@receiver(post_delete, sender=SoftwareDevAIResponse)
+@receiver(post_delete, sender=SystemDesignAIResponse)
+@receiver(post_delete, sender=JobSearchAIResponse)
+def remove_facet_counts(sender, instance, **kwargs):
+    facets.remove(instance.user_id, facets.facets_of(instance))
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_digest(sender, instance, **kwargs):
+    """Rebuild the user's AI prompt task context after any task change."""
+    invalidate_digests(instance.user_id)
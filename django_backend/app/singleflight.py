@@ -0,0 +1,178 @@
+"""
+Single-flight coalescing of identical Gemini prompts.
+
+Concurrent callers with the same prompt hash share one upstream call:
+- inside a process, followers wait on the leader's threading.Event;
+- across gunicorn workers, the leader holds an AIPromptLease row and other
+  workers poll it until the result is written. If the leader dies, its lease
+  expires and one of the waiting workers takes over.
+A finished call is never reused: the next caller with the same prompt takes
+the row over and calls Gemini again.
+"""
+import hashlib
+import os
+import random
+import socket
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import AIPromptLease
+from .resilience import AIUnavailableError
+from . import metrics
+
+_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+_RETRY = object()
+
+
+class SingleFlightError(AIUnavailableError):
+    """
+    The upstream call made by the leader in another worker failed. Carries the
+    leader's status code and Retry-After, so every caller gets the same response.
+    """
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code or AIUnavailableError.status_code
+        self.retry_after = retry_after
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def prompt_hash(prompt):
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+def do(key, fn):
+    """Return fn(), sharing a single call among all concurrent callers with the same key."""
+    if not settings.AI_SINGLEFLIGHT_ENABLED:
+        return fn()
+
+    with _flights_lock:
+        flight = _flights.get(key)
+        is_leader = flight is None
+        if is_leader:
+            flight = _flights[key] = _Flight()
+
+    if not is_leader:
+        metrics.incr('singleflight_shared_local')
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = _do_across_processes(key, fn)
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+
+def _do_across_processes(key, fn):
+    while True:
+        if _acquire(key):
+            return _lead(key, fn)
+        result = _wait_for(key)
+        if result is not _RETRY:
+            return result
+
+
+def _acquire(key):
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=settings.AI_SINGLEFLIGHT_LEASE_SECONDS)
+    try:
+        with transaction.atomic():
+            AIPromptLease.objects.create(prompt_hash=key, owner=_OWNER, expires_at=expires_at)
+        return True
+    except IntegrityError:
+        pass
+
+    # Reuse the row when its holder died or its call has finished: a result is
+    # only shared with callers that arrived while the call was in flight
+    reusable = (
+        Q(status=AIPromptLease.Status.PENDING, expires_at__lt=now) |
+        Q(status__in=[AIPromptLease.Status.DONE, AIPromptLease.Status.FAILED])
+    )
+    taken = AIPromptLease.objects.filter(reusable, prompt_hash=key).update(
+        owner=_OWNER,
+        status=AIPromptLease.Status.PENDING,
+        result='',
+        error='',
+        status_code=None,
+        retry_after=None,
+        expires_at=expires_at,
+        updated_at=now,
+    )
+    return bool(taken)
+
+
+def _lead(key, fn):
+    metrics.incr('singleflight_leader_calls')
+    mine = AIPromptLease.objects.filter(prompt_hash=key, owner=_OWNER)
+    try:
+        result = fn()
+    except AIUnavailableError as e:
+        mine.update(
+            status=AIPromptLease.Status.FAILED, error=str(e), status_code=e.status_code,
+            retry_after=e.retry_after, updated_at=timezone.now(),
+        )
+        raise
+    except Exception as e:
+        mine.update(status=AIPromptLease.Status.FAILED, error=f'AI model error: {str(e)}', updated_at=timezone.now())
+        raise
+    mine.update(status=AIPromptLease.Status.DONE, result=result, updated_at=timezone.now())
+
+    # Occasionally drop long-finished leases so the table stays small
+    if random.random() < 0.01:
+        AIPromptLease.objects.filter(expires_at__lt=timezone.now() - timedelta(hours=1)).delete()
+    return result
+
+
+def _wait_for(key):
+    """Poll another worker's lease; returns its result or _RETRY if the lease is gone/expired."""
+    metrics.incr('singleflight_shared_remote')
+    while True:
+        lease = (
+            AIPromptLease.objects.filter(prompt_hash=key)
+            .values('status', 'result', 'error', 'status_code', 'retry_after', 'expires_at')
+            .first()
+        )
+        if lease is None:
+            return _RETRY
+        if lease['status'] == AIPromptLease.Status.DONE:
+            return lease['result']
+        if lease['status'] == AIPromptLease.Status.FAILED:
+            raise SingleFlightError(lease['error'], lease['status_code'], lease['retry_after'])
+        if lease['expires_at'] < timezone.now():
+            metrics.incr('singleflight_takeovers')
+            return _RETRY
+        time.sleep(settings.AI_SINGLEFLIGHT_POLL_INTERVAL)
+
+
+def _metrics_section():
+    counters = metrics.get_counters(
+        'singleflight_leader_calls', 'singleflight_shared_local',
+        'singleflight_shared_remote', 'singleflight_takeovers',
+    )
+    counters['in_flight_local'] = len(_flights)
+    return counters
+
+
+metrics.register_section('singleflight', _metrics_section)
@@ -0,0 +1,228 @@
+"""
+Server-Sent Events relay for streamed Gemini answers.
+
+A producer thread pulls chunks from Gemini and appends them to an AIStream row,
+keyed by stream id. The HTTP response only tails that stream, so the
+generation keeps going if the client drops, and a client that reconnects with
+`Last-Event-ID: <stream_id>:<seq>` resumes after the last chunk it saw instead
+of paying for a second generation, whichever worker the reconnect reaches.
+The process running the producer also keeps the stream in memory, so its own
+readers are woken on every chunk instead of polling the database.
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.db import connection
+from django.db.models import F, Func, IntegerField, TextField, Value
+from django.utils import timezone
+from rest_framework.renderers import BaseRenderer
+from .models import AIStream
+
+logger = logging.getLogger(__name__)
+
+RUNNING = AIStream.Status.RUNNING
+DONE = AIStream.Status.DONE
+FAILED = AIStream.Status.FAILED
+
+# Streams produced by this process: stream id -> _LocalStream
+_local_streams = {}
+_local_streams_lock = threading.Lock()
+
+
+class _LocalStream:
+    """In-memory copy of a stream whose producer runs in this process."""
+
+    def __init__(self, meta):
+        self.meta = meta
+        self.chunks = []
+        self.changed = threading.Condition()
+
+
+class StreamBuffer:
+    """Chunks of one streamed answer plus its status, stored in an AIStream row."""
+
+    def __init__(self, stream_id):
+        self.stream_id = stream_id
+        self.local = _local_streams.get(stream_id)
+
+    @classmethod
+    def create(cls, user_id, category):
+        now = timezone.now()
+        AIStream.objects.filter(expires_at__lt=now).delete()
+        stream = AIStream.objects.create(
+            stream_id=uuid.uuid4().hex,
+            user_id=user_id,
+            category=category,
+            expires_at=now + timedelta(seconds=settings.AI_STREAM_TTL),
+        )
+        buffer = cls(stream.stream_id)
+        buffer.local = _LocalStream({'user_id': user_id, 'category': category, 'status': RUNNING, 'count': 0})
+        with _local_streams_lock:
+            _local_streams[buffer.stream_id] = buffer.local
+        return buffer
+
+    def _rows(self):
+        return AIStream.objects.filter(pk=self.stream_id)
+
+    def get_meta(self):
+        if self.local is not None:
+            with self.local.changed:
+                return dict(self.local.meta)
+        return (
+            self._rows()
+            .filter(expires_at__gt=timezone.now())
+            .annotate(count=Func(F('chunks'), function='CARDINALITY', output_field=IntegerField()))
+            .values('user_id', 'category', 'status', 'count', 'object_id', 'error')
+            .first()
+        )
+
+    def _update_local(self, text=None, **meta):
+        with self.local.changed:
+            if text is not None:
+                self.local.chunks.append(text)
+                self.local.meta['count'] += 1
+            self.local.meta.update(meta)
+            self.local.changed.notify_all()
+
+    def append(self, text):
+        # Single producer per stream, which also holds the local copy
+        self._rows().update(chunks=Func(
+            F('chunks'), Value(text), function='ARRAY_APPEND', output_field=ArrayField(TextField()),
+        ))
+        self._update_local(text)
+
+    def _end(self, **fields):
+        expires_at = timezone.now() + timedelta(seconds=settings.AI_STREAM_TTL)
+        self._rows().update(expires_at=expires_at, **fields)
+        self._update_local(**fields)
+
+    def finish(self, object_id):
+        self._end(status=DONE, object_id=object_id)
+
+    def fail(self, error):
+        self._end(status=FAILED, error=error)
+
+    def read(self, start, end):
+        """Return chunks with seq in [start, end)."""
+        if start >= end:
+            return []
+        if self.local is not None:
+            with self.local.changed:
+                return self.local.chunks[start:end]
+        return self._rows().values_list(f'chunks__{start}_{end}', flat=True).first() or []
+
+    def wait(self, meta, timeout):
+        """Sleep until the stream no longer matches `meta`, or at most `timeout` seconds."""
+        if self.local is None:
+            time.sleep(timeout)
+            return
+        with self.local.changed:
+            self.local.changed.wait_for(lambda: self.local.meta != meta, timeout)
+
+
+def start_stream(user, category, produce):
+    """
+    Create a buffer and drive the `produce` generator on a background thread.
+    `produce` yields text chunks and returns the id of the row it persisted.
+    """
+    buffer = StreamBuffer.create(user.pk, category)
+
+    def run():
+        try:
+            while True:
+                try:
+                    buffer.append(next(produce))
+                except StopIteration as stop:
+                    buffer.finish(stop.value)
+                    break
+        except Exception as e:
+            logger.exception("AI stream %s failed", buffer.stream_id)
+            buffer.fail(f'AI model error: {str(e)}')
+        finally:
+            # Later readers in this process read the row, like every other worker
+            with _local_streams_lock:
+                _local_streams.pop(buffer.stream_id, None)
+            connection.close()
+
+    threading.Thread(target=run, name=f'ai-stream-{buffer.stream_id}', daemon=True).start()
+    return buffer
+
+
+def parse_last_event_id(value):
+    """
+    Split a `<stream_id>:<seq>` event id. The seq is None for the terminal
+    `done`/`error` events, meaning every chunk was already delivered.
+    """
+    stream_id, _, seq = (value or '').partition(':')
+    try:
+        return stream_id or None, int(seq)
+    except ValueError:
+        return stream_id or None, None
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets streaming actions accept `Accept: text/event-stream`; regular
+    (error) responses are rendered as a single SSE `error` event.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return _event('error', data).encode(self.charset)
+
+
+def _event(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def event_stream(buffer, last_seq, serialize_result):
+    """
+    Yield SSE frames for every chunk after `last_seq` until the stream ends.
+    `serialize_result(object_id)` builds the payload of the final `done` event.
+    """
+    next_seq = last_seq + 1 if last_seq is not None else None
+    last_write = time.monotonic()
+
+    yield f"retry: {settings.AI_STREAM_RETRY_MS}\n"
+    yield _event('start', {'stream_id': buffer.stream_id})
+
+    while True:
+        meta = buffer.get_meta()
+        if meta is None:
+            yield _event('error', {'error': 'Stream expired'})
+            return
+
+        if next_seq is None:
+            next_seq = meta['count']
+
+        for text in buffer.read(next_seq, meta['count']):
+            yield _event('chunk', {'text': text}, event_id=f"{buffer.stream_id}:{next_seq}")
+            next_seq += 1
+            last_write = time.monotonic()
+
+        if next_seq >= meta['count']:
+            if meta['status'] == DONE:
+                yield _event('done', serialize_result(meta['object_id']), event_id=f"{buffer.stream_id}:done")
+                return
+            if meta['status'] == FAILED:
+                yield _event('error', {'error': meta['error']}, event_id=f"{buffer.stream_id}:error")
+                return
+
+        if time.monotonic() - last_write > settings.AI_STREAM_HEARTBEAT:
+            # Comment line keeps proxies from closing an idle connection
+            yield ": keep-alive\n\n"
+            last_write = time.monotonic()
+
+        buffer.wait(meta, settings.AI_STREAM_POLL_INTERVAL)
@@ -0,0 +1,173 @@
+"""
+The "User's <category> Tasks" section of AI prompts.
+
+Each user's tasks in a category are kept as a precomputed digest in the
+AI_TASK_DIGEST_CACHE cache: the formatted line for every task together with its
+token estimate, keywords, completion state and due date. The digest is rebuilt
+on a miss and dropped by the Task post_save/post_delete signals, so building a
+prompt for an unchanged task list needs no queries. The signals can only drop
+digests from a shared cache: with a per-process cache (LocMemCache, the
+default) a digest is kept for just AI_TASK_DIGEST_LOCAL_TTL seconds, so other
+workers and `run_ai_worker` see task changes within that time.
+
+When building the digest, only the columns the summary needs are fetched, with
+the description cut down in the database. Per question, the entries are ranked by
+relevance (word overlap, incomplete first, nearest due date) and added until the
+estimated token count reaches settings.AI_TASK_CONTEXT_TOKEN_BUDGET; the rest are
+summarized as a count.
+"""
+import math
+import re
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import F
+from django.db.models.functions import Substr
+from django.utils import timezone
+from .models import Task, Category
+from . import metrics
+
+DESCRIPTION_PREVIEW_CHARS = 100
+
+_TOKEN = re.compile(r'\w+|[^\w\s]')
+_WORD = re.compile(r'\w+')
+_STOP_WORDS = frozenset(
+    'the and for with that this from what how why when where which who are was were '
+    'you your can does should would could into about have has had not but all any use'.split()
+)
+
+
+def estimate_tokens(text):
+    """
+    Rough local token count: one token per punctuation mark and per ~4 characters
+    of each word. Close enough to Gemini's tokenizer for budgeting.
+    """
+    return sum(math.ceil(len(piece) / 4) for piece in _TOKEN.findall(text))
+
+
+def keywords(text):
+    return {word for word in _WORD.findall(text.casefold()) if len(word) > 2 and word not in _STOP_WORDS}
+
+
+def fetch_task_rows(user_id, category):
+    """
+    (title, completed, due_date, description head) for the user's tasks in a category.
+    The description is truncated in the database to one character past the preview
+    length, so the formatter can tell whether to add an ellipsis.
+    """
+    return list(
+        Task.objects
+        .filter(user_id=user_id, category=category)
+        .annotate(description_head=Substr('description', 1, DESCRIPTION_PREVIEW_CHARS + 1))
+        .order_by('completed', F('due_date').asc(nulls_last=True), '-created_at')
+        .values_list('title', 'completed', 'due_date', 'description_head')
+        [:settings.AI_TASK_CONTEXT_MAX_CANDIDATES]
+    )
+
+
+def format_task_row(row):
+    title, completed, due_date, description_head = row
+    description = description_head[:DESCRIPTION_PREVIEW_CHARS]
+    ellipsis = '...' if len(description_head) > DESCRIPTION_PREVIEW_CHARS else ''
+    return (
+        f"- {title} | {'Completed' if completed else 'Incomplete'}"
+        f" | Due: {due_date if due_date else 'N/A'}"
+        f"\n  {description}{ellipsis}"
+    )
+
+
+def build_digest(user_id, category):
+    """One (line, tokens, keywords, completed, due_date) entry per task."""
+    digest = []
+    for row in fetch_task_rows(user_id, category):
+        title, completed, due_date, description_head = row
+        line = format_task_row(row)
+        digest.append((line, estimate_tokens(line), keywords(f"{title} {description_head}"), completed, due_date))
+    return digest
+
+
+def _cache():
+    return caches[settings.AI_TASK_DIGEST_CACHE]
+
+
+def _digest_ttl():
+    if isinstance(_cache(), LocMemCache):
+        return settings.AI_TASK_DIGEST_LOCAL_TTL
+    return settings.AI_TASK_DIGEST_TTL
+
+
+def _digest_key(user_id, category):
+    return f"ai_task_digest_{user_id}_{category}"
+
+
+def get_digest(user_id, category):
+    """The cached task digest, rebuilt from the database on a miss."""
+    key = _digest_key(user_id, category)
+    digest = _cache().get(key)
+    if digest is not None:
+        metrics.incr('task_digest_hits')
+        return digest
+
+    metrics.incr('task_digest_misses')
+    start = time.perf_counter()
+    digest = build_digest(user_id, category)
+    metrics.incr('task_digest_rebuild_us', int((time.perf_counter() - start) * 1_000_000))
+    _cache().set(key, digest, _digest_ttl())
+    return digest
+
+
+def invalidate_digests(user_id):
+    """Drop all of a user's digests (a task may have moved between categories)."""
+    _cache().delete_many([_digest_key(user_id, category) for category in Category.values])
+
+
+def rank_digest(digest, question):
+    """Most relevant first: word overlap with the question, incomplete, nearest due date."""
+    question_words = keywords(question)
+    today = timezone.localdate()
+
+    def relevance(entry):
+        line, tokens, task_words, completed, due_date = entry
+        due_distance = abs((due_date - today).days) if due_date else math.inf
+        return (-len(question_words & task_words), completed, due_distance)
+
+    return sorted(digest, key=relevance)
+
+
+def format_tasks_section(label, digest, question, token_budget=None):
+    """Render the ranked digest entries that fit in the token budget."""
+    if not digest:
+        return f"User has no {label} tasks.\n\n"
+
+    if token_budget is None:
+        token_budget = settings.AI_TASK_CONTEXT_TOKEN_BUDGET
+    header = f"User's {label} Tasks:\n"
+    used = estimate_tokens(header)
+    lines = []
+    for line, tokens, *_ in rank_digest(digest, question):
+        if used + tokens > token_budget:
+            break
+        lines.append(line)
+        used += tokens
+
+    omitted = len(digest) - len(lines)
+    if omitted:
+        lines.append(f"- ... and {omitted} more {label} tasks")
+    tasks_summary = "\n".join(lines)
+    return f"{header}{tasks_summary}\n\n"
+
+
+def _metrics_section():
+    counters = metrics.get_counters('task_digest_hits', 'task_digest_misses', 'task_digest_rebuild_us')
+    rebuilds = counters['task_digest_misses']
+    return {
+        'hits': counters['task_digest_hits'],
+        'misses': rebuilds,
+        'hit_rate': metrics.ratio(counters['task_digest_hits'], counters['task_digest_hits'] + rebuilds),
+        'rebuild_ms_total': round(counters['task_digest_rebuild_us'] / 1000, 1),
+        'rebuild_ms_avg': round(counters['task_digest_rebuild_us'] / 1000 / rebuilds, 2) if rebuilds else None,
+    }
+
+
+metrics.register_section('task_digest', _metrics_section)
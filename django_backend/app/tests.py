@@ -1,3 +1,1304 @@
-from django.test import TestCase
+"""
+Query-count and query-plan regression tests for every route in app/urls.py
+(RouteQueryTests), followed by behavior tests of the modules behind them.
 
-# Create your tests here.
+The database is seeded with a realistic spread of users, tasks, AI responses,
+jobs and usage records and ANALYZEd, so PostgreSQL plans the queries as it
+would in production. Each route is then requested once and must
+
+- run at most its budgeted number of queries (catches N+1s), and
+- not plan a sequential scan of a large table for any of them (catches
+  missing indexes); the failure message suggests the index to add.
+
+A route added to app/urls.py without an entry in ROUTES fails
+test_every_route_is_covered.
+"""
+import io
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse, StreamingHttpResponse
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import facets, jobs, metrics, resilience, singleflight, task_context, urls
+from .answer_cache import AnswerCache, LocalMemoryBackend
+from .fake_gemini import _PARAGRAPH
+from .fields import RAW, ZLIB, decode_text, encode_text
+from .generation import AI_CATEGORIES, generate_ai_response
+from .management.commands.benchmark_normalizer import legacy_clean_ai_response
+from .middleware import CompressionMiddleware, brotli, choose_encoding
+from .models import (
+    AIJob, AIMetricCounter, AIPromptLease, AIResponse, AIStream, AIResponseFacet, AIUsageRecord, Category, CustomUser, Goal, Task,
+    preview_for, search_vector_for,
+)
+from .normalizer import MarkdownNormalizer, normalize_markdown
+from .pagination import KeysetPagination, encode_cursor
+from .rendering import render_markdown
+from .serializers import TaskQuerySerializer
+from .streams import StreamBuffer, event_stream
+from .task_context import fetch_task_rows
+
+# Seed volumes: enough rows per table that an index beats a sequential scan
+# for one user's rows, as it does in production
+SEED_USERS = 40
+TASKS_PER_USER = 250
+RESPONSES_PER_CATEGORY = 25  # per user, so 100 per user
+JOBS_PER_USER = 25
+USAGE_RECORDS = 5000
+USAGE_DAYS = 60
+HEAVY_USER_TASKS = 20000  # test_task_context_query_reads_the_index_in_order
+
+# Models whose tables must never be read with a sequential scan
+LARGE_MODELS = (Task, AIResponse, AIJob, AIUsageRecord)
+
+ANSWER = "## Approach\n\nUse a hash map to remember what you have seen.\n\n```python\nseen = {}\n```"
+TOPICS = ['arrays', 'graphs', 'trees', 'sorting', 'caching', 'queues', 'strings', 'heaps']
+WORDS = ['binary', 'search', 'sliding', 'window', 'prefix', 'sum', 'union', 'find', 'trie', 'greedy']
+
+# Filter action of each category's viewset: (URL prefix, action, parameter, value)
+CATEGORY_ROUTES = {
+    Category.DSA: ('dsa-ai-response', 'by-difficulty', 'difficulty', 'medium'),
+    Category.DEVELOPMENT: ('software-dev-ai-response', 'by-tech-stack', 'tech_stack', 'backend'),
+    Category.SYSTEM_DESIGN: ('system-design-ai-response', 'by-system-type', 'system_type', 'api'),
+    Category.JOB_SEARCH: ('job-search-ai-response', 'by-category', 'category', 'resume'),
+}
+
+
+def route(name, method, max_queries, user='member', args=(), query='', data=None, status=200):
+    """One request of the harness: `args` and `data` may refer to seeded objects as '{goal}' etc."""
+    return {
+        'name': name, 'method': method, 'max_queries': max_queries, 'user': user,
+        'args': args, 'query': query, 'data': data, 'status': status,
+    }
+
+
+# Every route in app/urls.py with its query budget. Two of the queries of each
+# authenticated request load the session and the user.
+ROUTES = [
+    route('api-root', 'get', 2),
+    route('csrf_token', 'get', 0, user=None),
+    route('signup', 'post', 10, user=None, data={
+        'email': 'new@example.com', 'username': 'new', 'password': 'a-long-Passw0rd', 'confirm_password': 'a-long-Passw0rd',
+    }, status=201),
+    route('login', 'post', 10, user=None, data={'email': 'member@example.com', 'password': 'member-Passw0rd'}),
+    route('logout', 'post', 4),
+    route('user-details', 'get', 2),
+    route('ai-metrics', 'get', 5, user='admin'),  # + flushing and reading the counters, the admission slots
+    route('ai-usage', 'get', 4, user='admin'),
+
+    route('task-list', 'get', 3),
+    route('task-list', 'get', 4, query='count=exact'),
+    route('task-list', 'get', 3, query='category=dsa&completed=false'),
+    route('task-list', 'get', 3, query='priority_min=4&ordering=-priority'),
+    route('task-list', 'get', 3, query=f'completed=false&due_after={date.today()}&due_before={date.today() + timedelta(days=7)}&ordering=due_date'),
+    route('task-list', 'get', 3, query='tags=graphs,trees'),
+    route('task-list', 'post', 3, data={'title': 'New task', 'category': 'dsa'}, status=201),
+    route('task-detail', 'get', 3, args=('{task}',)),
+    route('task-detail', 'patch', 4, args=('{task}',), data={'completed': True}),
+    route('task-detail', 'delete', 4, args=('{task}',), status=204),
+
+    route('goal-list', 'get', 3),
+    route('goal-detail', 'get', 3, args=('{goal}',)),
+    route('goal-detail', 'patch', 4, args=('{goal}',), data={'daily_target': 3}),
+    route('goal-add-progress', 'post', 4, args=('{goal}',), data={'amount': 1}),
+    route('goal-subtract-progress', 'post', 4, args=('{goal}',), data={'amount': 1}),
+    route('goal-mark-daily-goal-completed', 'post', 4, args=('{goal}',)),
+    route('goal-remove-completed-day', 'post', 3, args=('{goal}',), status=400),
+
+    route('ai-response-list', 'get', 3),
+    route('ai-response-list', 'get', 3, query='category=dsa'),
+    route('ai-response-detail', 'get', 3, args=('{dsa}',)),
+    route('ai-response-search', 'get', 3, query='q=sliding window'),
+
+    route('ai-job-list', 'get', 4),  # + the succeeded jobs' responses, one query per category
+    route('ai-job-detail', 'get', 4, args=('{job}',)),
+]
+for key, (prefix, filter_action, param, value) in CATEGORY_ROUTES.items():
+    ROUTES += [
+        route(f'{prefix}-list', 'get', 3),
+        route(f'{prefix}-list', 'get', 3, query='format=html'),
+        route(f'{prefix}-{filter_action}', 'get', 3, query=f'{param}={value}'),
+        route(f'{prefix}-by-topic', 'get', 3, query='tag=graphs'),
+        route(f'{prefix}-facets', 'get', 3),
+        route(f'{prefix}-detail', 'get', 3, args=(f'{{{key}}}',)),
+        route(f'{prefix}-detail', 'patch', 8, args=(f'{{{key}}}',), data={'is_helpful': True}),
+        route(f'{prefix}-detail', 'delete', 5, args=(f'{{{key}}}',), status=204),
+        route(f'{prefix}-generate-response', 'post', 7, data={'question': 'How do I find a cycle in a graph?'}, status=201),
+        route(f'{prefix}-generate-response', 'post', 3, query='async=true', data={'question': 'How do I find a cycle in a graph?'}, status=202),
+        route(f'{prefix}-batch-generate', 'post', 11, data={'questions': ['How do I reverse a list?', 'How do I merge two heaps?']}, status=201),
+        route(f'{prefix}-regenerate', 'post', 8, args=(f'{{{key}}}',)),
+        route(f'{prefix}-resume-stream', 'get', 3, query='last_event_id=missing:0', status=404),
+    ]
+
+# Routes that can't be measured from the request alone, and why
+EXEMPT_ROUTES = {
+    # The answer is generated and stored on a producer thread, outside the request's connection
+    f'{prefix}-stream-response': 'streams from a background thread'
+    for prefix, *_ in CATEGORY_ROUTES.values()
+}
+
+
+def url_names():
+    """Names of every route in app/urls.py."""
+    return {pattern.name for pattern in [*urls.router.urls, *urls.urlpatterns] if getattr(pattern, 'name', None)}
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+# A column compared in a plan's filter, e.g. "(user_id = 1)" or "((category)::text = 'dsa'::text)"
+COMPARISON = re.compile(r'\(\(?(\w+)\)?(?:::[\w ]+?)? (=|<>|<=|>=|<|>|@>|<@|@@|~~) ')
+
+
+def suggested_index(model, condition):
+    """A models.Index for the columns compared in a scan's filter, equality first."""
+    columns = {field.column: field.name for field in model._meta.concrete_fields}
+    compared = sorted(COMPARISON.findall(condition), key=lambda match: match[1] != '=')
+    fields = [columns[column] for column in dict.fromkeys(c for c, _ in compared) if column in columns]
+    return f"models.Index(fields={fields!r})" if fields else "an index on the filtered columns"
+
+
+class QueryPlanTestCase(TestCase):
+    """Seeds the database once per class and checks the queries of a request."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = CustomUser.objects.create_user(email='member@example.com', username='member', password='member-Passw0rd')
+        cls.admin = CustomUser.objects.create_superuser(email='admin@example.com', username='admin', password='admin-Passw0rd')
+        others = [
+            CustomUser(email=f'user{i}@example.com', username=f'user{i}')
+            for i in range(SEED_USERS - 1)
+        ]
+        users = [cls.member, *CustomUser.objects.bulk_create(others)]
+        now = timezone.now()
+
+        Task.objects.bulk_create([
+            Task(
+                user=user,
+                title=f'Task {i} {TOPICS[i % len(TOPICS)]}',
+                description=' '.join(WORDS[(i + j) % len(WORDS)] for j in range(30)),
+                category=Category.values[i % len(Category.values)],
+                completed=i % 3 == 0,
+                due_date=(now + timedelta(days=i % 40 - 10)).date() if i % 4 else None,
+                priority=i % 5 + 1,
+                tags=[TOPICS[i % len(TOPICS)], TOPICS[(i + 1) % len(TOPICS)]],
+            )
+            for user in users for i in range(TASKS_PER_USER)
+        ], batch_size=2000)
+
+        responses = []
+        for user in users:
+            for key, ai_category in AI_CATEGORIES.items():
+                for i in range(RESPONSES_PER_CATEGORY):
+                    question = f"How do I use {WORDS[i % len(WORDS)]} {WORDS[(i * 3 + 1) % len(WORDS)]} on {TOPICS[i % len(TOPICS)]}?"
+                    topic_tags = f'{TOPICS[i % len(TOPICS)]},{TOPICS[(i + 3) % len(TOPICS)]}'
+                    metadata = {attr.key: attr.default for attr in ai_category.model.metadata_attributes()}
+                    if i % 2:
+                        param, value = CATEGORY_ROUTES[key][2:]
+                        metadata[param] = value
+                    responses.append(AIResponse(
+                        user=user, category=key, question=question, response=ANSWER,
+                        preview=preview_for(ANSWER), topic_tags=topic_tags, tags=topic_tags.split(','),
+                        search_vector=search_vector_for(question, ANSWER), metadata=metadata,
+                    ))
+        AIResponse.objects.bulk_create(responses, batch_size=1000)
+        facets.rebuild()
+
+        AIJob.objects.bulk_create([
+            AIJob(user=user, category=Category.DSA, status=AIJob.Status.SUCCEEDED, payload={'question': 'q'})
+            for user in users for _ in range(JOBS_PER_USER)
+        ])
+        AIUsageRecord.objects.bulk_create([
+            AIUsageRecord(
+                user=users[i % len(users)],
+                category=Category.values[i % len(Category.values)],
+                template='dsa_v1',
+                prompt_tokens=200,
+                output_tokens=400,
+                wall_time_ms=800 + i % 500,
+                created_at=now - timedelta(minutes=i * USAGE_DAYS * 24 * 60 // USAGE_RECORDS),
+            )
+            for i in range(USAGE_RECORDS)
+        ], batch_size=2000)
+
+        # Goals as they are after the day's first read has reset their progress
+        Goal.objects.update(last_daily_reset=now.date())
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        cls.objects = {
+            'task': Task.objects.filter(user=cls.member).first().pk,
+            'goal': Goal.objects.get(user=cls.member, category=Category.DSA).pk,
+            'job': AIJob.objects.filter(user=cls.member).first().pk,
+            **{
+                key: AIResponse.objects.filter(user=cls.member, category=key).first().pk
+                for key in AI_CATEGORIES
+            },
+        }
+        # Every job on the member's first page embeds its response
+        AIJob.objects.filter(user=cls.member).update(object_id=cls.objects[Category.DSA])
+
+    def setUp(self):
+        # Throttle counters, task digests and streams all live in the default cache
+        cache.clear()
+
+    def assertNoSeqScans(self, queries):
+        """EXPLAIN each captured query; fail on a sequential scan of a large table."""
+        models = {model._meta.db_table: model for model in LARGE_MODELS}
+        for query in queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE', 'WITH')):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+                plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            for node in plan_nodes(plan[0]['Plan']):
+                table = node.get('Relation Name')
+                if node['Node Type'] == 'Seq Scan' and table in models:
+                    condition = node.get('Filter', '')
+                    self.fail(
+                        f"Sequential scan of {table} (filter: {condition or 'none'}) in\n  {sql}\n"
+                        f"Add {suggested_index(models[table], condition)} to {models[table].__name__}.Meta.indexes"
+                    )
+
+    def request(self, spec):
+        user = {'member': self.member, 'admin': self.admin, None: None}[spec['user']]
+        if user is not None:
+            self.client.force_login(user)
+        args = [arg.format(**self.objects) for arg in spec['args']]
+        url = reverse(spec['name'], args=args)
+        if spec['query']:
+            url += '?' + spec['query']
+        kwargs = {}
+        if spec['data'] is not None:
+            kwargs = {'data': json.dumps(spec['data']), 'content_type': 'application/json'}
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, spec['method'])(url, **kwargs)
+        return response, queries.captured_queries
+
+
+@override_settings(
+    AI_ANSWER_CACHE={'BACKEND': None},
+    AI_USAGE_LEDGER_ENABLED=False,
+    AI_METRICS_FLUSH_INTERVAL=float('inf'),  # only the ai-metrics route itself writes the counters
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+@mock.patch('app.generation.generate_text', return_value=ANSWER)
+class RouteQueryTests(QueryPlanTestCase):
+    """Gemini itself is replaced; everything around the call runs as usual."""
+
+    def test_every_route_is_covered(self, generate_text):
+        covered = {spec['name'] for spec in ROUTES} | set(EXEMPT_ROUTES)
+        self.assertEqual(url_names() - covered, set(), "Add these routes to ROUTES in app/tests.py")
+
+    def test_route_query_budgets(self, generate_text):
+        for spec in ROUTES:
+            label = f"{spec['method'].upper()} {spec['name']} {spec['query']}".strip()
+            with self.subTest(label), transaction.atomic():
+                cache.clear()
+                response, queries = self.request(spec)
+                self.assertEqual(response.status_code, spec['status'], response.content[:300])
+                self.assertLessEqual(
+                    len(queries), spec['max_queries'],
+                    f"{label} ran {len(queries)} queries:\n" + '\n'.join(q['sql'] for q in queries),
+                )
+                self.assertNoSeqScans(queries)
+                # Each request starts from the seeded data
+                transaction.set_rollback(True)
+
+    def test_task_context_query_reads_the_index_in_order(self, generate_text):
+        """
+        For a user with many tasks, the prompt's task list (user, category) comes
+        straight from the composite index in task context order, with no sort.
+        """
+        Task.objects.bulk_create([
+            Task(user=self.member, title=f'Backlog {i}', category=Category.values[i % len(Category.values)], completed=i % 2 == 0)
+            for i in range(HEAVY_USER_TASKS)
+        ], batch_size=2000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE app_task')
+        with CaptureQueriesContext(connection) as queries:
+            fetch_task_rows(self.member.pk, Category.DSA)
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {queries.captured_queries[0]['sql']}")
+            plan = cursor.fetchone()[0]
+        nodes = list(plan_nodes(plan[0]['Plan']))
+        self.assertIn("category", ' '.join(node.get('Index Cond', '') for node in nodes))
+        self.assertNotIn('Sort', [node['Node Type'] for node in nodes])
+
+    def test_open_task_due_window_reads_the_partial_index(self, generate_text):
+        """For a user with many tasks, a due-date window over open tasks reads the partial index in order."""
+        today = date.today()
+        Task.objects.bulk_create([
+            Task(user=self.member, title=f'Backlog {i}', category=Category.DSA, completed=i % 2 == 0, due_date=today + timedelta(days=i % 365))
+            for i in range(HEAVY_USER_TASKS)
+        ], batch_size=2000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE app_task')
+        self.client.force_login(self.member)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('task-list'),
+                {'completed': 'false', 'due_after': today, 'due_before': today + timedelta(days=14), 'ordering': 'due_date'},
+            )
+        self.assertEqual(response.status_code, 200)
+        sql = next(q['sql'] for q in queries.captured_queries if 'FROM "app_task"' in q['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+        nodes = list(plan_nodes(plan[0]['Plan']))
+        self.assertIn('app_task_open_due_idx', [node.get('Index Name') for node in nodes])
+        self.assertNotIn('Sort', [node['Node Type'] for node in nodes])
+
+
+class FacetCounterTests(TestCase):
+    """The maintained counters of app/facets.py follow creates, updates and deletes."""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='facets@example.com', username='facets', password='x')
+
+    def test_counters_follow_create_update_and_delete(self):
+        response = AIResponse.objects.create(
+            user=self.user, category=Category.DSA, question='q', response=ANSWER, topic_tags='arrays,graphs',
+        )
+        self.assertEqual(facets.counts(self.user.pk, Category.DSA)['topic_tags'], [
+            {'value': 'arrays', 'count': 1}, {'value': 'graphs', 'count': 1},
+        ])
+
+        response.topic_tags = 'graphs,trees'
+        response.is_helpful = True
+        response.save()
+        counts = facets.counts(self.user.pk, Category.DSA)
+        self.assertEqual(counts['topic_tags'], [{'value': 'graphs', 'count': 1}, {'value': 'trees', 'count': 1}])
+        self.assertEqual(counts['is_helpful'], [{'value': 'true', 'count': 1}])
+        self.assertEqual(counts[facets.TOTAL], [{'value': '', 'count': 1}])
+
+        response.delete()
+        self.assertEqual(facets.counts(self.user.pk, Category.DSA), {})
+
+    def test_deleting_a_user_with_answers(self):
+        for category in (Category.DSA, Category.DSA, Category.JOB_SEARCH):
+            AIResponse.objects.create(user=self.user, category=category, question='q', response=ANSWER, topic_tags='arrays')
+        self.user.delete()
+        self.assertFalse(AIResponseFacet.objects.exists())
+        self.assertFalse(AIResponse.objects.exists())
+
+
+class SingleFlightTests(TestCase):
+    """app/singleflight.py shares one upstream call among concurrent identical prompts, and only those."""
+
+    key = singleflight.prompt_hash('How do I reverse a linked list?')
+
+    def setUp(self):
+        cache.clear()
+        metrics._pending.clear()
+
+    def test_concurrent_callers_in_a_process_share_one_call(self):
+        release, calls, results = threading.Event(), [], []
+
+        def call_gemini():
+            calls.append(1)
+            release.wait(5)
+            return 'answer'
+
+        def caller():
+            results.append(singleflight.do(self.key, call_gemini))
+
+        # The lease row itself is covered by the tests below
+        with mock.patch.object(singleflight, '_do_across_processes', lambda key, fn: fn()):
+            threads = [threading.Thread(target=caller) for _ in range(4)]
+            threads[0].start()
+            while self.key not in singleflight._flights:
+                time.sleep(0.001)
+            for thread in threads[1:]:
+                thread.start()
+            while metrics.get_counters('singleflight_shared_local')['singleflight_shared_local'] < 3:
+                time.sleep(0.001)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual((len(calls), results), (1, ['answer'] * 4))
+        self.assertNotIn(self.key, singleflight._flights)
+
+    def test_waits_for_the_lease_of_another_worker(self):
+        lease = AIPromptLease.objects.create(
+            prompt_hash=self.key, owner='other:1', expires_at=timezone.now() + timedelta(minutes=1),
+        )
+
+        def other_worker_finishes(seconds):
+            AIPromptLease.objects.filter(pk=lease.pk).update(status=AIPromptLease.Status.DONE, result='shared')
+
+        call_gemini = mock.Mock(return_value='own')
+        with mock.patch.object(singleflight.time, 'sleep', other_worker_finishes):
+            self.assertEqual(singleflight.do(self.key, call_gemini), 'shared')
+        call_gemini.assert_not_called()
+
+    def test_failure_of_another_worker_is_raised(self):
+        AIPromptLease.objects.create(
+            prompt_hash=self.key, owner='other:1', expires_at=timezone.now() + timedelta(minutes=1),
+        )
+        with mock.patch.object(singleflight.time, 'sleep', lambda seconds: AIPromptLease.objects.update(
+            status=AIPromptLease.Status.FAILED, error='upstream timeout',
+        )):
+            with self.assertRaisesMessage(singleflight.SingleFlightError, 'upstream timeout'):
+                singleflight.do(self.key, mock.Mock())
+
+    def test_followers_get_the_status_and_retry_after_of_the_leader(self):
+        with self.assertRaises(resilience.CircuitOpenError):
+            singleflight.do(self.key, mock.Mock(side_effect=resilience.CircuitOpenError(retry_after=7)))
+        lease = AIPromptLease.objects.get()
+        self.assertEqual((lease.status, lease.status_code, lease.retry_after), (AIPromptLease.Status.FAILED, 503, 7))
+
+        # A worker that was waiting on that lease answers 503 + Retry-After too, not 502
+        AIPromptLease.objects.update(status=AIPromptLease.Status.PENDING)
+        with mock.patch.object(singleflight.time, 'sleep', lambda seconds: AIPromptLease.objects.update(
+            status=AIPromptLease.Status.FAILED,
+        )):
+            with self.assertRaises(resilience.AIUnavailableError) as raised:
+                singleflight.do(self.key, mock.Mock())
+        self.assertEqual((raised.exception.status_code, raised.exception.retry_after), (503, 7))
+        self.assertEqual(str(raised.exception), str(resilience.CircuitOpenError(retry_after=7)))
+
+    def test_a_finished_call_is_not_reused(self):
+        AIPromptLease.objects.create(
+            prompt_hash=self.key, owner='other:1', status=AIPromptLease.Status.DONE, result='old',
+            expires_at=timezone.now() + timedelta(minutes=1),
+        )
+        self.assertEqual(singleflight.do(self.key, lambda: 'new'), 'new')
+        self.assertEqual(AIPromptLease.objects.get().result, 'new')
+
+    def test_an_expired_lease_is_taken_over(self):
+        AIPromptLease.objects.create(
+            prompt_hash=self.key, owner='other:1', expires_at=timezone.now() - timedelta(seconds=1),
+        )
+        self.assertEqual(singleflight.do(self.key, lambda: 'new'), 'new')
+        self.assertEqual(AIPromptLease.objects.get().status, AIPromptLease.Status.DONE)
+
+
+class AnswerCacheTests(TestCase):
+    """Keys of app/answer_cache.py: normalized question, per user, per answer-changing metadata."""
+
+    def setUp(self):
+        cache.clear()
+        self.answer_cache = AnswerCache(LocalMemoryBackend(timeout=60, max_entries=10))
+        self.dsa = AI_CATEGORIES[Category.DSA]
+
+    def test_key_normalizes_the_question(self):
+        self.assertEqual(
+            self.answer_cache.make_key(self.dsa, 1, 'Two-Sum??  ', {'difficulty': 'easy'}),
+            self.answer_cache.make_key(self.dsa, 1, 'two sum', {'difficulty': 'easy'}),
+        )
+
+    def test_key_depends_on_user_category_and_metadata(self):
+        key = self.answer_cache.make_key(self.dsa, 1, 'two sum', {'difficulty': 'easy'})
+        self.assertNotEqual(key, self.answer_cache.make_key(self.dsa, 2, 'two sum', {'difficulty': 'easy'}))
+        self.assertNotEqual(key, self.answer_cache.make_key(self.dsa, 1, 'two sum', {'difficulty': 'hard'}))
+        self.assertNotEqual(key, self.answer_cache.make_key(
+            AI_CATEGORIES[Category.DEVELOPMENT], 1, 'two sum', {'difficulty': 'easy'},
+        ))
+        # Fields that do not change the answer share the entry
+        self.assertEqual(key, self.answer_cache.make_key(self.dsa, 1, 'two sum', {'difficulty': 'easy', 'topic_tags': 'x'}))
+
+    def test_invalidate_only_drops_the_answer_it_was_given(self):
+        self.answer_cache.set(self.dsa, 1, 'two sum', {}, 'new answer', 1)
+        self.answer_cache.invalidate(self.dsa, 1, 'two sum', {}, 'old answer')
+        self.assertEqual(self.answer_cache.get(self.dsa, 1, 'two sum', {}), 'new answer')
+        self.answer_cache.invalidate(self.dsa, 1, 'two sum', {}, 'new answer')
+        self.assertIsNone(self.answer_cache.get(self.dsa, 1, 'two sum', {}))
+
+    @override_settings(AI_USAGE_LEDGER_ENABLED=False)
+    def test_answers_are_not_shared_between_users(self):
+        first = CustomUser.objects.create_user(email='first@example.com', username='first', password='x')
+        second = CustomUser.objects.create_user(email='second@example.com', username='second', password='x')
+        Task.objects.create(user=first, title='Private interview at Acme', category=Category.DSA)
+        with mock.patch('app.generation.get_answer_cache', return_value=self.answer_cache), \
+                mock.patch('app.generation.generate_text', side_effect=['for first', 'for second']) as generate_text:
+            generate_ai_response(self.dsa, first, 'Two sum?', {})
+            self.assertEqual(generate_ai_response(self.dsa, second, 'two sum', {}).response, 'for second')
+            self.assertEqual(generate_ai_response(self.dsa, first, 'two sum', {}).response, 'for first')
+        self.assertEqual(generate_text.call_count, 2)
+
+    @override_settings(AI_USAGE_LEDGER_ENABLED=False)
+    def test_answer_marked_unhelpful_in_another_worker_is_not_reused(self):
+        user = CustomUser.objects.create_user(email='helpful@example.com', username='helpful', password='x')
+        with mock.patch('app.generation.get_answer_cache', return_value=self.answer_cache), \
+                mock.patch('app.generation.generate_text', side_effect=['first', 'second']) as generate_text:
+            generate_ai_response(self.dsa, user, 'two sum', {})
+            reused = generate_ai_response(self.dsa, user, 'two sum', {})
+            self.assertEqual(reused.response, 'first')
+            # update() skips the post_save eviction, as a save in another process would for this cache
+            AIResponse.objects.filter(pk=reused.pk).update(is_helpful=False)
+            self.assertEqual(generate_ai_response(self.dsa, user, 'two sum', {}).response, 'second')
+        self.assertEqual(generate_text.call_count, 2)
+
+
+class MetricsTests(TestCase):
+    """app/metrics.py adds each process's increments to counters shared by every process."""
+
+    def setUp(self):
+        metrics._pending.clear()
+
+    def test_reading_flushes_the_pending_increments(self):
+        AIMetricCounter.objects.create(name='answer_cache_hits', value=5)
+        metrics.incr('answer_cache_hits')
+        metrics.incr('answer_cache_hits', 2)
+        with self.assertNumQueries(0):
+            metrics.incr('answer_cache_misses')
+        self.assertEqual(metrics.get_counters('answer_cache_hits', 'answer_cache_misses', 'answer_cache_stores'), {
+            'answer_cache_hits': 8, 'answer_cache_misses': 1, 'answer_cache_stores': 0,
+        })
+        self.assertEqual(AIMetricCounter.objects.get(name='answer_cache_hits').value, 8)
+
+    @override_settings(AI_METRICS_FLUSH_INTERVAL=0)
+    def test_requests_flush_when_due(self):
+        metrics.incr('html_inline')
+        admin = CustomUser.objects.create_user(email='admin@example.com', username='admin', password='x', is_staff=True)
+        self.client.force_login(admin)
+        self.client.get(reverse('user-details'))
+        self.assertEqual(AIMetricCounter.objects.get(name='html_inline').value, 1)
+        self.assertEqual(self.client.get(reverse('ai-metrics')).json()['html_rendering']['html_inline'], 1)
+
+
+class TaskDigestCacheTests(TestCase):
+    """Task digests (app/task_context.py) are only kept long in a cache every process shares."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email='digest@example.com', username='digest', password='x')
+
+    def test_per_process_cache_keeps_digests_briefly(self):
+        with mock.patch.object(task_context._cache(), 'set', wraps=task_context._cache().set) as cache_set:
+            task_context.get_digest(self.user.pk, Category.DSA)
+        self.assertEqual(cache_set.call_args.args[2], 60)
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'shared': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    }, AI_TASK_DIGEST_CACHE='shared')
+    def test_shared_cache_keeps_digests_for_the_full_ttl(self):
+        with mock.patch.object(task_context._cache(), 'set') as cache_set:
+            task_context.get_digest(self.user.pk, Category.DSA)
+        self.assertEqual(cache_set.call_args.args[2], 60 * 60 * 24)
+
+    def test_task_changes_drop_the_digest(self):
+        self.assertEqual(task_context.get_digest(self.user.pk, Category.DSA), [])
+        Task.objects.create(user=self.user, title='Two sum', category=Category.DSA)
+        self.assertEqual(len(task_context.get_digest(self.user.pk, Category.DSA)), 1)
+
+
+@override_settings(
+    AI_ANSWER_CACHE={'BACKEND': None},
+    AI_USAGE_LEDGER_ENABLED=False,
+    AI_BATCH_MAX_SYNC_QUESTIONS=2,
+    AI_BATCH_MAX_QUESTIONS=4,
+)
+class BatchGenerateTests(TestCase):
+    """batch_generate answers small batches in the request and queues larger ones."""
+
+    url = reverse('dsa-ai-response-batch-generate')
+    questions = ['How do I reverse a list?', 'How do I merge two heaps?', 'How do I find a cycle?']
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email='batch@example.com', username='batch', password='x')
+        self.client.force_login(self.user)
+
+    def post(self, questions, query=''):
+        return self.client.post(self.url + query, {'questions': questions}, content_type='application/json')
+
+    def test_answers_are_kept_when_one_call_fails(self):
+        def answer(prompt):
+            if 'heaps' in prompt.text:
+                raise RuntimeError('upstream timeout')
+            return ANSWER
+
+        with mock.patch('app.generation.generate_text', side_effect=answer):
+            response = self.post(self.questions[:2])
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([result['status'] for result in response.data['results']], ['created', 'failed'])
+        self.assertEqual(list(AIResponse.objects.values_list('question', flat=True)), [self.questions[0]])
+
+    @mock.patch('app.throttles.AIGenerationThrottle.THROTTLE_RATES', {'ai_generation': '100/minute'})
+    def test_large_batches_must_be_queued(self):
+        response = self.post(self.questions)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('?async=true', response.data['error'])
+
+        with mock.patch('app.generation.generate_text') as generate_text:
+            response = self.post(self.questions + ['short'], query='?async=true')
+        generate_text.assert_not_called()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']], ['queued', 'queued', 'queued', 'invalid'],
+        )
+        self.assertEqual(
+            list(AIJob.objects.order_by('id').values_list('payload__question', flat=True)), self.questions,
+        )
+
+    def test_every_question_counts_against_the_generation_throttle(self):
+        with mock.patch('app.throttles.AIGenerationThrottle.THROTTLE_RATES', {'ai_generation': '4/minute'}):
+            self.assertEqual(self.post(self.questions, query='?async=true').status_code, 202)
+            generate = reverse('dsa-ai-response-generate-response')
+            response = self.client.post(generate + '?async=true', {'question': self.questions[0]}, content_type='application/json')
+            self.assertEqual(response.status_code, 202)
+            response = self.client.post(generate + '?async=true', {'question': self.questions[0]}, content_type='application/json')
+            self.assertEqual(response.status_code, 429)
+
+
+# Answers of the shapes Gemini produces, normalized exactly as by the legacy clean_ai_response
+NORMALIZER_GOLDEN_CORPUS = [
+    _PARAGRAPH,
+    "  \n\n**Two Pointers**\n\n\n\nUse *left* and *right*   indices.\n* item one\n* item two\n",
+    "***Complexity***\n\n- Time: *O(n log n)*\n- Space: *O(n)*\n\n\n",
+    "```js\nconst a = b * c * d;\n```\nThen *multiply* the result.",
+    "Inline `code * here` and *emphasis*.\n**Heading**\nText **bold** and ****very bold****.",
+    "Unclosed fence ```python\nx = *y*\n",
+    "```\nsame\n```\n*between*\n```\nsame\n```",
+    "**Step 1**\n**Step 2:** read the input\n*   nested *bullet*\n",
+    "Four ````ticks *open* a block``` and *then*",
+    "",
+    "   \n\n  ",
+]
+NORMALIZER_FUZZ_ALPHABET = ['*', '**', '`', '```', '````', '\n', '\n\n\n', ' ', '   ', 'a', 'word', '_', '#', '-', 'CODE']
+
+
+def legacy_clean_ai_response_by_span(text):
+    """
+    legacy_clean_ai_response with each code block swapped out and back at its
+    own position. The legacy str.replace also swapped copies of a block's text
+    elsewhere in the answer (e.g. "```**```" spanning the closing fence of a
+    later block and the fence after it), corrupting that later block.
+    """
+    blocks = []
+
+    def hide(match):
+        blocks.append(match.group())
+        return f'\0{len(blocks) - 1}\0'
+
+    text = re.sub(r'\*{2,}', '**', text)
+    text = re.sub(r'```.*?```', hide, text, flags=re.DOTALL)
+    text = re.sub(r'\*([^*\n]+)\*', r'**\1**', text)
+    text = re.sub(r'\0(\d+)\0', lambda match: blocks[int(match.group(1))], text)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = re.sub(r' +', ' ', text)
+    text = re.sub(r'^\*\*([^*]+)\*\*$', r'## \1', text, flags=re.MULTILINE)
+    text = re.sub(r'^\*\*   ', '- ', text, flags=re.MULTILINE)
+    return text.strip()
+
+
+def normalize_in_chunks(text, rng):
+    normalizer = MarkdownNormalizer()
+    out, pos = [], 0
+    while pos < len(text):
+        step = rng.randint(1, 12)
+        out.append(normalizer.feed(text[pos:pos + step]))
+        pos += step
+    out.append(normalizer.finish())
+    return ''.join(out)
+
+
+class MarkdownNormalizerTests(SimpleTestCase):
+    """app/normalizer.py gives the legacy clean_ai_response output, whole or fed in chunks."""
+
+    def test_golden_corpus(self):
+        rng = random.Random(0)
+        for text in NORMALIZER_GOLDEN_CORPUS:
+            with self.subTest(text=text[:40]):
+                expected = legacy_clean_ai_response(text)
+                self.assertEqual(normalize_markdown(text), expected)
+                self.assertEqual(normalize_in_chunks(text, rng), expected)
+
+    def test_random_inputs(self):
+        rng = random.Random(7)
+        for _ in range(5000):
+            text = ''.join(rng.choice(NORMALIZER_FUZZ_ALPHABET) for _ in range(rng.randint(0, 40)))
+            expected = legacy_clean_ai_response_by_span(text)
+            self.assertEqual(normalize_markdown(text), expected, repr(text))
+            self.assertEqual(normalize_in_chunks(text, rng), expected, repr(text))
+
+    def test_text_the_legacy_placeholders_corrupted(self):
+        text = "A literal __CODE_BLOCK_0__ marker next to ```\nreal *code*\n```\nand *text*."
+        self.assertEqual(normalize_markdown(text), "A literal __CODE_BLOCK_0__ marker next to ```\nreal *code*\n```\nand **text**.")
+        # "```**```" is both the first block and the last two fences
+        self.assertEqual(normalize_markdown('```**`````````**```*'), '```**`````````***```**')
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    """State transitions of the circuit breaker in app/resilience.py."""
+
+    def setUp(self):
+        cache.clear()
+
+    def tripped_breaker(self, open_seconds=0):
+        breaker = resilience.CircuitBreaker(window_seconds=60, min_calls=4, failure_rate=0.5, open_seconds=open_seconds)
+        for ok in (True, True, False):
+            breaker.record(ok)
+        self.assertEqual(breaker.state, breaker.CLOSED)
+        breaker.record(False)
+        self.assertEqual(breaker.state, breaker.OPEN)
+        return breaker
+
+    def test_open_breaker_rejects_calls(self):
+        breaker = self.tripped_breaker(open_seconds=30)
+        with self.assertRaises(resilience.CircuitOpenError) as raised:
+            breaker.allow()
+        self.assertEqual(raised.exception.retry_after, 30)
+
+    def test_one_probe_at_a_time_when_half_open(self):
+        breaker = self.tripped_breaker()
+        breaker.allow()
+        self.assertEqual(breaker.state, breaker.HALF_OPEN)
+        with self.assertRaises(resilience.CircuitOpenError):
+            breaker.allow()
+
+    def test_probe_outcome_closes_or_reopens(self):
+        breaker = self.tripped_breaker()
+        breaker.allow()
+        breaker.record(ok=False)
+        self.assertEqual(breaker.state, breaker.OPEN)
+        breaker.allow()
+        breaker.record(ok=True)
+        self.assertEqual(breaker.state, breaker.CLOSED)
+        self.assertEqual(breaker.current_failure_rate(), 0.0)
+
+    def test_abandoned_probe_stream_frees_the_probe_slot(self):
+        breaker = self.tripped_breaker()
+        with mock.patch.object(resilience, 'breaker', breaker):
+            stream = resilience.call_stream(Category.DSA, lambda timeout: iter(['chunk', 'chunk']))
+            self.assertEqual(next(stream), 'chunk')
+            stream.close()
+            self.assertEqual(breaker.state, breaker.HALF_OPEN)
+            self.assertEqual(list(resilience.call_stream(Category.DSA, lambda timeout: iter(['chunk']))), ['chunk'])
+        self.assertEqual(breaker.state, breaker.CLOSED)
+
+
+@override_settings(AI_ANSWER_CACHE={'BACKEND': None}, AI_USAGE_LEDGER_ENABLED=False)
+@mock.patch('app.generation.generate_text', return_value=ANSWER)
+class GenerationMetadataTests(TestCase):
+    """Metadata sent with a question is validated like the old per-category model fields, before Gemini."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email='metadata@example.com', username='metadata', password='x')
+        self.client.force_login(self.user)
+
+    def generate(self, name, **data):
+        return self.client.post(
+            reverse(f'{name}-generate-response'), {'question': 'How do I prepare for this?', **data},
+            content_type='application/json',
+        )
+
+    def test_valid_metadata_is_stored(self, generate_text):
+        response = self.generate('job-search-ai-response', category='resume', is_urgent=True, topic_tags='cv, layout')
+        self.assertEqual(response.status_code, 201, response.content)
+        obj = AIResponse.objects.get()
+        self.assertEqual((obj.metadata['category'], obj.metadata['is_urgent'], obj.topic_tags), ('resume', True, 'cv,layout'))
+
+    def test_invalid_metadata_is_rejected_before_gemini(self, generate_text):
+        for name, data in [
+            ('dsa-ai-response', {'difficulty': 'impossible'}),
+            ('dsa-ai-response', {'problem_id': 'x' * 51}),
+            ('job-search-ai-response', {'category': 'x' * 300}),
+            ('system-design-ai-response', {'is_interview_prep': 'sometimes'}),
+            ('software-dev-ai-response', {'topic_tags': ['x' * 300]}),
+        ]:
+            with self.subTest(name=name, field=next(iter(data))):
+                response = self.generate(name, **data)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(next(iter(data)), response.data)
+        generate_text.assert_not_called()
+        self.assertFalse(AIResponse.objects.exists())
+
+    def test_invalid_metadata_fails_only_its_batch_item(self, generate_text):
+        response = self.client.post(reverse('dsa-ai-response-batch-generate'), {'questions': [
+            {'question': 'How do I reverse a list?', 'difficulty': 'easy'},
+            {'question': 'How do I merge two heaps?', 'difficulty': 'impossible'},
+        ]}, content_type='application/json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([result['status'] for result in response.data['results']], ['created', 'invalid'])
+        self.assertIn('difficulty', response.data['results'][1]['fields'])
+
+
+class AIResponseListFieldsTests(TestCase):
+    """List rows give a preview; ?fields= and ?format=html can still ask for the whole answer."""
+
+    url = reverse('dsa-ai-response-list')
+
+    def setUp(self):
+        cache.clear()
+        user = CustomUser.objects.create_user(email='lists@example.com', username='lists', password='x')
+        AIResponse.objects.create(user=user, category=Category.DSA, question='Two sum?', response=ANSWER)
+        self.client.force_login(user)
+
+    def row(self, **query):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, query)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.sql = next(q['sql'] for q in queries.captured_queries if 'FROM "app_airesponse"' in q['sql'])
+        return response.data['results'][0]
+
+    def test_rows_give_a_preview(self):
+        row = self.row()
+        self.assertEqual(row['preview'], preview_for(ANSWER))
+        self.assertNotIn('response', row)
+        self.assertNotIn('"app_airesponse"."response"', self.sql)
+
+    def test_fields_can_ask_for_the_answer(self):
+        self.assertEqual(self.row(fields='id,response'), {'id': mock.ANY, 'response': ANSWER})
+        row = self.row(fields='id,response_html')
+        self.assertEqual(list(row), ['id', 'response_html'])
+        self.assertIn('<pre>', row['response_html'])
+
+    def test_format_html_gives_the_rendered_answer(self):
+        row = self.row(format='html')
+        self.assertIn('<h2>Approach</h2>', row['response_html'])
+        self.assertEqual(row['preview'], preview_for(ANSWER))
+        self.assertNotIn('response', row)
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(self.url, {'fields': 'id,answer'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('answer', response.data['fields'])
+
+
+class AIUsageTests(TestCase):
+    """The usage ledger summary and its retention."""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = CustomUser.objects.create_superuser(email='ledger@example.com', username='ledger', password='x')
+        self.client.force_login(self.admin)
+
+    def test_hours_must_be_a_bounded_whole_number(self):
+        url = reverse('ai-usage')
+        for hours in ('nan', 'inf', '-1', '0', '1.5', '1e3', str(90 * 24 + 1), '9' * 30):
+            with self.subTest(hours=hours):
+                self.assertEqual(self.client.get(url, {'hours': hours}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'hours': 90 * 24}).status_code, 200)
+
+    def test_prune_deletes_rows_past_retention(self):
+        now = timezone.now()
+        AIUsageRecord.objects.bulk_create([
+            AIUsageRecord(category=Category.DSA, created_at=now - timedelta(days=days))
+            for days in (0, 89, 91, 200, 365)
+        ])
+        out = io.StringIO()
+        call_command('prune_ai_usage', batch_size=2, stdout=out)
+        self.assertIn('Deleted 3', out.getvalue())
+        self.assertEqual(AIUsageRecord.objects.count(), 2)
+
+
+@override_settings(AI_ANSWER_CACHE={'BACKEND': None}, AI_USAGE_LEDGER_ENABLED=False, AI_JOB_MAX_ATTEMPTS=2)
+class AIJobQueueTests(TestCase):
+    """Claiming, running and retrying jobs of the queue in app/jobs.py."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email='jobs@example.com', username='jobs', password='x')
+
+    def enqueue(self, question='How do I reverse a list?'):
+        return jobs.enqueue_generate(self.user, Category.DSA, question, {'difficulty': 'easy'})
+
+    def test_claim_takes_runnable_jobs_in_order(self):
+        first, second, third = self.enqueue(), self.enqueue(), self.enqueue()
+        AIJob.objects.filter(pk=third.pk).update(run_after=timezone.now() + timedelta(minutes=1))
+
+        claimed = jobs.claim_jobs('worker-1', limit=5)
+        self.assertEqual([job.pk for job in claimed], [first.pk, second.pk])
+        self.assertEqual({(job.status, job.locked_by, job.attempts) for job in claimed}, {(AIJob.Status.RUNNING, 'worker-1', 1)})
+        # Claimed jobs are not handed out again while their lease lasts
+        self.assertEqual(jobs.claim_jobs('worker-2', limit=5), [])
+
+    def test_jobs_of_a_dead_worker_are_claimed_again(self):
+        job = self.enqueue()
+        jobs.claim_jobs('worker-1', limit=1)
+        AIJob.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(seconds=301))
+        claimed = jobs.claim_jobs('worker-2', limit=1)
+        self.assertEqual([(job.locked_by, job.attempts) for job in claimed], [('worker-2', 2)])
+
+    @mock.patch('app.generation.generate_text', return_value=ANSWER)
+    def test_successful_job_stores_the_answer(self, generate_text):
+        job = self.enqueue()
+        jobs.run_job(jobs.claim_jobs('worker-1', limit=1)[0], 'worker-1')
+        job.refresh_from_db()
+        self.assertEqual(job.status, AIJob.Status.SUCCEEDED)
+        obj = AIResponse.objects.get(pk=job.object_id)
+        self.assertEqual((obj.user, obj.response, obj.metadata['difficulty']), (self.user, ANSWER, 'easy'))
+
+    @mock.patch('app.generation.generate_text', side_effect=RuntimeError('upstream timeout'))
+    def test_failed_job_is_retried_with_backoff_then_fails(self, generate_text):
+        job = self.enqueue()
+        with self.assertLogs('app.jobs', 'ERROR'):
+            jobs.run_job(jobs.claim_jobs('worker-1', limit=1)[0], 'worker-1')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (AIJob.Status.PENDING, 1))
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=1))
+        self.assertIn('upstream timeout', job.error)
+        self.assertEqual(jobs.claim_jobs('worker-1', limit=1), [])
+
+        AIJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        with self.assertLogs('app.jobs', 'ERROR'):
+            jobs.run_job(jobs.claim_jobs('worker-1', limit=1)[0], 'worker-1')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (AIJob.Status.FAILED, 2))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_regenerating_a_deleted_response_fails_without_retry(self):
+        response = AIResponse.objects.create(user=self.user, category=Category.DSA, question='q', response=ANSWER)
+        job = jobs.enqueue_regenerate(response, Category.DSA)
+        response.delete()
+        jobs.run_job(jobs.claim_jobs('worker-1', limit=1)[0], 'worker-1')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (AIJob.Status.FAILED, 'AI response no longer exists'))
+
+    @mock.patch('app.generation.generate_text', return_value=ANSWER)
+    def test_stale_owner_cannot_record_the_outcome_of_a_reclaimed_job(self, generate_text):
+        job = self.enqueue()
+        stale = jobs.claim_jobs('worker-1', limit=1)[0]
+        AIJob.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(seconds=301))
+        jobs.claim_jobs('worker-2', limit=1)
+
+        with self.assertLogs('app.jobs', 'WARNING'):
+            jobs.run_job(stale, 'worker-1')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.attempts, job.object_id), (AIJob.Status.RUNNING, 'worker-2', 2, None))
+
+        generate_text.side_effect = RuntimeError('upstream timeout')
+        with self.assertLogs('app.jobs', 'WARNING'):
+            jobs.run_job(stale, 'worker-1')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.error), (AIJob.Status.RUNNING, 'worker-2', ''))
+
+
+class KeysetPaginationTests(TestCase):
+    """Walking every page of a list (app/pagination.py) returns each row once, in order."""
+
+    url = reverse('task-list')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email='pages@example.com', username='pages', password='x')
+        today = date.today()
+        tasks = Task.objects.bulk_create([
+            Task(
+                user=cls.user, title=f'Task {i}', category=Category.DSA, priority=i % 3 + 1,
+                due_date=None if i % 4 == 0 else today + timedelta(days=i % 5),
+            )
+            for i in range(23)
+        ])
+        # Ties on every ordering column, so pages must break them by id
+        Task.objects.filter(pk__in=[task.pk for task in tasks[:10]]).update(created_at=timezone.now())
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def walk(self, **query):
+        ids, url, params = [], self.url, query
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200, response.content)
+            ids += [row['id'] for row in response.data['results']]
+            url, params = response.data['next'], None
+        return ids
+
+    def test_every_ordering_visits_every_row_once(self):
+        for ordering, fields in TaskQuerySerializer.ORDERINGS.items():
+            field, tie_breaker = fields
+            name = field.lstrip('-')
+            # PostgreSQL's NULL placement: last ascending, first descending
+            expected = Task.objects.filter(user=self.user).order_by(
+                F(name).desc(nulls_first=True) if field.startswith('-') else F(name).asc(nulls_last=True), tie_breaker,
+            )
+            for limit in (1, 4, 23, 50):
+                with self.subTest(ordering=ordering, limit=limit):
+                    self.assertEqual(self.walk(ordering=ordering, limit=limit), list(expected.values_list('id', flat=True)))
+
+    def test_last_full_page_has_no_next_link(self):
+        response = self.client.get(self.url, {'limit': 23, 'count': 'exact'})
+        self.assertEqual((len(response.data['results']), response.data['next'], response.data['count']), (23, None, 23))
+
+    def test_limit_is_capped(self):
+        with mock.patch.object(KeysetPagination, 'max_limit', 5):
+            response = self.client.get(self.url, {'limit': 1000})
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_invalid_cursor_is_not_found(self):
+        for cursor in ('garbage', encode_cursor({'a': 1}), encode_cursor(['not a date', 1])):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get(self.url, {'cursor': cursor}).status_code, 404)
+
+
+class RenderMarkdownTests(SimpleTestCase):
+    """app/rendering.py only ever emits markup of its own; everything from the answer is escaped."""
+
+    def test_html_in_the_answer_is_escaped(self):
+        self.assertEqual(render_markdown('<script>alert(1)</script>'), '<p>&lt;script&gt;alert(1)&lt;/script&gt;</p>')
+        self.assertEqual(render_markdown('`<img src=x>`'), '<p><code>&lt;img src=x&gt;</code></p>')
+        self.assertEqual(
+            render_markdown('```py"><script>\n<b>x</b>\n```'),
+            '<pre><code class="language-py">&lt;b&gt;x&lt;/b&gt;</code></pre>',
+        )
+
+    def test_only_safe_links_become_anchors(self):
+        for url in ('https://example.com/a', 'HTTP://example.com', 'mailto:me@example.com', '/api/tasks/', '#top'):
+            with self.subTest(url=url):
+                self.assertIn('<a href=', render_markdown(f'[x]({url})'))
+        for url in (
+            'javascript:alert(1)', 'JaVaScRiPt:alert(1)', '&#106;avascript:alert(1)', 'data:text/html,x',
+            'vbscript:x', '//evil.example', '/\\evil.example',
+        ):
+            with self.subTest(url=url):
+                self.assertNotIn('<a', render_markdown(f'[x]({url})'))
+
+    def test_link_attributes_are_escaped(self):
+        self.assertEqual(
+            render_markdown('[<b>x</b>](https://a"onmouseover="alert&b=1)'),
+            '<p><a href="https://a&quot;onmouseover=&quot;alert&amp;b=1" rel="nofollow noopener noreferrer">'
+            '&lt;b&gt;x&lt;/b&gt;</a></p>',
+        )
+
+    def test_markdown_structure(self):
+        self.assertEqual(
+            render_markdown('## Approach\n\n- **one**\n- *two*\n\n> quoted\n\n1. first'),
+            '<h2>Approach</h2>\n<ul><li><strong>one</strong></li><li><em>two</em></li></ul>\n'
+            '<blockquote><p>quoted</p></blockquote>\n<ol><li>first</li></ol>',
+        )
+
+
+def sse_events(frames):
+    """Parse SSE frames into (id, event, data) tuples, skipping `retry:` and comment lines."""
+    events = []
+    for block in ''.join(frames).split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n') if ': ' in line and not line.startswith(':'))
+        if 'event' in fields:
+            events.append((fields.get('id'), fields['event'], json.loads(fields['data'])))
+    return events
+
+
+class InlineThread:
+    """Stands in for threading.Thread: runs the target on start(), inside the test's transaction."""
+
+    def __init__(self, target, **kwargs):
+        self.target = target
+
+    def start(self):
+        self.target()
+
+
+@override_settings(AI_ANSWER_CACHE={'BACKEND': None}, AI_USAGE_LEDGER_ENABLED=False)
+@mock.patch('app.streams.connection', mock.Mock())
+@mock.patch('app.streams.threading.Thread', InlineThread)
+class StreamTests(TestCase):
+    """Streaming answers over SSE (app/streams.py) and resuming them on any worker."""
+
+    stream_url = reverse('dsa-ai-response-stream-response')
+    resume_url = reverse('dsa-ai-response-resume-stream')
+    question = 'How do I detect a cycle in a linked list?'
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='stream@example.com', username='stream', password='x')
+        self.client.force_login(self.user)
+
+    def stream(self):
+        with mock.patch('app.generation.stream_text', return_value=iter(['## Approach\n\n', 'Use two ', 'pointers.'])):
+            response = self.client.post(self.stream_url, {'question': self.question}, content_type='application/json')
+            return sse_events(chunk.decode() for chunk in response.streaming_content)
+
+    def test_stream_relays_the_chunks_and_stores_the_answer(self):
+        events = self.stream()
+        self.assertEqual([event for _, event, _ in events[:1]] + [event for _, event, _ in events[-1:]], ['start', 'done'])
+        stream_id = events[0][2]['stream_id']
+        chunks = [(event_id, data['text']) for event_id, event, data in events if event == 'chunk']
+        self.assertEqual([event_id for event_id, _ in chunks], [f'{stream_id}:{seq}' for seq in range(len(chunks))])
+
+        obj = AIResponse.objects.get(user=self.user)
+        self.assertEqual(''.join(text for _, text in chunks), obj.response)
+        self.assertEqual(obj.response, '## Approach\n\nUse two pointers.')
+        self.assertEqual(events[-1][2]['data']['id'], obj.pk)
+
+    def test_resume_replays_after_the_last_event_from_the_database(self):
+        events = self.stream()
+        stream_id = events[0][2]['stream_id']
+        chunks = [data['text'] for _, event, data in events if event == 'chunk']
+        # The producer has finished, so this reads the AIStream row as any other worker would
+        self.assertIsNone(StreamBuffer(stream_id).local)
+
+        response = self.client.get(self.resume_url, HTTP_LAST_EVENT_ID=f'{stream_id}:0')
+        resumed = sse_events(chunk.decode() for chunk in response.streaming_content)
+        self.assertEqual([data['text'] for _, event, data in resumed if event == 'chunk'], chunks[1:])
+        self.assertEqual(resumed[-1][1], 'done')
+
+        other = CustomUser.objects.create_user(email='other@example.com', username='other', password='x')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(self.resume_url, HTTP_LAST_EVENT_ID=f'{stream_id}:0').status_code, 404)
+
+    def test_event_stream_follows_a_stream_written_by_another_worker(self):
+        AIStream.objects.create(
+            stream_id='remote', user=self.user, category=Category.DSA, chunks=['a', 'b', 'c'],
+            expires_at=timezone.now() + timedelta(minutes=1),
+        )
+        frames = event_stream(StreamBuffer('remote'), 0, lambda object_id: {'id': object_id})
+        self.assertEqual(next(frames), "retry: 2000\n")
+        self.assertEqual(sse_events([next(frames), next(frames), next(frames)]), [
+            (None, 'start', {'stream_id': 'remote'}),
+            ('remote:1', 'chunk', {'text': 'b'}),
+            ('remote:2', 'chunk', {'text': 'c'}),
+        ])
+        AIStream.objects.filter(pk='remote').update(chunks=['a', 'b', 'c', 'd'], status=AIStream.Status.DONE, object_id=7)
+        self.assertEqual(sse_events(list(frames)), [
+            ('remote:3', 'chunk', {'text': 'd'}),
+            ('remote:done', 'done', {'id': 7}),
+        ])
+
+    def test_event_stream_is_woken_by_a_producer_in_this_process(self):
+        buffer = StreamBuffer.create(self.user.pk, Category.DSA)
+        buffer.append('a')
+        frames = event_stream(buffer, -1, lambda object_id: {'id': object_id})
+        self.assertEqual(sse_events([next(frames), next(frames), next(frames)])[1:], [(f'{buffer.stream_id}:0', 'chunk', {'text': 'a'})])
+        buffer.append('b')
+        buffer.finish(7)
+        self.assertEqual(sse_events(list(frames)), [
+            (f'{buffer.stream_id}:1', 'chunk', {'text': 'b'}),
+            (f'{buffer.stream_id}:done', 'done', {'id': 7}),
+        ])
+        self.assertEqual(AIStream.objects.get(pk=buffer.stream_id).chunks, ['a', 'b'])
+
+
+@override_settings(AI_METRICS_FLUSH_INTERVAL=float('inf'))
+class CompressionMiddlewareTests(SimpleTestCase):
+    """Negotiated brotli/gzip compression of API responses (app/middleware.py)."""
+
+    body = json.dumps({'results': [{'question': WORDS, 'response': ANSWER}] * 20}).encode()
+
+    def respond(self, response, accept_encoding='gzip, br'):
+        request = RequestFactory().get('/api/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def json_response(self, body=None, **headers):
+        return HttpResponse(self.body if body is None else body, content_type='application/json', headers=headers)
+
+    def test_choose_encoding(self):
+        self.assertEqual(choose_encoding('gzip, deflate, br'), 'br')
+        self.assertEqual(choose_encoding('gzip;q=1.0, br;q=0.5'), 'gzip')
+        self.assertEqual(choose_encoding('gzip, br;q=0'), 'gzip')
+        self.assertEqual(choose_encoding('*;q=0.2, br;q=0'), 'gzip')
+        self.assertIsNone(choose_encoding('gzip;q=0, *;q=0'))
+        self.assertIsNone(choose_encoding('identity'))
+        self.assertIsNone(choose_encoding(''))
+
+    def test_json_is_compressed_with_the_negotiated_encoding(self):
+        response = self.respond(self.json_response())
+        self.assertEqual((response['Content-Encoding'], response['Vary']), ('br', 'Accept-Encoding'))
+        self.assertEqual(brotli.decompress(response.content), self.body)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+
+        response = self.respond(self.json_response(), accept_encoding='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(zlib.decompress(response.content, 31), self.body)
+
+    def test_identity_and_small_bodies_are_sent_as_is(self):
+        response = self.respond(self.json_response(), accept_encoding='identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual((response.content, response['Vary']), (self.body, 'Accept-Encoding'))
+
+        response = self.respond(self.json_response(b'{"ok": true}'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, b'{"ok": true}')
+
+    def test_strong_etag_is_weakened(self):
+        response = self.respond(self.json_response(ETag='"v1"'))
+        self.assertEqual(response['ETag'], 'W/"v1"')
+        response = self.respond(self.json_response(ETag='W/"v1"'), accept_encoding='gzip')
+        self.assertEqual(response['ETag'], 'W/"v1"')
+
+    def test_event_stream_is_flushed_after_every_event(self):
+        events = [f'event: chunk\ndata: {json.dumps(word)}\n\n'.encode() for word in WORDS]
+        response = self.respond(StreamingHttpResponse(iter(events), content_type='text/event-stream'), accept_encoding='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+        # Each compressed chunk decodes to exactly the event it was made from
+        decompressor = zlib.decompressobj(31)
+        for event, chunk in zip(events, response.streaming_content):
+            self.assertEqual(decompressor.decompress(chunk), event)
+        self.assertEqual(decompressor.decompress(b''.join(response.streaming_content)), b'')
+        self.assertTrue(decompressor.eof)
+
+    @mock.patch('app.views.get_token', return_value='token' * 400)  # Would compress well
+    def test_csrf_token_is_never_compressed(self, get_token):
+        response = self.client.get(reverse('csrf_token'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.json()['csrfToken'], 'token' * 400)
+
+
+@override_settings(AI_RESPONSE_COMPRESSION={'CODEC': 'zlib', 'LEVEL': 6, 'MIN_SIZE': 256})
+class CompressedTextFieldTests(TestCase):
+    """AI answers stored with a codec header byte in a bytea column (app/fields.py)."""
+
+    long_text = ANSWER * 20
+
+    def stored_bytes(self, obj):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT response FROM app_airesponse WHERE id = %s', [obj.pk])
+            return bytes(cursor.fetchone()[0])
+
+    def test_short_values_are_stored_raw(self):
+        encoded = encode_text('Use a hash map.', codec='zlib')
+        self.assertEqual(encoded, bytes([RAW]) + b'Use a hash map.')
+        self.assertEqual(decode_text(encoded), 'Use a hash map.')
+
+    def test_zlib_round_trip(self):
+        encoded = encode_text(self.long_text, codec='zlib')
+        self.assertEqual(encoded[0], ZLIB)
+        self.assertLess(len(encoded), len(self.long_text.encode()))
+        self.assertEqual(decode_text(memoryview(encoded)), self.long_text)
+
+    def test_unknown_codec_is_rejected(self):
+        with self.assertRaisesMessage(ValueError, 'Unknown compressed text codec 9'):
+            decode_text(b'\x09payload')
+
+    def test_empty_column_reads_as_none(self):
+        self.assertIsNone(decode_text(b''))
+        self.assertIsNone(decode_text(memoryview(b'')))
+
+    def test_model_field_compresses_long_answers(self):
+        user = CustomUser.objects.create_user(email='fields@example.com', username='fields', password='x')
+        obj = AIResponse.objects.create(user=user, category=Category.DSA, question='q', response=self.long_text)
+        self.assertEqual(self.stored_bytes(obj)[0], ZLIB)
+        self.assertEqual(AIResponse.objects.get(pk=obj.pk).response, self.long_text)
+
+    def test_legacy_row_with_only_the_text_column_is_copied_compressed(self):
+        user = CustomUser.objects.create_user(email='legacy@example.com', username='legacy', password='x')
+        with connection.cursor() as cursor:
+            # A row never converted by migration 0019: response_data is still empty
+            cursor.execute(
+                "INSERT INTO app_dsaairesponse (id, user_id, question, response, topic_tags, difficulty, "
+                "problem_source, problem_id, created_at, updated_at, response_html, response_html_digest) "
+                "VALUES (41, %s, 'Two sum?', %s, 'arrays', 'easy', '', '', now(), now(), '', '')",
+                [user.pk, self.long_text],
+            )
+        call_command('migrate_ai_responses', category='dsa', stdout=io.StringIO())
+
+        obj = AIResponse.objects.get(category=Category.DSA, legacy_id=41)
+        self.assertEqual((obj.response, obj.metadata['difficulty']), (self.long_text, 'easy'))
+        self.assertEqual(self.stored_bytes(obj)[0], ZLIB)
@@ -1,5 +1,6 @@
 from rest_framework.throttling import UserRateThrottle, AnonRateThrottle, ScopedRateThrottle
 from rest_framework.throttling import SimpleRateThrottle
+from django.conf import settings
 from django.core.cache import cache
 from django.contrib.auth.models import AnonymousUser
 
@@ -29,6 +30,41 @@ class AIRegenerationThrottle(SimpleRateThrottle):
             ident = self.get_ident(request)
         return f"ai_regeneration_{ident}"
 
+class AIBatchGenerationThrottle(AIGenerationThrottle):
+    """
+    Throttle for batch AI generation - shares the AI generation budget, with
+    every question in the batch counting as one request
+    """
+
+    def get_cost(self, request):
+        questions = request.data.get('questions') if hasattr(request.data, 'get') else None
+        if not isinstance(questions, list):
+            return 1
+        return max(1, min(len(questions), settings.AI_BATCH_MAX_QUESTIONS))
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.cost = self.get_cost(request)
+        self.history = self.cache.get(self.key, [])
+        self.now = self.timer()
+
+        while self.history and self.history[-1] <= self.now - self.duration:
+            self.history.pop()
+        if len(self.history) + self.cost > self.num_requests:
+            return self.throttle_failure()
+        return self.throttle_success()
+
+    def throttle_success(self):
+        self.history[:0] = [self.now] * self.cost
+        self.cache.set(self.key, self.history, self.duration)
+        return True
+
 class BurstRateThrottle(SimpleRateThrottle):
     """
     Burst rate throttle for high-frequency endpoints
@@ -1,8 +1,8 @@
 from django.urls import path, include, re_path
-from .views import csrf_token, UserDetailsView, LoginView, SignupView, LogoutView
+from .views import csrf_token, UserDetailsView, LoginView, SignupView, LogoutView, AIMetricsView, AIUsageView
 from django.views.generic import TemplateView
 from rest_framework.routers import DefaultRouter
-from app.views import TaskViewSet, GoalViewSet,DSAAIResponseViewSet, SoftwareDevAIResponseViewSet, SystemDesignAIResponseViewSet, JobSearchAIResponseViewSet
+from app.views import TaskViewSet, GoalViewSet,DSAAIResponseViewSet, SoftwareDevAIResponseViewSet, SystemDesignAIResponseViewSet, JobSearchAIResponseViewSet, AIResponseViewSet, AIJobViewSet
 
 router = DefaultRouter()
 router.register(r'tasks', TaskViewSet, basename="task")
@@ -12,6 +12,8 @@ router.register(r'dsa-ai-responses', DSAAIResponseViewSet, basename='dsa-ai-resp
 router.register(r'software-dev-ai-responses', SoftwareDevAIResponseViewSet, basename='software-dev-ai-response')
 router.register(r'system-design-ai-responses', SystemDesignAIResponseViewSet, basename='system-design-ai-response')
 router.register(r'job-search-ai-responses', JobSearchAIResponseViewSet, basename='job-search-ai-response')
+router.register(r'ai-responses', AIResponseViewSet, basename='ai-response')
+router.register(r'ai-jobs', AIJobViewSet, basename='ai-job')
 
 urlpatterns = [
     path('api/', include(router.urls)),
@@ -23,4 +25,7 @@ urlpatterns = [
     path('api/login/', LoginView.as_view(), name='login'),
     path('api/signup/', SignupView.as_view(), name='signup'),
     path('api/logout/', LogoutView.as_view(), name='logout'),
+
+    path('api/ai-metrics/', AIMetricsView.as_view(), name='ai-metrics'),
+    path('api/ai-usage/', AIUsageView.as_view(), name='ai-usage'),
 ]
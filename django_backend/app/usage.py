@@ -0,0 +1,160 @@
+"""
+Usage ledger for AI answers.
+
+Every upstream Gemini call and every answer cache hit becomes an AIUsageRecord
+(category, template, prompt/output tokens, wall time, cache hit, error class).
+Records are queued in memory and written by a background thread with
+bulk_create, in batches of AI_USAGE_BATCH_SIZE or every AI_USAGE_FLUSH_INTERVAL
+seconds, so the request path never waits on the insert. If the queue is full,
+records are dropped and counted rather than blocking.
+
+`summarize()` aggregates the ledger for the admin-only /api/ai-usage/ endpoint.
+The ledger grows with every answer; `manage.py prune_ai_usage` deletes rows
+older than AI_USAGE_RETENTION_DAYS.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from django.conf import settings
+from django.db import connection
+from django.db.models import Aggregate, Count, FloatField, Q, Sum
+from .models import AIUsageRecord
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_queue = queue.Queue(maxsize=settings.AI_USAGE_QUEUE_SIZE)
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+
+def record(category, user_id=None, template='', streamed=False, cache_hit=False,
+           usage_metadata=None, wall_time=0.0, error=None):
+    """Queue one ledger row. `wall_time` is in seconds; `error` is the exception raised, if any."""
+    if not settings.AI_USAGE_LEDGER_ENABLED:
+        return
+    entry = AIUsageRecord(
+        user_id=user_id,
+        category=category,
+        template=template,
+        streamed=streamed,
+        cache_hit=cache_hit,
+        prompt_tokens=getattr(usage_metadata, 'prompt_token_count', 0) or 0,
+        output_tokens=getattr(usage_metadata, 'candidates_token_count', 0) or 0,
+        wall_time_ms=round(wall_time * 1000),
+        error_class=type(error).__name__ if error is not None else '',
+    )
+    try:
+        _queue.put_nowait(entry)
+    except queue.Full:
+        metrics.incr('usage_dropped')
+        return
+    _ensure_writer()
+
+
+def _ensure_writer():
+    global _writer, _writer_pid
+    # Threads don't survive a fork, so check the pid as well (gunicorn --preload)
+    if _writer is not None and _writer_pid == os.getpid() and _writer.is_alive():
+        return
+    with _writer_lock:
+        if _writer is None or _writer_pid != os.getpid() or not _writer.is_alive():
+            _writer = threading.Thread(target=_write_forever, name='ai-usage-writer', daemon=True)
+            _writer_pid = os.getpid()
+            _writer.start()
+
+
+def _take_batch(timeout):
+    """Block for the first entry, then collect more until the batch is full or time is up."""
+    batch = [_queue.get()]
+    deadline = time.monotonic() + timeout
+    while len(batch) < settings.AI_USAGE_BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _write(batch):
+    try:
+        AIUsageRecord.objects.bulk_create(batch)
+        metrics.incr('usage_written', len(batch))
+    except Exception:
+        logger.exception("Could not write %d AI usage records", len(batch))
+        metrics.incr('usage_dropped', len(batch))
+
+
+def _write_forever():
+    while True:
+        batch = _take_batch(settings.AI_USAGE_FLUSH_INTERVAL)
+        _write(batch)
+        connection.close()
+
+
+def flush():
+    """Write everything queued so far from the calling thread."""
+    batch = []
+    while True:
+        try:
+            batch.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+        if len(batch) >= settings.AI_USAGE_BATCH_SIZE:
+            _write(batch)
+            batch = []
+    if batch:
+        _write(batch)
+
+
+atexit.register(flush)
+
+
+class Percentile(Aggregate):
+    """PERCENTILE_CONT(fraction) WITHIN GROUP (ORDER BY expression) - PostgreSQL."""
+    function = 'PERCENTILE_CONT'
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, fraction, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+def _aggregates():
+    upstream = Q(cache_hit=False)
+    return {
+        'requests': Count('id'),
+        'cache_hits': Count('id', filter=Q(cache_hit=True)),
+        'errors': Count('id', filter=~Q(error_class='')),
+        'prompt_tokens': Sum('prompt_tokens', default=0),
+        'output_tokens': Sum('output_tokens', default=0),
+        'p50_ms': Percentile('wall_time_ms', 0.50, filter=upstream),
+        'p95_ms': Percentile('wall_time_ms', 0.95, filter=upstream),
+        'p99_ms': Percentile('wall_time_ms', 0.99, filter=upstream),
+    }
+
+
+def summarize(since):
+    """Totals and per-category latency percentiles (upstream calls only) since `since`."""
+    records = AIUsageRecord.objects.filter(created_at__gte=since)
+    return {
+        'since': since,
+        'totals': records.aggregate(**_aggregates()),
+        'by_category': list(records.order_by('category').values('category').annotate(**_aggregates())),
+    }
+
+
+def _metrics_section():
+    counters = metrics.get_counters('usage_written', 'usage_dropped')
+    counters['queued'] = _queue.qsize()
+    return counters
+
+
+metrics.register_section('usage_ledger', _metrics_section)
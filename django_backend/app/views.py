@@ -1,30 +1,37 @@
+import hashlib
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, viewsets, permissions 
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.decorators import api_view, permission_classes, action
 from django.views.decorators.csrf import ensure_csrf_cookie
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.shortcuts import render
 from django.contrib.auth import authenticate, login, logout
-from .models import CustomUser,Task, Goal, DSAAIResponse, SoftwareDevAIResponse, SystemDesignAIResponse, JobSearchAIResponse
-from .serializers import UserSerializer, LoginSerializer, GoalSerializer, TaskSerializer, DSAAIResponseSerializer, SoftwareDevAIResponseSerializer, SystemDesignAIResponseSerializer, JobSearchAIResponseSerializer
+from .models import CustomUser,Task, Goal, Category, AIResponse, DSAAIResponse, SoftwareDevAIResponse, SystemDesignAIResponse, JobSearchAIResponse, AIJob
+from .serializers import UserSerializer, LoginSerializer, GoalSerializer, TaskSerializer, TaskQuerySerializer, AIResponseSerializer, DSAAIResponseSerializer, SoftwareDevAIResponseSerializer, SystemDesignAIResponseSerializer, JobSearchAIResponseSerializer, AIJobSerializer, list_serializer_for, metadata_serializer_for
 from django.views.decorators.http import require_GET
-from django.http import JsonResponse, HttpResponseNotFound
+from django.http import JsonResponse, HttpResponseNotFound, StreamingHttpResponse
 from django.middleware.csrf import get_token
 from django.conf import settings
 from django.utils import timezone
-import google.generativeai as genai
-from .throttles import AIGenerationThrottle, AIRegenerationThrottle
-
-try:
-    genai.configure(api_key=settings.GEMINI_API_KEY)
-except AttributeError:
-    # Handle case where GEMINI_API_KEY might not be set during certain operations (e.g., collectstatic)
-    print("GEMINI_API_KEY not found in settings. AI features will be disabled.")
-    pass
+from datetime import timedelta
+from rest_framework.reverse import reverse
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.renderers import JSONRenderer
+from rest_framework.negotiation import DefaultContentNegotiation
+from django.utils.cache import get_conditional_response
+from .throttles import AIGenerationThrottle, AIRegenerationThrottle, AIBatchGenerationThrottle
+from .generation import AI_CATEGORIES, generate_ai_response, generate_ai_responses_batch, regenerate_ai_response, stream_ai_response
+from .jobs import enqueue_generate, enqueue_generate_batch, enqueue_regenerate
+from .resilience import AIUnavailableError
+from .streams import StreamBuffer, EventStreamRenderer, start_stream, event_stream, parse_last_event_id
+from .middleware import skip_compression
+from .pagination import encode_cursor, decode_cursor
+from . import facets, metrics, search, usage
 
 @require_GET
+@skip_compression  # Never compress a secret next to attacker-influenced text (BREACH)
 def csrf_token(request):
     # Generate a new CSRF token (this also sets it in the request session)
     csrf_token = get_token(request)
@@ -153,12 +160,23 @@ class LogoutView(APIView):
     
 
 class TaskViewSet(viewsets.ModelViewSet):
+    """
+    The user's tasks. Lists are filtered and ordered by the TaskQuerySerializer
+    parameters and paged by keyset (app/pagination.py).
+    GET /api/tasks/[?category=&completed=&priority_min=&priority_max=&due_after=&due_before=&tags=&ordering=]
+    """
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
     queryset = Task.objects.none()
 
     def get_queryset(self):
-        return Task.objects.filter(user=self.request.user).select_related('user')
+        queryset = Task.objects.filter(user=self.request.user).select_related('user')
+        if self.action == 'list':
+            query = TaskQuerySerializer(data=self.request.query_params)
+            query.is_valid(raise_exception=True)
+            queryset = query.filter(queryset)
+            self.keyset_ordering = query.keyset_ordering
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -167,6 +185,7 @@ class TaskViewSet(viewsets.ModelViewSet):
 class GoalViewSet(viewsets.ModelViewSet):   
     serializer_class = GoalSerializer
     permission_classes = [permissions.IsAuthenticated]
+    keyset_ordering = ('category', 'id')  # Goals have no created_at
    
     def get_queryset(self):
         """Only return goals belonging to the current user"""
@@ -294,837 +313,531 @@ class GoalViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
-class DSAAIResponseViewSet(viewsets.ModelViewSet):
+def _is_truthy(value):
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+class AIResponseContentNegotiation(DefaultContentNegotiation):
     """
-    ViewSet for handling DSA AI Responses with user scoping and custom actions.
-    Provides CRUD operations plus custom actions for filtering.
+    `?format=html` asks for the answer as rendered HTML inside the usual JSON
+    body (see AIResponseHTMLMixin), so it must not select a renderer by format.
     """
-    serializer_class = DSAAIResponseSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    parser_classes = [JSONParser, MultiPartParser, FormParser]
 
-    def get_queryset(self):
-        """Return DSA responses for the authenticated user only"""
-        return DSAAIResponse.objects.filter(user=self.request.user)
+    def select_renderer(self, request, renderers, format_suffix=None):
+        if format_suffix is None and request.query_params.get(self.settings.URL_FORMAT_OVERRIDE) == 'html':
+            renderer = self.filter_renderers(renderers, 'json')[0]
+            return renderer, renderer.media_type
+        return super().select_renderer(request, renderers, format_suffix)
 
-    def perform_create(self, serializer):
-        """Ensure the response is associated with the current user"""
-        serializer.save(user=self.request.user)
 
+class AIResponseReadMixin:
+    """
+    List and detail reads for the AI response viewsets, with ETags derived from
+    `updated_at` so unchanged answers are answered with 304 Not Modified. Lists
+    are keyset pages (app/pagination.py), each with its own ETag, whose rows give
+    a short `preview` in place of the answer unless it is asked for with
+    `?fields=` or `?format=html` (see AIResponseListMixin).
+    GET /api/<category>-ai-responses/[<id>/][?format=html][?cursor=&limit=&count=][?fields=]
+    """
+    content_negotiation_class = AIResponseContentNegotiation
 
-    @action(detail=False, methods=['post'], throttle_classes=[AIGenerationThrottle])
-    def generate_response(self, request):
-        """
-        Generate a DSA AI response using Gemini.
-        POST /api/dsa-ai-responses/generate_response/
-        """
-        question = request.data.get('question')
-        topic_tags = request.data.get('topic_tags', '')
-        difficulty = request.data.get('difficulty', 'unknown')
-        problem_source = request.data.get('problem_source', '')
-        problem_id = request.data.get('problem_id', '')
+    # Columns list pages never read (the search document), and the answer and its
+    # rendering, read only when the page includes the answer
+    list_deferred_fields = ('search_vector',)
+    answer_fields = ('response', 'response_html')
 
-        if not question or len(question.strip()) < 10:
-            return Response({'error': 'A valid DSA question is required.'}, status=status.HTTP_400_BAD_REQUEST)
+    def etag_for(self, request, *parts):
+        response_format = 'html' if request.query_params.get('format') == 'html' else 'markdown'
+        fields = request.query_params.get('fields', '')
+        return '"%s"' % '-'.join(str(part) for part in (*parts, response_format, fields))
 
-        try:
-            # Fetch user's DSA tasks
-            user_tasks = Task.objects.filter(user=request.user, category='dsa')
-            if user_tasks.exists():
-                tasks_summary = "\n".join([
-                    f"- {task.title} | {'Completed' if task.completed else 'Incomplete'}"
-                    f" | Due: {task.due_date if task.due_date else 'N/A'}"
-                    f"\n  {task.description[:100]}{'...' if len(task.description) > 100 else ''}"
-                    for task in user_tasks
-                ])
-                tasks_section = f"User's DSA Tasks:\n{tasks_summary}\n\n"
-            else:
-                tasks_section = "User has no DSA tasks.\n\n"
-
-            # Compose prompt for Gemini
-            prompt = (
-                f"{tasks_section}"
-                "You are a DSA Expert with 10+ years of experience in competitive programming and technical interviews. "
-                "Your expertise includes advanced algorithms and data structures, time/space complexity analysis, "
-                "problem-solving patterns and techniques, optimization strategies, and code implementation in multiple languages.\n\n"
-                "When responding, you must:\n"
-                "- Always analyze time and space complexity\n"
-                "- Explain the intuition behind the approach\n"
-                "- Provide multiple solutions when possible (brute force → optimized)\n"
-                "- Include visual representations or step-by-step walkthroughs\n"
-                "- Mention relevant patterns (sliding window, two pointers, etc.)\n"
-                "- Connect problems to real-world applications\n\n"
-                "FORMATTING REQUIREMENTS - Format your response using clean markdown with:\n"
-                "- Use ## for main headings\n"
-                "- Use **bold** for important concepts (NOT asterisks)\n"
-                "- Use ```python for code blocks with syntax highlighting\n"
-                "- Use - for bullet points\n"
-                "- Add proper paragraph spacing\n"
-                "- Do NOT use asterisks (*) anywhere in your response\n"
-                "- Structure your response with clear sections\n"
-                "- Keep formatting simple and clean\n\n"
-                f"Question: {question}"
-            )
-            # Call Gemini API (replace with your actual call)
-            model = genai.GenerativeModel(settings.GEMINI_MODEL_NAME)
-            response = model.generate_content(prompt)
-            ai_response = response.text
-            ai_response = clean_ai_response(ai_response)  # Clean the response
-
-            # Save to DB
-            dsa_obj = DSAAIResponse.objects.create(
-                user=request.user,
-                question=question,
-                response=ai_response,
-                topic_tags=topic_tags,
-                difficulty=difficulty,
-                problem_source=problem_source,
-                problem_id=problem_id,
-                created_at=timezone.now(),
-                updated_at=timezone.now(),
-            )
-            serializer = self.get_serializer(dsa_obj)
-            return Response({
-                'message': 'DSA response generated successfully',
-                'response': ai_response,
-                'data': serializer.data
-            }, status=status.HTTP_201_CREATED)
-        except Exception as e:
-            return Response({'error': f'AI model error: {str(e)}'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    def conditional_response(self, request, etag, build_response):
+        not_modified = get_conditional_response(request, etag=etag)
+        response = not_modified if not_modified is not None else build_response()
+        response['ETag'] = etag
+        return response
 
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = self.etag_for(request, instance.pk, instance.updated_at.timestamp())
+        return self.conditional_response(
+            request, etag, lambda: Response(self.get_serializer(instance).data),
+        )
 
-    @action(detail=False, methods=['get'])
-    def by_difficulty(self, request):
-        """
-        Get DSA responses filtered by difficulty.
-        GET /api/dsa-ai-responses/by_difficulty/?difficulty=easy|medium|hard|unknown
-        """
-        difficulty = request.query_params.get('difficulty')
-        if not difficulty:
-            return Response(
-                {'error': 'Difficulty parameter is required'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        if difficulty not in dict(DSAAIResponse.DIFFICULTY_CHOICES):
-            return Response(
-                {'error': f'Invalid difficulty. Must be one of: {", ".join(dict(DSAAIResponse.DIFFICULTY_CHOICES).keys())}'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        filtered = self.get_queryset().filter(difficulty=difficulty)
-        serializer = self.get_serializer(filtered, many=True)
-        return Response({
-            'count': len(filtered),
-            'difficulty': difficulty,
-            'results': serializer.data
-        })
+    def list(self, request, *args, **kwargs):
+        return self.paginated_response(request, self.filter_queryset(self.get_queryset()))
 
-    @action(detail=False, methods=['get'])
-    def by_topic(self, request):
-        """
-        Get DSA responses filtered by topic tag.
-        GET /api/dsa-ai-responses/by_topic/?tag=arrays
-        """
-        tag = request.query_params.get('tag')
-        if not tag:
-            return Response(
-                {'error': 'Tag parameter is required'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        filtered = [resp for resp in self.get_queryset() if tag in resp.get_topic_tags_list()]
-        serializer = self.get_serializer(filtered, many=True)
-        return Response({
-            'count': len(filtered),
-            'tag': tag,
-            'results': serializer.data
-        })
+    def get_list_serializer(self, page=None):
+        """Rows of a list page carry their `preview`, and the whole answer only if asked for."""
+        serializer_class = list_serializer_for(self.get_serializer_class())
+        return serializer_class(page, many=True, context=self.get_serializer_context())
 
-    @action(detail=True, methods=['post'], throttle_classes = [AIRegenerationThrottle])
-    def regenerate(self, request, pk=None):
+    def paginated_response(self, request, queryset, **extra):
         """
-        Regenerate the AI response for a given DSA response object.
-        POST /api/dsa-ai-responses/<id>/regenerate/
+        One keyset page of `queryset`. The ETag covers the ids and updated_at of the
+        page's rows and the pagination links, which is everything the body depends on,
+        so a 304 skips serializing (and HTML rendering) the page.
         """
-        instance = self.get_object()
-        try:
-            # Compose the prompt as in generate_response
-            user_tasks = Task.objects.filter(user=request.user, category='dsa')
-            if user_tasks.exists():
-                tasks_summary = "\n".join([
-                    f"- {task.title} | {'Completed' if task.completed else 'Incomplete'}"
-                    f" | Due: {task.due_date if task.due_date else 'N/A'}"
-                    f"\n  {task.description[:100]}{'...' if len(task.description) > 100 else ''}"
-                    for task in user_tasks
-                ])
-                tasks_section = f"User's DSA Tasks:\n{tasks_summary}\n\n"
-            else:
-                tasks_section = "User has no DSA tasks.\n\n"
-
-            prompt = (
-                f"{tasks_section}"
-                "You are a DSA Expert with 10+ years of experience in competitive programming and technical interviews. "
-                "Your expertise includes advanced algorithms and data structures, time/space complexity analysis, "
-                "problem-solving patterns and techniques, optimization strategies, and code implementation in multiple languages.\n\n"
-                "When responding, you must:\n"
-                "- Always analyze time and space complexity\n"
-                "- Explain the intuition behind the approach\n"
-                "- Provide multiple solutions when possible (brute force → optimized)\n"
-                "- Include visual representations or step-by-step walkthroughs\n"
-                "- Mention relevant patterns (sliding window, two pointers, etc.)\n"
-                "- Connect problems to real-world applications\n\n"
-                "FORMATTING REQUIREMENTS - Format your response using clean markdown with:\n"
-                "- Use ## for main headings\n"
-                "- Use **bold** for important concepts (NOT asterisks)\n"
-                "- Use ```python for code blocks with syntax highlighting\n"
-                "- Use - for bullet points\n"
-                "- Add proper paragraph spacing\n"
-                "- Do NOT use asterisks (*) anywhere in your response\n"
-                "- Structure your response with clear sections\n"
-                "- Keep formatting simple and clean\n\n"
-                f"Question: {instance.question}"
-            )
-            model = genai.GenerativeModel(settings.GEMINI_MODEL_NAME)
-            response = model.generate_content(prompt)
-            ai_response = response.text
-            ai_response = clean_ai_response(ai_response)
-
-            # Update the instance
-            instance.response = ai_response
-            instance.updated_at = timezone.now()
-            instance.save()
+        deferred = self.list_deferred_fields
+        if 'response' not in self.get_list_serializer().child.fields:
+            deferred += self.answer_fields
+        page = self.paginate_queryset(queryset.defer(*deferred))
+        state = [(row.pk, row.updated_at.timestamp()) for row in page]
+        state += [self.paginator.get_next_link(), self.paginator.count]
+        etag = self.etag_for(request, hashlib.blake2b(repr(state).encode(), digest_size=16).hexdigest())
+        return self.conditional_response(
+            request, etag,
+            lambda: Response(self.paginator.get_paginated_data(self.get_list_serializer(page).data, **extra)),
+        )
 
-            return Response({
-                'message': 'Response regenerated successfully',
-                'response': ai_response
-            }, status=status.HTTP_200_OK)
-        except Exception as e:
-            return Response({'error': f'AI model error: {str(e)}'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
-class SoftwareDevAIResponseViewSet(viewsets.ModelViewSet):
+class AIGenerationMixin:
     """
-    ViewSet for handling Software Development AI Responses with user scoping and custom actions.
-    Provides CRUD operations plus custom actions for filtering and AI generation.
+    Shared Gemini generate/regenerate actions for the AI response viewsets.
+    Subclasses set `ai_category` to one of the Category values.
+
+    Both actions accept `?async=true` to enqueue the work for `manage.py run_ai_worker`
+    and return 202 with a job id that can be polled at /api/ai-jobs/<id>/.
+    `stream_response` relays the answer over Server-Sent Events instead.
     """
-    serializer_class = SoftwareDevAIResponseSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    parser_classes = [JSONParser, MultiPartParser, FormParser]
+    ai_category = None
 
-    def get_queryset(self):
-        """Return dev responses for the authenticated user only"""
-        return SoftwareDevAIResponse.objects.filter(user=self.request.user)
+    def get_ai_category(self):
+        return AI_CATEGORIES[self.ai_category]
 
-    def perform_create(self, serializer):
-        """Ensure the response is associated with the current user"""
-        serializer.save(user=self.request.user)
+    def validated_metadata(self, ai_category, data):
+        """The question's metadata, with defaults; a 400 for values the category does not accept."""
+        serializer = metadata_serializer_for(ai_category.model)(data=data)
+        serializer.is_valid(raise_exception=True)
+        return ai_category.metadata_from(serializer.validated_data)
+
+    def wants_async(self, request):
+        return _is_truthy(request.query_params.get('async', request.data.get('async', False)))
+
+    def job_accepted_response(self, request, job, message):
+        return Response({
+            'message': message,
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': reverse('ai-job-detail', args=[job.id], request=request),
+        }, status=status.HTTP_202_ACCEPTED)
+
+    def ai_error_response(self, exc):
+        """
+        503 + Retry-After while the circuit breaker is open, 504 when the latency
+        budget ran out, 502 for any other upstream failure.
+        """
+        if isinstance(exc, AIUnavailableError):
+            response = Response({'error': str(exc)}, status=exc.status_code)
+            if exc.retry_after:
+                response['Retry-After'] = str(exc.retry_after)
+            return response
+        return Response({'error': f'AI model error: {str(exc)}'}, status=status.HTTP_502_BAD_GATEWAY)
 
     @action(detail=False, methods=['post'], throttle_classes=[AIGenerationThrottle])
     def generate_response(self, request):
         """
-        Generate a Software Dev AI response using Gemini.
-        POST /api/software-dev-ai-responses/generate_response/
+        Generate an AI response using Gemini.
+        POST /api/<category>-ai-responses/generate_response/[?async=true]
         """
+        ai_category = self.get_ai_category()
         question = request.data.get('question')
-        topic_tags = request.data.get('topic_tags', '')
-        tech_stack = request.data.get('tech_stack', 'other')
-        programming_language = request.data.get('programming_language', '')
-        framework = request.data.get('framework', '')
-        question_type = request.data.get('question_type', 'other')
 
         if not question or len(question.strip()) < 10:
-            return Response({'error': 'A valid development question is required.'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'error': f'A valid {ai_category.question_label} question is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        metadata = self.validated_metadata(ai_category, request.data)
+
+        if self.wants_async(request):
+            job = enqueue_generate(request.user, ai_category.key, question, metadata)
+            return self.job_accepted_response(request, job, f'{ai_category.label} response generation queued')
 
         try:
-            # Fetch user's Development tasks
-            user_tasks = Task.objects.filter(user=request.user, category='development')
-            if user_tasks.exists():
-                tasks_summary = "\n".join([
-                    f"- {task.title} | {'Completed' if task.completed else 'Incomplete'}"
-                    f" | Due: {task.due_date if task.due_date else 'N/A'}"
-                    f"\n  {task.description[:100]}{'...' if len(task.description) > 100 else ''}"
-                    for task in user_tasks
-                ])
-                tasks_section = f"User's Development Tasks:\n{tasks_summary}\n\n"
-            else:
-                tasks_section = "User has no Development tasks.\n\n"
-
-            prompt = (
-                f"{tasks_section}"
-                "You are a Senior Software Development Specialist with 10+ years of experience in enterprise-level applications. "
-                "Your expertise includes full-stack development (frontend, backend, databases), software architecture and design patterns, "
-                "code quality, testing, and best practices, DevOps and deployment strategies, performance optimization, and security considerations.\n\n"
-                "When responding, you must:\n"
-                "- Follow SOLID principles and clean code practices\n"
-                "- Consider scalability, maintainability, and performance\n"
-                "- Suggest appropriate design patterns\n"
-                "- Include error handling and edge cases\n"
-                "- Recommend testing strategies\n"
-                "- Consider security implications\n"
-                "- Provide production-ready solutions\n\n"
-                "FORMATTING REQUIREMENTS - Format your response using clean markdown with:\n"
-                "- Use ## for main headings\n"
-                "- Use **bold** for important concepts (NOT asterisks)\n"
-                "- Use ```javascript or ```python for code blocks with syntax highlighting\n"
-                "- Use - for bullet points\n"
-                "- Add proper paragraph spacing\n"
-                "- Do NOT use asterisks (*) anywhere in your response\n"
-                "- Include best practices and explanations where appropriate\n\n"
-                f"Question: {question}"
-            )
-            model = genai.GenerativeModel(settings.GEMINI_MODEL_NAME)
-            response = model.generate_content(prompt)
-            ai_response = response.text
-            ai_response = clean_ai_response(ai_response)  # Clean the response
-
-            dev_obj = SoftwareDevAIResponse.objects.create(
-                user=request.user,
-                question=question,
-                response=ai_response,
-                topic_tags=topic_tags,
-                tech_stack=tech_stack,
-                programming_language=programming_language,
-                framework=framework,
-                question_type=question_type,
-                created_at=timezone.now(),
-                updated_at=timezone.now(),
-            )
-            serializer = self.get_serializer(dev_obj)
+            obj = generate_ai_response(ai_category, request.user, question, metadata)
+            serializer = self.get_serializer(obj)
             return Response({
-                'message': 'Development response generated successfully',
-                'response': ai_response,
+                'message': f'{ai_category.label} response generated successfully',
+                'response': obj.response,
                 'data': serializer.data
             }, status=status.HTTP_201_CREATED)
         except Exception as e:
-            return Response({'error': f'AI model error: {str(e)}'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            return self.ai_error_response(e)
 
-    @action(detail=False, methods=['get'])
-    def by_tech_stack(self, request):
+    @action(detail=False, methods=['post'], throttle_classes=[AIBatchGenerationThrottle])
+    def batch_generate(self, request):
         """
-        Get responses filtered by tech_stack.
-        GET /api/software-dev-ai-responses/by_tech_stack/?tech_stack=frontend|backend|fullstack|mobile|devops|database|other
+        Generate AI responses for several questions in one request.
+        POST /api/<category>-ai-responses/batch_generate/[?async=true]
+        {"questions": ["...", {"question": "...", <metadata>}, ...], <shared metadata>}
+
+        Each question counts against the AI generation throttle. Without ?async,
+        at most AI_BATCH_MAX_SYNC_QUESTIONS questions are answered within the
+        request (201 when every item was created, 207 otherwise); with it, up to
+        AI_BATCH_MAX_QUESTIONS are queued as one job each (202).
         """
-        tech_stack = request.query_params.get('tech_stack')
-        if not tech_stack:
-            return Response(
-                {'error': 'tech_stack parameter is required'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        valid_choices = dict(SoftwareDevAIResponse.TECH_STACK_CHOICES)
-        if tech_stack not in valid_choices:
-            return Response(
-                {'error': f'Invalid tech_stack. Must be one of: {', '.join(valid_choices.keys())}'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        filtered = self.get_queryset().filter(tech_stack=tech_stack)
-        serializer = self.get_serializer(filtered, many=True)
+        ai_category = self.get_ai_category()
+        questions = request.data.get('questions')
+        run_async = self.wants_async(request)
+        max_questions = settings.AI_BATCH_MAX_QUESTIONS if run_async else settings.AI_BATCH_MAX_SYNC_QUESTIONS
+
+        if not isinstance(questions, list) or not questions:
+            return Response({'error': 'A non-empty list of questions is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(questions) > max_questions:
+            error = f'At most {max_questions} questions can be submitted at once.'
+            if not run_async:
+                error += f' Use ?async=true to queue up to {settings.AI_BATCH_MAX_QUESTIONS}.'
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = [None] * len(questions)
+        items, positions = [], []
+        for index, entry in enumerate(questions):
+            fields = {**request.data, **entry} if isinstance(entry, dict) else {**request.data, 'question': entry}
+            question = fields.get('question')
+            if not isinstance(question, str) or len(question.strip()) < 10:
+                results[index] = {'index': index, 'status': 'invalid', 'error': f'A valid {ai_category.question_label} question is required.'}
+                continue
+            metadata = metadata_serializer_for(ai_category.model)(data=fields)
+            if not metadata.is_valid():
+                results[index] = {'index': index, 'status': 'invalid', 'error': 'Invalid metadata.', 'fields': metadata.errors}
+                continue
+            items.append((question, ai_category.metadata_from(metadata.validated_data)))
+            positions.append(index)
+
+        if run_async:
+            for index, job in zip(positions, enqueue_generate_batch(request.user, ai_category.key, items)):
+                results[index] = {
+                    'index': index,
+                    'status': 'queued',
+                    'job_id': job.id,
+                    'status_url': reverse('ai-job-detail', args=[job.id], request=request),
+                }
+            return Response({
+                'message': f'{len(items)} of {len(results)} {ai_category.label} responses queued',
+                'queued': len(items),
+                'failed': len(results) - len(items),
+                'results': results,
+            }, status=status.HTTP_202_ACCEPTED)
+
+        for index, (obj, error) in zip(positions, generate_ai_responses_batch(ai_category, request.user, items)):
+            if error is None:
+                results[index] = {'index': index, 'status': 'created', 'data': self.get_serializer(obj).data}
+            else:
+                error_response = self.ai_error_response(error)
+                results[index] = {'index': index, 'status': 'failed', 'status_code': error_response.status_code, **error_response.data}
+
+        created = sum(1 for result in results if result['status'] == 'created')
         return Response({
-            'count': len(filtered),
-            'tech_stack': tech_stack,
-            'results': serializer.data
-        })
+            'message': f'{created} of {len(results)} {ai_category.label} responses generated',
+            'created': created,
+            'failed': len(results) - created,
+            'results': results,
+        }, status=status.HTTP_201_CREATED if created == len(results) else status.HTTP_207_MULTI_STATUS)
+
+    @action(detail=False, methods=['post'], throttle_classes=[AIGenerationThrottle], renderer_classes=[JSONRenderer, EventStreamRenderer])
+    def stream_response(self, request):
+        """
+        Stream an AI response over Server-Sent Events while Gemini generates it.
+        The full answer is saved when the stream ends and sent in the final `done` event.
+        POST /api/<category>-ai-responses/stream_response/
+        """
+        ai_category = self.get_ai_category()
+        question = request.data.get('question')
 
-    @action(detail=False, methods=['get'])
-    def by_topic(self, request):
+        if not question or len(question.strip()) < 10:
+            return Response({'error': f'A valid {ai_category.question_label} question is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        metadata = self.validated_metadata(ai_category, request.data)
+        buffer = start_stream(
+            request.user,
+            ai_category.key,
+            stream_ai_response(ai_category, request.user, question, metadata),
+        )
+        return self.event_stream_response(buffer, last_seq=-1)
+
+    @action(detail=False, methods=['get'], renderer_classes=[JSONRenderer, EventStreamRenderer])
+    def resume_stream(self, request):
         """
-        Get responses filtered by topic tag.
-        GET /api/software-dev-ai-responses/by_topic/?tag=react
+        Resume an interrupted stream after the last event the client received.
+        GET /api/<category>-ai-responses/resume_stream/ with `Last-Event-ID: <stream_id>:<seq>`
+        (or ?last_event_id=...)
         """
-        tag = request.query_params.get('tag')
-        if not tag:
-            return Response(
-                {'error': 'Tag parameter is required'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        filtered = [resp for resp in self.get_queryset() if tag in resp.get_topic_tags_list()]
-        serializer = self.get_serializer(filtered, many=True)
-        return Response({
-            'count': len(filtered),
-            'tag': tag,
-            'results': serializer.data
-        })
+        ai_category = self.get_ai_category()
+        last_event_id = request.headers.get('Last-Event-ID') or request.query_params.get('last_event_id')
+        stream_id, last_seq = parse_last_event_id(last_event_id)
+
+        buffer = StreamBuffer(stream_id) if stream_id else None
+        meta = buffer.get_meta() if buffer else None
+        if meta is None or meta['user_id'] != request.user.pk or meta['category'] != ai_category.key:
+            return Response({'error': 'Stream not found or expired'}, status=status.HTTP_404_NOT_FOUND)
+
+        return self.event_stream_response(buffer, last_seq)
+
+    def event_stream_response(self, buffer, last_seq):
+        ai_category = self.get_ai_category()
+
+        def serialize_result(object_id):
+            obj = ai_category.model.objects.get(pk=object_id)
+            return {
+                'message': f'{ai_category.label} response generated successfully',
+                'response': obj.response,
+                'data': self.get_serializer(obj).data
+            }
 
-    @action(detail=True, methods=['post'], throttle_classes = [AIRegenerationThrottle])
+        response = StreamingHttpResponse(
+            event_stream(buffer, last_seq, serialize_result),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx)
+        return response
+
+    @action(detail=True, methods=['post'], throttle_classes=[AIRegenerationThrottle])
     def regenerate(self, request, pk=None):
         """
-        Regenerate the AI response for a given Software Development response object.
-        POST /api/software-dev-ai-responses/<id>/regenerate/
+        Regenerate the AI response for a given response object.
+        POST /api/<category>-ai-responses/<id>/regenerate/[?async=true]
         """
+        ai_category = self.get_ai_category()
         instance = self.get_object()
-        try:
-            # Compose the prompt as in generate_response
-            user_tasks = Task.objects.filter(user=request.user, category='development')
-            if user_tasks.exists():
-                tasks_summary = "\n".join([
-                    f"- {task.title} | {'Completed' if task.completed else 'Incomplete'}"
-                    f" | Due: {task.due_date if task.due_date else 'N/A'}"
-                    f"\n  {task.description[:100]}{'...' if len(task.description) > 100 else ''}"
-                    for task in user_tasks
-                ])
-                tasks_section = f"User's Development Tasks:\n{tasks_summary}\n\n"
-            else:
-                tasks_section = "User has no Development tasks.\n\n"
-
-            prompt = (
-                f"{tasks_section}"
-                "You are a Senior Software Development Specialist with 10+ years of experience in enterprise-level applications. "
-                "Your expertise includes full-stack development (frontend, backend, databases), software architecture and design patterns, "
-                "code quality, testing, and best practices, DevOps and deployment strategies, performance optimization, and security considerations.\n\n"
-                "When responding, you must:\n"
-                "- Follow SOLID principles and clean code practices\n"
-                "- Consider scalability, maintainability, and performance\n"
-                "- Suggest appropriate design patterns\n"
-                "- Include error handling and edge cases\n"
-                "- Recommend testing strategies\n"
-                "- Consider security implications\n"
-                "- Provide production-ready solutions\n\n"
-                "FORMATTING REQUIREMENTS - Format your response using clean markdown with:\n"
-                "- Use ## for main headings\n"
-                "- Use **bold** for important concepts (NOT asterisks)\n"
-                "- Use ```javascript or ```python for code blocks with syntax highlighting\n"
-                "- Use - for bullet points\n"
-                "- Add proper paragraph spacing\n"
-                "- Do NOT use asterisks (*) anywhere in your response\n"
-                "- Include best practices and explanations where appropriate\n\n"
-                f"Question: {instance.question}"
-            )
-            model = genai.GenerativeModel(settings.GEMINI_MODEL_NAME)
-            response = model.generate_content(prompt)
-            ai_response = response.text
-            ai_response = clean_ai_response(ai_response)
 
-            # Update the instance
-            instance.response = ai_response
-            instance.updated_at = timezone.now()
-            instance.save()
+        if self.wants_async(request):
+            job = enqueue_regenerate(instance, ai_category.key)
+            return self.job_accepted_response(request, job, 'Response regeneration queued')
 
+        try:
+            instance = regenerate_ai_response(ai_category, instance)
             return Response({
                 'message': 'Response regenerated successfully',
-                'response': ai_response
+                'response': instance.response
             }, status=status.HTTP_200_OK)
         except Exception as e:
-            return Response({'error': f'AI model error: {str(e)}'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            return self.ai_error_response(e)
+
 
-class SystemDesignAIResponseViewSet(viewsets.ModelViewSet):
+class AIResponseViewSet(AIResponseReadMixin, viewsets.ReadOnlyModelViewSet):
     """
-    ViewSet for handling System Design AI Responses with user scoping and custom actions.
-    Provides CRUD operations plus custom actions for filtering and AI generation.
+    The user's AI responses across every category, newest first.
+    GET /api/ai-responses/[?category=dsa|development|system_design|job_search]
     """
-    serializer_class = SystemDesignAIResponseSerializer
+    serializer_class = AIResponseSerializer
     permission_classes = [permissions.IsAuthenticated]
-    parser_classes = [JSONParser, MultiPartParser, FormParser]
 
     def get_queryset(self):
-        return SystemDesignAIResponse.objects.filter(user=self.request.user)
+        queryset = AIResponse.objects.filter(user=self.request.user).select_related('user')
+        category = self.request.query_params.get('category')
+        if category:
+            queryset = queryset.filter(category=category)
+        return queryset
 
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Full-text search over the user's questions and answers, best match first.
+        Matched words are wrapped in <mark> in `question_highlight` and `snippet`;
+        follow `next` for the following page.
+        GET /api/ai-responses/search/?q=consistent hashing[&category=dsa&limit=20&cursor=...]
+        """
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({'error': 'q parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 50)
+            cursor = request.query_params.get('cursor')
+            after = decode_cursor(cursor) if cursor else None
+            if after is not None and (len(after) != 2 or not all(isinstance(v, (int, float)) for v in after)):
+                raise ValueError("Invalid cursor")
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = search.search(request.user, text, request.query_params.get('category'), after, limit)
+        highlighted = search.highlights([row.question for row in rows] + [row.response for row in rows], text)
+        results = [
+            {
+                'id': row.id,
+                'category': row.category,
+                'question': row.question,
+                'question_highlight': highlighted[index],
+                'snippet': highlighted[len(rows) + index],
+                'topic_tags': row.get_topic_tags_list(),
+                'rank': row.rank,
+                'created_at': row.created_at,
+            }
+            for index, row in enumerate(rows)
+        ]
+        next_url = None
+        if len(rows) == limit:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), 'cursor', encode_cursor([rows[-1].rank, rows[-1].pk]),
+            )
+        return Response({'query': text, 'next': next_url, 'results': results})
 
-    @action(detail=False, methods=['post'], throttle_classes=[AIGenerationThrottle])
-    def generate_response(self, request):
-        question = request.data.get('question')
-        topic_tags = request.data.get('topic_tags', '')
-        system_scale = request.data.get('system_scale', 'unknown')
-        system_type = request.data.get('system_type', 'other')
-        focus_area = request.data.get('focus_area', 'architecture')
-        is_interview_prep = request.data.get('is_interview_prep', False)
-        company_context = request.data.get('company_context', '')
 
-        if not question or len(question.strip()) < 10:
-            return Response({'error': 'A valid system design question is required.'}, status=status.HTTP_400_BAD_REQUEST)
+class CategoryAIResponseViewSet(AIResponseReadMixin, AIGenerationMixin, viewsets.ModelViewSet):
+    """
+    Base of the per-category AI response viewsets: CRUD scoped to the
+    authenticated user and the category's proxy model, AI generation and
+    the by_topic filter. Subclasses set `ai_category` and `serializer_class`.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
 
-        try:
-            # Fetch user's System Design tasks
-            user_tasks = Task.objects.filter(user=request.user, category='system_design')
-            if user_tasks.exists():
-                tasks_summary = "\n".join([
-                    f"- {task.title} | {'Completed' if task.completed else 'Incomplete'}"
-                    f" | Due: {task.due_date if task.due_date else 'N/A'}"
-                    f"\n  {task.description[:100]}{'...' if len(task.description) > 100 else ''}"
-                    for task in user_tasks
-                ])
-                tasks_section = f"User's System Design Tasks:\n{tasks_summary}\n\n"
-            else:
-                tasks_section = "User has no System Design tasks.\n\n"
-
-            prompt = (
-                f"{tasks_section}"
-                "You are a System Design Expert specializing in large-scale distributed systems with 15+ years of experience "
-                "in designing systems for companies like Google, Amazon, and Netflix. Your expertise includes scalable architecture design, "
-                "database design and selection (SQL/NoSQL), microservices vs monolith decisions, load balancing and caching strategies, "
-                "message queues and event-driven architecture, performance optimization and bottleneck identification, "
-                "fault tolerance and disaster recovery.\n\n"
-                "When responding, you must:\n"
-                "- Start with requirements gathering and constraints\n"
-                "- Consider scalability from day one\n"
-                "- Discuss trade-offs between different approaches\n"
-                "- Include capacity estimation and bottleneck analysis\n"
-                "- Address availability, consistency, and partition tolerance (CAP theorem)\n"
-                "- Provide diagrams or architectural overviews when helpful\n"
-                "- Consider both technical and business constraints\n\n"
-                "FORMATTING REQUIREMENTS - Format your response using clean markdown with:\n"
-                "- Use ## for main headings\n"
-                "- Use **bold** for important concepts (NOT asterisks)\n"
-                "- Use ``` for code examples and configuration\n"
-                "- Use - for bullet points\n"
-                "- Add proper paragraph spacing\n"
-                "- Do NOT use asterisks (*) anywhere in your response\n"
-                "- Include diagrams or visual aids where appropriate\n\n"
-                f"Question: {question}"
-            )
-            model = genai.GenerativeModel(settings.GEMINI_MODEL_NAME)
-            response = model.generate_content(prompt)
-            ai_response = response.text
-            ai_response = clean_ai_response(ai_response)  # Clean the response
-
-            obj = SystemDesignAIResponse.objects.create(
-                user=request.user,
-                question=question,
-                response=ai_response,
-                topic_tags=topic_tags,
-                system_scale=system_scale,
-                system_type=system_type,
-                focus_area=focus_area,
-                is_interview_prep=is_interview_prep,
-                company_context=company_context,
-                created_at=timezone.now(),
-                updated_at=timezone.now(),
-            )
-            serializer = self.get_serializer(obj)
-            return Response({
-                'message': 'System design response generated successfully',
-                'response': ai_response,
-                'data': serializer.data
-            }, status=status.HTTP_201_CREATED)
-        except Exception as e:
-            return Response({'error': f'AI model error: {str(e)}'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    def get_queryset(self):
+        """Return this category's responses for the authenticated user only"""
+        return self.get_ai_category().model.objects.filter(user=self.request.user).select_related('user')
 
-    @action(detail=False, methods=['get'])
-    def by_system_type(self, request):
-        system_type = request.query_params.get('system_type')
-        if not system_type:
+    def perform_create(self, serializer):
+        """Ensure the response is associated with the current user"""
+        serializer.save(user=self.request.user)
+
+    def filter_by_metadata(self, request, param, choices):
+        """
+        A page of the responses whose metadata field `param` equals the query parameter
+        of the same name (see app/pagination.py for ?cursor=, ?limit= and ?count=).
+        """
+        value = request.query_params.get(param)
+        if not value:
             return Response(
-                {'error': 'system_type parameter is required'},
+                {'error': f'{param} parameter is required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        valid_choices = dict(SystemDesignAIResponse.SYSTEM_TYPE_CHOICES)
-        if system_type not in valid_choices:
+        valid_choices = dict(choices)
+        if value not in valid_choices:
             return Response(
-                {'error': f'Invalid system_type. Must be one of: {', '.join(valid_choices.keys())}'},
+                {'error': f'Invalid {param}. Must be one of: {', '.join(valid_choices.keys())}'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        filtered = self.get_queryset().filter(system_type=system_type)
-        serializer = self.get_serializer(filtered, many=True)
+        return self.paginated_response(request, self.get_queryset().filter(metadata__contains={param: value}), **{param: value})
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Counts of the user's responses in this category by topic tag, by the category's
+        filter field (difficulty, tech_stack, system_type or category) and by is_helpful.
+        Read from the maintained counters in AIResponseFacet, never from the responses.
+        GET /api/<category>-ai-responses/facets/
+        """
+        counts = facets.counts(request.user.pk, self.ai_category)
+        total = counts.pop(facets.TOTAL, [])
         return Response({
-            'count': len(filtered),
-            'system_type': system_type,
-            'results': serializer.data
+            'total': total[0]['count'] if total else 0,
+            'facets': counts,
         })
 
     @action(detail=False, methods=['get'])
     def by_topic(self, request):
+        """
+        Get responses filtered by topic tag, a page at a time.
+        GET /api/<category>-ai-responses/by_topic/?tag=arrays[&limit=50&cursor=...&count=exact|estimated]
+        """
         tag = request.query_params.get('tag')
         if not tag:
             return Response(
                 {'error': 'Tag parameter is required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        filtered = [resp for resp in self.get_queryset() if tag in resp.get_topic_tags_list()]
-        serializer = self.get_serializer(filtered, many=True)
-        return Response({
-            'count': len(filtered),
-            'tag': tag,
-            'results': serializer.data
-        })
+        # Uses the GIN index on `tags`
+        return self.paginated_response(request, self.get_queryset().filter(tags__contains=[tag]), tag=tag)
 
-    @action(detail=True, methods=['post'], throttle_classes = [AIRegenerationThrottle])
-    def regenerate(self, request, pk=None):
+
+class DSAAIResponseViewSet(CategoryAIResponseViewSet):
+    """
+    ViewSet for handling DSA AI Responses with user scoping and custom actions.
+    Provides CRUD operations plus custom actions for filtering.
+    """
+    serializer_class = DSAAIResponseSerializer
+    ai_category = Category.DSA
+
+    @action(detail=False, methods=['get'])
+    def by_difficulty(self, request):
         """
-        Regenerate the AI response for a given System Design response object.
-        POST /api/system-design-ai-responses/<id>/regenerate/
+        Get DSA responses filtered by difficulty.
+        GET /api/dsa-ai-responses/by_difficulty/?difficulty=easy|medium|hard|unknown
         """
-        instance = self.get_object()
-        try:
-            user_tasks = Task.objects.filter(user=request.user, category='system_design')
-            if user_tasks.exists():
-                tasks_summary = "\n".join([
-                    f"- {task.title} | {'Completed' if task.completed else 'Incomplete'}"
-                    f" | Due: {task.due_date if task.due_date else 'N/A'}"
-                    f"\n  {task.description[:100]}{'...' if len(task.description) > 100 else ''}"
-                    for task in user_tasks
-                ])
-                tasks_section = f"User's System Design Tasks:\n{tasks_summary}\n\n"
-            else:
-                tasks_section = "User has no System Design tasks.\n\n"
-
-            prompt = (
-                f"{tasks_section}"
-                "You are a System Design Expert specializing in large-scale distributed systems with 15+ years of experience "
-                "in designing systems for companies like Google, Amazon, and Netflix. Your expertise includes scalable architecture design, "
-                "database design and selection (SQL/NoSQL), microservices vs monolith decisions, load balancing and caching strategies, "
-                "message queues and event-driven architecture, performance optimization and bottleneck identification, "
-                "fault tolerance and disaster recovery.\n\n"
-                "When responding, you must:\n"
-                "- Start with requirements gathering and constraints\n"
-                "- Consider scalability from day one\n"
-                "- Discuss trade-offs between different approaches\n"
-                "- Include capacity estimation and bottleneck analysis\n"
-                "- Address availability, consistency, and partition tolerance (CAP theorem)\n"
-                "- Provide diagrams or architectural overviews when helpful\n"
-                "- Consider both technical and business constraints\n\n"
-                "FORMATTING REQUIREMENTS - Format your response using clean markdown with:\n"
-                "- Use ## for main headings\n"
-                "- Use **bold** for important concepts (NOT asterisks)\n"
-                "- Use ``` for code examples and configuration\n"
-                "- Use - for bullet points\n"
-                "- Add proper paragraph spacing\n"
-                "- Do NOT use asterisks (*) anywhere in your response\n"
-                "- Include diagrams or visual aids where appropriate\n\n"
-                f"Question: {instance.question}"
-            )
-            model = genai.GenerativeModel(settings.GEMINI_MODEL_NAME)
-            response = model.generate_content(prompt)
-            ai_response = response.text
-            ai_response = clean_ai_response(ai_response)
+        return self.filter_by_metadata(request, 'difficulty', DSAAIResponse.DIFFICULTY_CHOICES)
 
-            # Update the instance
-            instance.response = ai_response
-            instance.updated_at = timezone.now()
-            instance.save()
 
-            return Response({
-                'message': 'Response regenerated successfully',
-                'response': ai_response
-            }, status=status.HTTP_200_OK)
-        except Exception as e:
-            return Response({'error': f'AI model error: {str(e)}'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-
-class JobSearchAIResponseViewSet(viewsets.ModelViewSet):
+class SoftwareDevAIResponseViewSet(CategoryAIResponseViewSet):
     """
-    ViewSet for handling Job Search AI Responses with user scoping and custom actions.
+    ViewSet for handling Software Development AI Responses with user scoping and custom actions.
     Provides CRUD operations plus custom actions for filtering and AI generation.
     """
-    serializer_class = JobSearchAIResponseSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    parser_classes = [JSONParser, MultiPartParser, FormParser]
+    serializer_class = SoftwareDevAIResponseSerializer
+    ai_category = Category.DEVELOPMENT
 
-    def get_queryset(self):
-        return JobSearchAIResponse.objects.filter(user=self.request.user)
+    @action(detail=False, methods=['get'])
+    def by_tech_stack(self, request):
+        """
+        Get responses filtered by tech_stack.
+        GET /api/software-dev-ai-responses/by_tech_stack/?tech_stack=frontend|backend|fullstack|mobile|devops|database|other
+        """
+        return self.filter_by_metadata(request, 'tech_stack', SoftwareDevAIResponse.TECH_STACK_CHOICES)
 
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
 
-    @action(detail=False, methods=['post'], throttle_classes=[AIGenerationThrottle])
-    def generate_response(self, request):
-        question = request.data.get('question')
-        topic_tags = request.data.get('topic_tags', '')
-        category = request.data.get('category', 'other')
-        experience_level = request.data.get('experience_level', '')
-        target_role = request.data.get('target_role', '')
-        interview_type = request.data.get('interview_type', '')
-        company_size = request.data.get('company_size', '')
-        is_urgent = request.data.get('is_urgent', False)
+class SystemDesignAIResponseViewSet(CategoryAIResponseViewSet):
+    """
+    ViewSet for handling System Design AI Responses with user scoping and custom actions.
+    Provides CRUD operations plus custom actions for filtering and AI generation.
+    """
+    serializer_class = SystemDesignAIResponseSerializer
+    ai_category = Category.SYSTEM_DESIGN
 
-        if not question or len(question.strip()) < 10:
-            return Response({'error': 'A valid job search question is required.'}, status=status.HTTP_400_BAD_REQUEST)
+    @action(detail=False, methods=['get'])
+    def by_system_type(self, request):
+        return self.filter_by_metadata(request, 'system_type', SystemDesignAIResponse.SYSTEM_TYPE_CHOICES)
 
-        try:
-            # Fetch user's Job Search tasks
-            user_tasks = Task.objects.filter(user=request.user, category='job_search')
-            if user_tasks.exists():
-                tasks_summary = "\n".join([
-                    f"- {task.title} | {'Completed' if task.completed else 'Incomplete'}"
-                    f" | Due: {task.due_date if task.due_date else 'N/A'}"
-                    f"\n  {task.description[:100]}{'...' if len(task.description) > 100 else ''}"
-                    for task in user_tasks
-                ])
-                tasks_section = f"User's Job Search Tasks:\n{tasks_summary}\n\n"
-            else:
-                tasks_section = "User has no Job Search tasks.\n\n"
-
-            prompt = (
-                f"{tasks_section}"
-                "You are an experienced Job Search Guide and Career Coach with 12+ years of experience helping professionals "
-                "at all levels land their dream jobs at top companies like FAANG, startups, and Fortune 500 companies. "
-                "Your expertise includes resume optimization and ATS systems, interview preparation (technical and behavioral), "
-                "salary negotiation strategies, career transition planning, industry trends and market analysis, "
-                "networking and personal branding, and job search strategies across different experience levels.\n\n"
-                "When responding, you must:\n"
-                "- Provide actionable, specific advice\n"
-                "- Consider current job market trends (2024-2025)\n"
-                "- Tailor advice to experience level and target role\n"
-                "- Include examples and templates when helpful\n"
-                "- Address both technical and soft skill development\n"
-                "- Consider industry-specific requirements\n"
-                "- Provide step-by-step action plans\n\n"
-                "FORMATTING REQUIREMENTS - Format your response using clean markdown with:\n"
-                "- Use ## for main headings\n"
-                "- Use **bold** for important concepts (NOT asterisks)\n"
-                "- Use - for bullet points\n"
-                "- Add proper paragraph spacing\n"
-                "- Do NOT use asterisks (*) anywhere in your response\n"
-                "- Include tips, resources, and best practices where appropriate\n\n"
-                f"Question: {question}"
-            )
-            model = genai.GenerativeModel(settings.GEMINI_MODEL_NAME)
-            response = model.generate_content(prompt)
-            ai_response = response.text
-            ai_response = clean_ai_response(ai_response)  # Clean the response
-
-            obj = JobSearchAIResponse.objects.create(
-                user=request.user,
-                question=question,
-                response=ai_response,
-                topic_tags=topic_tags,
-                category=category,
-                experience_level=experience_level,
-                target_role=target_role,
-                interview_type=interview_type,
-                company_size=company_size,
-                is_urgent=is_urgent,
-                created_at=timezone.now(),
-                updated_at=timezone.now(),
-            )
-            serializer = self.get_serializer(obj)
-            return Response({
-                'message': 'Job search response generated successfully',
-                'response': ai_response,
-                'data': serializer.data
-            }, status=status.HTTP_201_CREATED)
-        except Exception as e:
-            return Response({'error': f'AI model error: {str(e)}'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+class JobSearchAIResponseViewSet(CategoryAIResponseViewSet):
+    """
+    ViewSet for handling Job Search AI Responses with user scoping and custom actions.
+    Provides CRUD operations plus custom actions for filtering and AI generation.
+    """
+    serializer_class = JobSearchAIResponseSerializer
+    ai_category = Category.JOB_SEARCH
 
     @action(detail=False, methods=['get'])
     def by_category(self, request):
-        category = request.query_params.get('category')
-        if not category:
-            return Response(
-                {'error': 'category parameter is required'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        valid_choices = dict(JobSearchAIResponse.CATEGORY_CHOICES)
-        if category not in valid_choices:
-            return Response(
-                {'error': f'Invalid category. Must be one of: {', '.join(valid_choices.keys())}'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        filtered = self.get_queryset().filter(category=category)
-        serializer = self.get_serializer(filtered, many=True)
-        return Response({
-            'count': len(filtered),
-            'category': category,
-            'results': serializer.data
-        })
+        # The job search category is stored under metadata['category']
+        return self.filter_by_metadata(request, 'category', JobSearchAIResponse.CATEGORY_CHOICES)
 
-    @action(detail=False, methods=['get'])
-    def by_topic(self, request):
-        tag = request.query_params.get('tag')
-        if not tag:
-            return Response(
-                {'error': 'Tag parameter is required'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        filtered = [resp for resp in self.get_queryset() if tag in resp.get_topic_tags_list()]
-        serializer = self.get_serializer(filtered, many=True)
-        return Response({
-            'count': len(filtered),
-            'tag': tag,
-            'results': serializer.data
-        })
 
-    @action(detail=True, methods=['post'], throttle_classes = [AIRegenerationThrottle])
-    def regenerate(self, request, pk=None):
-        """
-        Regenerate the AI response for a given Job Search response object.
-        POST /api/job-search-ai-responses/<id>/regenerate/
-        """
-        instance = self.get_object()
-        try:
-            user_tasks = Task.objects.filter(user=request.user, category='job_search')
-            if user_tasks.exists():
-                tasks_summary = "\n".join([
-                    f"- {task.title} | {'Completed' if task.completed else 'Incomplete'}"
-                    f" | Due: {task.due_date if task.due_date else 'N/A'}"
-                    f"\n  {task.description[:100]}{'...' if len(task.description) > 100 else ''}"
-                    for task in user_tasks
-                ])
-                tasks_section = f"User's Job Search Tasks:\n{tasks_summary}\n\n"
-            else:
-                tasks_section = "User has no Job Search tasks.\n\n"
-
-            prompt = (
-                f"{tasks_section}"
-                "You are an experienced Job Search Guide and Career Coach with 12+ years of experience helping professionals "
-                "at all levels land their dream jobs at top companies like FAANG, startups, and Fortune 500 companies. "
-                "Your expertise includes resume optimization and ATS systems, interview preparation (technical and behavioral), "
-                "salary negotiation strategies, career transition planning, industry trends and market analysis, "
-                "networking and personal branding, and job search strategies across different experience levels.\n\n"
-                "When responding, you must:\n"
-                "- Provide actionable, specific advice\n"
-                "- Consider current job market trends (2024-2025)\n"
-                "- Tailor advice to experience level and target role\n"
-                "- Include examples and templates when helpful\n"
-                "- Address both technical and soft skill development\n"
-                "- Consider industry-specific requirements\n"
-                "- Provide step-by-step action plans\n\n"
-                "FORMATTING REQUIREMENTS - Format your response using clean markdown with:\n"
-                "- Use ## for main headings\n"
-                "- Use **bold** for important concepts (NOT asterisks)\n"
-                "- Use - for bullet points\n"
-                "- Add proper paragraph spacing\n"
-                "- Do NOT use asterisks (*) anywhere in your response\n"
-                "- Include tips, resources, and best practices where appropriate\n\n"
-                f"Question: {instance.question}"
-            )
-            model = genai.GenerativeModel(settings.GEMINI_MODEL_NAME)
-            response = model.generate_content(prompt)
-            ai_response = response.text
-            ai_response = clean_ai_response(ai_response)
+class AIJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Poll the status of queued AI generation jobs.
+    GET /api/ai-jobs/<id>/
+    """
+    serializer_class = AIJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
 
-            # Update the instance
-            instance.response = ai_response
-            instance.updated_at = timezone.now()
-            instance.save()
+    def get_queryset(self):
+        return AIJob.objects.filter(user=self.request.user)
 
-            return Response({
-                'message': 'Response regenerated successfully',
-                'response': ai_response
-            }, status=status.HTTP_200_OK)
-        except Exception as e:
-            return Response({'error': f'AI model error: {str(e)}'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
-def clean_ai_response(response_text):
+class AIMetricsView(APIView):
     """
-    Clean and format AI response text
+    Counters for the AI caching and queueing layers (admins only).
+    GET /api/ai-metrics/
     """
-    import re
-    
-    # Remove excessive asterisks and convert to proper markdown
-    response_text = re.sub(r'\*{3,}', '**', response_text)  # Convert 3+ asterisks to bold
-    response_text = re.sub(r'\*{2,}', '**', response_text)  # Convert 2+ asterisks to bold
-    
-    # Convert single asterisks to bold (but be careful with code blocks)
-    # First, protect code blocks
-    code_blocks = re.findall(r'```.*?```', response_text, re.DOTALL)
-    for i, block in enumerate(code_blocks):
-        response_text = response_text.replace(block, f'__CODE_BLOCK_{i}__')
-    
-    # Now convert single asterisks to bold
-    response_text = re.sub(r'\*([^*\n]+)\*', r'**\1**', response_text)
-    
-    # Restore code blocks
-    for i, block in enumerate(code_blocks):
-        response_text = response_text.replace(f'__CODE_BLOCK_{i}__', block)
-    
-    # Clean up spacing
-    response_text = re.sub(r'\n{3,}', '\n\n', response_text)  # Remove excessive line breaks
-    response_text = re.sub(r' +', ' ', response_text)  # Remove multiple spaces
-    
-    # Ensure proper markdown formatting
-    response_text = re.sub(r'^\*\*([^*]+)\*\*$', r'## \1', response_text, flags=re.MULTILINE)  # Convert bold lines to headers
-    
-    # Clean up bullet points
-    response_text = re.sub(r'^\*\*   \*\*', '- ', response_text, flags=re.MULTILINE)
-    response_text = re.sub(r'^\*\*   ', '- ', response_text, flags=re.MULTILINE)
-    
-    # Ensure code blocks are properly formatted
-    response_text = re.sub(r'```(\w+)?\n', r'```\1\n', response_text)
-    
-    return response_text.strip()
\ No newline at end of file
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(metrics.snapshot(), status=status.HTTP_200_OK)
+
+
+class AIUsageView(APIView):
+    """
+    Aggregated usage ledger (admins only): request, cache hit, error and token
+    totals plus p50/p95/p99 Gemini latency, overall and per category.
+    GET /api/ai-usage/[?hours=24]  (at most the AI_USAGE_RETENTION_DAYS kept)
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        max_hours = settings.AI_USAGE_RETENTION_DAYS * 24
+        try:
+            hours = int(request.query_params.get('hours', 24))
+        except ValueError:
+            hours = None
+        if hours is None or not 1 <= hours <= max_hours:
+            return Response({'error': f'hours must be a whole number from 1 to {max_hours}'}, status=status.HTTP_400_BAD_REQUEST)
+        since = timezone.now() - timedelta(hours=hours)
+        return Response(usage.summarize(since), status=status.HTTP_200_OK)
@@ -50,6 +50,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'app.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -114,6 +115,8 @@ AUTH_USER_MODEL = 'app.CustomUser'
 
 
 REST_FRAMEWORK = {
+    # Cursor pages on (created_at, id); see app/pagination.py
+    'DEFAULT_PAGINATION_CLASS': 'app.pagination.KeysetPagination',
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
     ],
@@ -188,5 +191,129 @@ CORS_ALLOW_CREDENTIALS = True
 
 GEMINI_API_KEY = config("GEMINI_API_KEY")
 GEMINI_MODEL_NAME = 'gemini-2.0-flash'
+# 'google', or 'fake' for the local stand-in in app/fake_gemini.py (tuned by FAKE_GEMINI)
+GEMINI_BACKEND = config('GEMINI_BACKEND', default='google')
+FAKE_GEMINI = {}  # Overrides for app.fake_gemini.DEFAULT_OPTIONS
+# 'grpc' (default) or 'rest'. The client and its channel are shared per worker process.
+GEMINI_TRANSPORT = config('GEMINI_TRANSPORT', default='grpc')
+# Open the Gemini channel when a gunicorn worker or the AI job worker starts
+GEMINI_WARM_ON_START = config('GEMINI_WARM_ON_START', default=True, cast=bool)
+
+# Prompt template version per category (app/prompts.py); unlisted categories use the latest
+AI_PROMPT_TEMPLATE_VERSIONS = {}
+
+# Task context in AI prompts: estimated token budget, and how many tasks are considered
+AI_TASK_CONTEXT_TOKEN_BUDGET = config('AI_TASK_CONTEXT_TOKEN_BUDGET', default=800, cast=int)
+AI_TASK_CONTEXT_MAX_CANDIDATES = 500
+# Precomputed per-(user, category) task digests, dropped whenever a task changes.
+# Task changes only reach other processes through a shared cache; with a
+# per-process LocMemCache digests are kept for AI_TASK_DIGEST_LOCAL_TTL only.
+AI_TASK_DIGEST_CACHE = 'default'
+AI_TASK_DIGEST_TTL = 60 * 60 * 24
+AI_TASK_DIGEST_LOCAL_TTL = 60
+
+# Background AI job queue (processed by `manage.py run_ai_worker`)
+AI_WORKER_CONCURRENCY = config('AI_WORKER_CONCURRENCY', default=4, cast=int)
+AI_WORKER_POLL_INTERVAL = config('AI_WORKER_POLL_INTERVAL', default=1.0, cast=float)
+AI_JOB_MAX_ATTEMPTS = config('AI_JOB_MAX_ATTEMPTS', default=3, cast=int)
+AI_JOB_LEASE_SECONDS = config('AI_JOB_LEASE_SECONDS', default=300, cast=int)
+
+# Batch question submission (`batch_generate` on the AI response viewsets).
+# Each question counts against the 'ai_generation' throttle rate. Synchronous
+# batches must finish within the gunicorn timeout; larger ones go through ?async=true.
+AI_BATCH_MAX_QUESTIONS = 30
+AI_BATCH_MAX_SYNC_QUESTIONS = config('AI_BATCH_MAX_SYNC_QUESTIONS', default=4, cast=int)
+AI_BATCH_CONCURRENCY = config('AI_BATCH_CONCURRENCY', default=4, cast=int)
+
+# Gemini call deadlines (seconds) per AI category, circuit breaker and hedging
+AI_LATENCY_BUDGETS = {
+    'dsa': 30.0,
+    'development': 30.0,
+    'system_design': 45.0,
+    'job_search': 30.0,
+}
+AI_LATENCY_BUDGET_DEFAULT = 30.0
+AI_CIRCUIT_BREAKER = {
+    'WINDOW_SECONDS': 60,   # rolling window for the failure rate
+    'MIN_CALLS': 10,        # don't trip on fewer calls than this
+    'FAILURE_RATE': 0.5,    # trip when at least this share of calls failed
+    'OPEN_SECONDS': 30,     # fail fast this long before letting a probe through
+}
+AI_CALL_THREADS = config('AI_CALL_THREADS', default=32, cast=int)
+# Send a second request once a call has run longer than the category's p95 latency
+AI_HEDGE_ENABLED = config('AI_HEDGE_ENABLED', default=False, cast=bool)
+AI_HEDGE_MIN_SAMPLES = 20
+AI_HEDGE_MIN_DELAY = 1.0
+
+# Global cap on concurrent Gemini calls across all processes (PostgreSQL advisory locks)
+AI_ADMISSION = {
+    'ENABLED': config('AI_ADMISSION_ENABLED', default=True, cast=bool),
+    'MAX_IN_FLIGHT': config('AI_ADMISSION_MAX_IN_FLIGHT', default=16, cast=int),
+    'MAX_QUEUE': config('AI_ADMISSION_MAX_QUEUE', default=16, cast=int),
+    'MAX_WAIT': 5.0,        # seconds a queued call waits for a slot before being shed
+    'POLL_INTERVAL': 0.1,
+    'RETRY_AFTER': 10,      # Retry-After (seconds) sent with shed requests
+}
+
+# Usage ledger (AIUsageRecord rows), written in batches by a background thread
+AI_USAGE_LEDGER_ENABLED = config('AI_USAGE_LEDGER_ENABLED', default=True, cast=bool)
+AI_USAGE_BATCH_SIZE = 100
+AI_USAGE_FLUSH_INTERVAL = 2.0
+AI_USAGE_QUEUE_SIZE = 10000
+# Rows older than this are deleted by `manage.py prune_ai_usage` (run it daily)
+AI_USAGE_RETENTION_DAYS = config('AI_USAGE_RETENTION_DAYS', default=90, cast=int)
+
+# Response compression (app/middleware.py): brotli or gzip, negotiated per request.
+# Views can opt out with @skip_compression.
+COMPRESSION = {
+    'MIN_SIZE': 1024,  # bytes; smaller bodies are sent as is
+    'CONTENT_TYPES': ['application/json', 'text/event-stream'],
+    'BROTLI_QUALITY': 4,  # 0-11; higher levels cost far more CPU for a few % smaller bodies
+    'GZIP_LEVEL': 6,
+    'STREAMING': True,  # compress streaming responses, flushing after every chunk
+}
+
+# Compressed storage of AI answers (app/fields.py). Codec: 'zlib', 'zstd' (needs a
+# zstd module) or 'raw'; changing it only affects newly written values.
+AI_RESPONSE_COMPRESSION = {
+    'CODEC': config('AI_RESPONSE_COMPRESSION_CODEC', default='zlib'),
+    'LEVEL': 6,
+    'MIN_SIZE': 256,  # bytes; shorter answers are stored uncompressed
+}
+
+# Text search configuration of the AI response search index (app/search.py).
+# Changing it needs `manage.py backfill_ai_response_search --all`.
+AI_SEARCH_CONFIG = config('AI_SEARCH_CONFIG', default='english')
+AI_SEARCH_MAX_CANDIDATES = 1000  # most recent matches that are ranked
+
+# Threads rendering stored AI answers to HTML after they are written (`?format=html`)
+AI_HTML_RENDER_THREADS = config('AI_HTML_RENDER_THREADS', default=2, cast=int)
+
+# Server-Sent Events streaming of AI answers. Streams are kept in the AIStream
+# table, so clients can resume a stream on any worker.
+AI_STREAM_TTL = 600  # seconds a finished stream stays resumable
+AI_STREAM_POLL_INTERVAL = 0.05  # how often a stream produced by another worker is read
+AI_STREAM_HEARTBEAT = 15
+AI_STREAM_RETRY_MS = 2000
+
+# Exact-match answer cache in front of Gemini (see app/answer_cache.py).
+# Set 'BACKEND' to None to disable. LocalMemoryBackend is per process; with a
+# shared backend every worker reuses the answers of the others.
+AI_ANSWER_CACHE = {
+    'BACKEND': 'app.answer_cache.LocalMemoryBackend',
+    'TIMEOUT': 60 * 60 * 24,
+    'MAX_ENTRIES': 1000,
+    'OPTIONS': {},
+}
+
+# Single-flight coalescing of identical concurrent prompts (see app/singleflight.py).
+# The lease must outlive the slowest Gemini call, or a second worker will take over.
+AI_SINGLEFLIGHT_ENABLED = True
+AI_SINGLEFLIGHT_LEASE_SECONDS = 120
+AI_SINGLEFLIGHT_POLL_INTERVAL = 0.1
+
+# Counters shown at /api/ai-metrics/ are kept in memory and added to the
+# AIMetricCounter table at most this often (seconds) by each process
+AI_METRICS_FLUSH_INTERVAL = 5.0
 
   
\ No newline at end of file
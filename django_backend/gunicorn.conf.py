@@ -0,0 +1,8 @@
+# Picked up automatically when gunicorn is started from this directory:
+#   gunicorn django_backend.wsgi
+
+
+def post_worker_init(worker):
+    # Open the Gemini channel before the worker takes its first request
+    from app import ai_client
+    ai_client.warm()
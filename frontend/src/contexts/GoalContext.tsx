@@ -90,7 +90,8 @@ export function GoalProvider({ children }) {
         throw new Error('Failed to fetch goals');
       }
       
-      const goalsData = await response.json();
+      // A user has one goal per category, so they always fit on the first page
+      const goalsData = (await response.json()).results;
       
       // Convert array to object with category as key for easier lookup
       const goalsObject = {};
@@ -4,7 +4,7 @@ import { Task } from '@/components/ui-custom/TaskItem';
 import { useToast } from '@/components/ui/use-toast';
 import { useAuth } from '@/contexts/AuthContext'
 import { useGoalContext } from '@/contexts/GoalContext';
-import { apiFetch } from '@/lib/api';
+import { apiFetch, fetchAllPages } from '@/lib/api';
 import { fetchWithCSRF, getCSRFToken } from '@/lib/csrf';
 
 interface Summary {
@@ -96,27 +96,22 @@ export const TaskProvider: React.FC<{ children: React.ReactNode }> = ({ children
   const fetchTasks = async () => {
     setLoading(true);
     try {
-      const response = await apiFetch('tasks/', {
+      const tasksData = await fetchAllPages('tasks/', {
         credentials: 'include'
       });
+
+      const formattedTasks = tasksData.map((task: any) => ({
+        ...task,
+        created_at: new Date(task.created_at),
+        updated_at: new Date(task.updated_at),
+        due_date: task.due_date ? new Date(task.due_date) : null
+      }));
       
-      if (response.ok) {
-        const tasksData = await response.json();
-        const formattedTasks = tasksData.map((task: any) => ({
-          ...task,
-          created_at: new Date(task.created_at),
-          updated_at: new Date(task.updated_at),
-          due_date: task.due_date ? new Date(task.due_date) : null
-        }));
-        
-        setTasks(formattedTasks);
-        
-        // Save to user-specific localStorage
-        if (user?.id) {
-          localStorage.setItem(`studytrack-tasks-${user.id}`, JSON.stringify(formattedTasks));
-        }
-      } else {
-        throw new Error('Failed to fetch tasks');
+      setTasks(formattedTasks);
+      
+      // Save to user-specific localStorage
+      if (user?.id) {
+        localStorage.setItem(`studytrack-tasks-${user.id}`, JSON.stringify(formattedTasks));
       }
     } catch (error) {
       throw new Error('Failed to load tasks');
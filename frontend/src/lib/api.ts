@@ -4,4 +4,17 @@ export function apiFetch(endpoint: string, options?: RequestInit) {
   // Ensure no double slashes when joining base URL and endpoint
   const url = `${API_BASE_URL?.replace(/\/$/, '')}/${endpoint.replace(/^\//, '')}`;
   return fetch(url, options);
-} 
\ No newline at end of file
+}
+
+// List endpoints return one page at a time: { next, results }. Follow `next` to collect every item.
+export async function fetchAllPages<T = any>(endpoint: string, options?: RequestInit): Promise<T[]> {
+  const items: T[] = [];
+  let response = await apiFetch(endpoint, options);
+  while (true) {
+    if (!response.ok) throw new Error(`Request failed with status ${response.status}`);
+    const data = await response.json();
+    items.push(...data.results);
+    if (!data.next) return items;
+    response = await fetch(data.next, options);
+  }
+}
@@ -10,7 +10,7 @@ import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@
 import { useToast } from '@/components/ui/use-toast';
 import ReactMarkdown from 'react-markdown';
 import { handle429 } from "@/utils/handle429";
-import { apiFetch } from '@/lib/api';
+import { apiFetch, fetchAllPages } from '@/lib/api';
 
 const CATEGORY_MAP = {
   dsa: {
@@ -40,7 +40,8 @@ type CategoryKey = keyof typeof CATEGORY_MAP;
 interface AIResponse {
   id: string;
   question: string;
-  response: string;
+  preview: string;
+  response?: string; // Lists only carry the preview; loaded when the response is opened
   topic_tags?: string[];
   created_at: string;
   updated_at: string;
@@ -109,15 +110,15 @@ const Assistant = () => {
         else if (cat === 'job_search') params = `/by_category/?category=${filterValue}`;
         url += params;
       }
-      const response = await apiFetch(url, {
+      // The list is paginated: follow `next` until the whole history is loaded
+      url += `${url.includes('?') ? '&' : '?'}limit=200`;
+      const data = await fetchAllPages(url, {
         headers: {
           'Authorization': `Bearer ${getAuthToken()}`,
         },
         credentials: 'include',
       });
-      if (!response.ok) throw new Error('Failed to fetch responses');
-      const data = await response.json();
-      setResponses(data.results || data);
+      setResponses(data);
     } catch (error: any) {
       toast({ title: 'Error', description: error.message || 'Failed to fetch responses', duration: 2000 });
     } finally {
@@ -175,10 +176,43 @@ const Assistant = () => {
     }
   };
 
+  // Load the full answer of a listed response (list pages only include its preview)
+  const loadResponse = async (id: string) => {
+    const cached = responses.find(r => r.id === id);
+    if (cached?.response !== undefined) return cached.response;
+    const response = await apiFetch(`${CATEGORY_MAP[category].endpoint}${id}/`, {
+      headers: {
+        'Authorization': `Bearer ${getAuthToken()}`,
+      },
+      credentials: 'include',
+    });
+    if (!response.ok) throw new Error('Failed to load response');
+    const data = await response.json();
+    setResponses(prev => prev.map(r => r.id === id ? { ...r, response: data.response } : r));
+    return data.response as string;
+  };
+
+  // Select a response and load its full answer
+  const selectResponse = async (id: string) => {
+    setSelectedResponse(id);
+    try {
+      await loadResponse(id);
+    } catch (error: any) {
+      toast({ title: 'Error', description: error.message || 'Failed to load response', variant: 'destructive' });
+    }
+  };
+
   // Download a response
-  const downloadResponse = (response: AIResponse) => {
+  const downloadResponse = async (response: AIResponse) => {
+    let text: string;
+    try {
+      text = await loadResponse(response.id);
+    } catch (error: any) {
+      toast({ title: 'Error', description: error.message || 'Failed to load response', variant: 'destructive' });
+      return;
+    }
     const element = document.createElement('a');
-    const file = new Blob([response.response], { type: 'text/plain' });
+    const file = new Blob([text], { type: 'text/plain' });
     element.href = URL.createObjectURL(file);
     element.download = `AI_Response_${response.id}.txt`;
     document.body.appendChild(element);
@@ -314,7 +348,7 @@ const Assistant = () => {
                                 : 'border-l-gray-200 dark:border-l-transparent'
                             }`}
                             style={selectedResponse === response.id ? getBorderColorStyle() : {}}
-                            onClick={() => setSelectedResponse(response.id)}
+                            onClick={() => selectResponse(response.id)}
                           >
                             <div className="flex justify-between items-start">
                               <div className="flex-1">
@@ -405,7 +439,7 @@ const Assistant = () => {
                                   ),
                                 }}
                               >
-                                {response.response?.substring(0, 100) + '...'}
+                                {response.preview}
                               </ReactMarkdown>
                             </div>
                           </motion.div>